@@ -93,3 +93,14 @@ CREATE TABLE IF NOT EXISTS vehicle_ownership (
 );
 
 CREATE INDEX IF NOT EXISTS idx_vehicle_ownership_customer_id ON vehicle_ownership (customer_id);
+
+-- Tabel checkpoint offset Kafka untuk custom ODS sink
+-- Ditulis di transaksi yang sama dengan data batch (exactly-once apply)
+CREATE TABLE IF NOT EXISTS ods_sink_offsets (
+    consumer_group TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    partition INTEGER NOT NULL,
+    next_offset BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (consumer_group, topic, partition)
+);
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark converter sink (ns/record) dengan baseline dan regression check
+
+Case:
+- convert_debezium_date / convert_debezium_timestamp / convert_debezium_decimal
+- convert_customer_record / convert_credit_application_record /
+  convert_vehicle_ownership_record (payload -> record dict)
+- full per tabel: deserialize envelope JSON + converter_for(schema)(payload)
+
+Input di-generate deterministik dengan debezium_loadgen.py (seed tetap).
+Setiap case diukur --repeat kali, diambil yang tercepat. Workload kalibrasi
+(Python murni) diukur berselang-seling dengan setiap case; yang dibandingkan
+dengan baseline tersimpan (bench_converters_baseline.json) adalah rasio
+case / kalibrasi, jadi beda kecepatan mesin dan CPU throttling selama run
+tidak terbaca sebagai regression. Exit code 1 jika ada case yang lebih
+lambat dari baseline * (1 + threshold).
+
+Jalan offline, tidak perlu Kafka / PostgreSQL:
+    python py_script/bench_converters.py
+    python py_script/bench_converters.py --threshold 0.1 --case record
+    python py_script/bench_converters.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import timeit
+
+from custom_ods_sink import (
+    SINK_TABLES,
+    convert_credit_application_record,
+    convert_customer_record,
+    convert_debezium_date,
+    convert_debezium_decimal,
+    convert_debezium_timestamp,
+    convert_vehicle_ownership_record,
+    create_deserializer,
+)
+from debezium_loadgen import LoadGenerator
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_converters_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+RECORD_CONVERTERS = {
+    'customers': ('convert_customer_record', convert_customer_record),
+    'credit_applications': ('convert_credit_application_record', convert_credit_application_record),
+    'vehicle_ownership': ('convert_vehicle_ownership_record', convert_vehicle_ownership_record),
+}
+
+CALIBRATION_KEYS = [f"field_{i}" for i in range(20)]
+
+def calibration_workload():
+    """Workload Python murni (dict + str + int, mirip converter) untuk normalisasi kecepatan mesin"""
+    rows = []
+    for i in range(200):
+        row = {}
+        for key in CALIBRATION_KEYS:
+            row[key] = str(i * 31 % 977)
+        row['total'] = sum(len(value) for value in row.values())
+        rows.append(row)
+    return rows
+
+def sample_messages(records, seed):
+    """Message envelope non-tombstone per tabel: tabel -> list (topic, value bytes, payload)"""
+    generator = LoadGenerator(seed=seed)
+    deserialize = create_deserializer('json', 'json')
+    samples = {table: [] for table in SINK_TABLES}
+    for message in generator.messages(records):
+        if message.value:
+            payload = deserialize(message.topic, message.value)['payload']
+            samples[payload['__source_table']].append((message.topic, message.value, payload))
+    return samples
+
+def build_cases(samples, json_backend):
+    """List (nama case, fungsi loop, jumlah record per panggilan)"""
+    cases = []
+    payloads = [payload for rows in samples.values() for _, _, payload in rows]
+
+    days = [payload['date_of_birth'] for payload in payloads if payload.get('date_of_birth') is not None]
+    millis = [payload['__source_ts_ms'] for payload in payloads]
+    decimals = [payload['vehicle_price'] for payload in payloads if payload.get('vehicle_price') is not None]
+
+    def loop(function, values):
+        def run():
+            for value in values:
+                function(value)
+        return run
+
+    cases.append(("convert_debezium_date", loop(convert_debezium_date, days), len(days)))
+    cases.append(("convert_debezium_timestamp", loop(convert_debezium_timestamp, millis), len(millis)))
+    cases.append(("convert_debezium_decimal", loop(lambda value: convert_debezium_decimal(value, 2), decimals),
+                  len(decimals)))
+
+    for table, (name, convert) in RECORD_CONVERTERS.items():
+        table_payloads = [payload for _, _, payload in samples[table]]
+        cases.append((name, loop(convert, table_payloads), len(table_payloads)))
+
+    for table, rows in samples.items():
+        deserialize = create_deserializer('envelope', json_backend)
+        sink_table = SINK_TABLES[table]
+        messages = [(topic, value) for topic, value, _ in rows]
+
+        def full(messages=messages, deserialize=deserialize, sink_table=sink_table):
+            for topic, value in messages:
+                envelope = deserialize(topic, value)
+                sink_table.converter_for(envelope['schema'])(envelope['payload'])
+        cases.append((f"full {table}", full, len(messages)))
+    return cases
+
+def measure(function, count, repeat):
+    """(ns per record, ns kalibrasi): run tercepat dari repeat, berselang-seling"""
+    function()  # warm-up: cache converter / schema
+    timer = timeit.default_timer
+    best = calibration = float('inf')
+    # GC dimatikan selama pengukuran, sama seperti timeit
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = timer()
+            calibration_workload()
+            calibration = min(calibration, timer() - started)
+            started = timer()
+            function()
+            best = min(best, timer() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best / max(count, 1) * 1e9, calibration * 1e9
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark converter sink dengan regression check")
+    parser.add_argument("--records", type=int, default=3000, help="Jumlah message sintetis (default: 3000)")
+    parser.add_argument("--repeat", type=int, default=15, help="Jumlah pengukuran per case (default: 15)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json-backend", default="json",
+                        help="JSON backend untuk case full (default: json; baseline berlaku per backend)")
+    parser.add_argument("--case", action="append", help="Hanya case yang namanya mengandung teks ini")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help=f"File baseline (default: {BASELINE_FILE})")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Regression jika lebih lambat dari baseline x (1 + threshold) (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Ukur ulang case yang melewati threshold sebelum dianggap regression (default: 2)")
+    parser.add_argument("--no-calibrate", action="store_true", help="Bandingkan ns mentah tanpa normalisasi mesin")
+    parser.add_argument("--update-baseline", action="store_true", help="Simpan hasil sebagai baseline baru")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark Converter Sink")
+    print("=" * 60)
+
+    samples = sample_messages(args.records, args.seed)
+    cases = build_cases(samples, args.json_backend)
+    if args.case:
+        cases = [case for case in cases if any(text in case[0] for text in args.case)]
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get('json_backend') != args.json_backend:
+        print(f"⚠ Baseline dibuat dengan JSON backend {baseline.get('json_backend')}, bukan {args.json_backend}")
+    print(f"Python {platform.python_version()}, {args.records} message, repeat {args.repeat}"
+          + (", tanpa kalibrasi" if args.no_calibrate else "") + "\n")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<36} {'ns/record':>10} {'baseline':>10} {'ratio':>7}")
+    for name, function, count in cases:
+        base = (baseline or {}).get('cases', {}).get(name)
+        # Case di atas threshold diukur ulang (noise sesaat); regression harus konsisten
+        for attempt in range(1 + (args.retries if base and not args.update_baseline else 0)):
+            ns, calibration_ns = measure(function, count, args.repeat)
+            if base is None:
+                break
+            # Baseline di-scale ke kecepatan mesin saat case ini diukur
+            scale = 1.0 if args.no_calibrate else calibration_ns / base['calibration_ns']
+            expected = base['ns'] * scale
+            ratio = ns / expected
+            if ratio <= 1 + args.threshold:
+                break
+        results[name] = {'ns': round(ns, 1), 'calibration_ns': round(calibration_ns, 1)}
+        if base is None:
+            print(f"{name:<36} {ns:>10.1f} {'-':>10} {'':>7}  (belum ada baseline)")
+            continue
+        status = ""
+        if ratio > 1 + args.threshold:
+            status = "  ✗ REGRESSION"
+            regressions.append((name, ratio))
+        elif ratio < 1 - args.threshold:
+            status = "  ✓ lebih cepat"
+        print(f"{name:<36} {ns:>10.1f} {expected:>10.1f} {ratio:>6.2f}x{status}")
+
+    if args.update_baseline:
+        cases_baseline = dict((baseline or {}).get('cases', {})) if args.case else {}
+        cases_baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'json_backend': args.json_backend,
+                'cases': cases_baseline,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\n✓ Baseline disimpan ke {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"\n⚠ Belum ada baseline di {args.baseline} (jalankan dengan --update-baseline)")
+        return
+    if regressions:
+        print(f"\n✗ {len(regressions)} case lebih lambat dari baseline + {args.threshold:.0%}:")
+        for name, ratio in regressions:
+            print(f"  - {name}: {ratio:.2f}x")
+        sys.exit(1)
+    print(f"\n✓ Tidak ada regression (threshold {args.threshold:.0%})")
+
+if __name__ == "__main__":
+    main()
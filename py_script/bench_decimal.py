@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark decode Debezium decimal: implementasi lama (float, max 8 byte)
+vs decimal_decoder baru (Decimal exact, ukuran bebas, decoder cached)
+
+Jalan offline, tidak perlu Kafka / PostgreSQL:
+    python py_script/bench_decimal.py --iterations 200000
+"""
+
+import argparse
+import base64
+import timeit
+from decimal import Context, Decimal, MAX_PREC
+
+from custom_ods_sink import decimal_decoder
+
+def legacy_convert_debezium_decimal(decimal_base64, scale=2):
+    """Implementasi lama convert_debezium_decimal (untuk pembanding)"""
+    if decimal_base64 is None:
+        return None
+    try:
+        decoded = base64.b64decode(decimal_base64)
+        if len(decoded) < 1:
+            return None
+        if len(decoded) <= 8:
+            value = int.from_bytes(decoded, byteorder='big', signed=True)
+            return float(value) / (10 ** scale)
+        else:
+            return None
+    except Exception:
+        return None
+
+def encode_decimal(value, scale):
+    """Encode Decimal ke format Debezium precise (base64 unscaled bytes)"""
+    unscaled = int(value.scaleb(scale, context=Context(prec=MAX_PREC)))
+    length = (unscaled.bit_length() + 8) // 8
+    return base64.b64encode(unscaled.to_bytes(length, 'big', signed=True)).decode()
+
+CASES = [
+    ("monthly_income NUMERIC(15,2)", Decimal("12500000.75"), 2),
+    ("interest_rate NUMERIC(5,2)", Decimal("12.50"), 2),
+    ("negative NUMERIC(15,2)", Decimal("-98765.43"), 2),
+    ("besar NUMERIC(38,4) (>8 byte)", Decimal("12345678901234567890123456789.1234"), 4),
+]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000, help="Jumlah decode per case")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark Debezium Decimal Decode")
+    print("=" * 60)
+    print(f"Iterations per case: {args.iterations}\n")
+
+    for label, value, scale in CASES:
+        encoded = encode_decimal(value, scale)
+        decode = decimal_decoder(label, scale)
+
+        legacy_result = legacy_convert_debezium_decimal(encoded, scale)
+        new_result = decode(encoded)
+
+        legacy_ns = timeit.timeit(lambda: legacy_convert_debezium_decimal(encoded, scale),
+                                  number=args.iterations) / args.iterations * 1e9
+        new_ns = timeit.timeit(lambda: decode(encoded), number=args.iterations) / args.iterations * 1e9
+
+        exact = "✓ exact" if new_result == value else "✗ TIDAK exact"
+        print(f"{label}")
+        print(f"  lama: {legacy_ns:8.1f} ns/value -> {legacy_result!r}")
+        print(f"  baru: {new_ns:8.1f} ns/value -> {new_result!r} ({exact})")
+        print(f"  speedup: {legacy_ns / new_ns:.2f}x\n")
+
+if __name__ == "__main__":
+    main()
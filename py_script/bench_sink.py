@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end custom_ods_sink: message Debezium sintetis
+(debezium_loadgen.py) -> deserialize -> convert -> compact -> tulis ke ODS
+PostgreSQL lokal, lewat BatchApplier / ParallelApplier yang sama dengan sink.
+
+Kafka tidak dipakai: message di-generate di depan (tidak ikut diukur) lalu
+dipotong per batch_rows seperti satu poll. Setiap konfigurasi (kombinasi skew,
+op mix, batch rows, worker) jalan di process terpisah supaya peak memory
+per konfigurasi bisa diukur. Hasil per konfigurasi:
+- records/s: jumlah message / waktu total apply
+- p50 / p99 latency per batch (apply + commit, ms)
+- peak RSS process dan kenaikannya setelah message di-generate (MB)
+
+Butuh PostgreSQL ODS (PG_CONFIG: env ODS_HOST, ODS_PORT, ODS_USER,
+ODS_PASSWORD, ODS_DB). Row sintetis memakai primary key berawalan BENCH-
+dan checkpoint group ods-sink-bench; keduanya dihapus sebelum dan sesudah
+setiap konfigurasi (kecuali --keep-data).
+
+Contoh:
+    python py_script/bench_sink.py --records 20000
+    python py_script/bench_sink.py --skew 1 --skew 4 --op-mix r=1 --op-mix c=1,u=8,d=1 --batch-rows 500 --batch-rows 5000
+    python py_script/bench_sink.py --workers 1 --workers 3 --partitions 3 --json bench_sink.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+from custom_ods_sink import (
+    CHECKPOINT_TABLE,
+    DECODE_CHUNK_SIZE,
+    DESERIALIZERS,
+    SINK_TABLES,
+    SNAPSHOT_COPY_ENABLED,
+    ApplyWorker,
+    BatchApplier,
+    DecodePool,
+    FileDeadLetterQueue,
+    OdsConnectionPool,
+    ParallelApplier,
+    SnapshotLoader,
+    create_deserializer,
+    ensure_checkpoint_table,
+    weighted_percentile,
+)
+from debezium_loadgen import DEFAULT_OP_MIX, KEY_PREFIX, LoadGenerator, format_op_mix, parse_op_mix
+
+BENCH_GROUP_ID = "ods-sink-bench"
+
+# Pengganti kafka.TopicPartition (hashable, atribut topic/partition)
+BenchPartition = namedtuple('BenchPartition', 'topic partition')
+
+def peak_rss_mb():
+    """Peak RSS process ini (ru_maxrss: KB di Linux, bytes di macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def cleanup(pool):
+    """Hapus row sintetis BENCH- dan checkpoint group benchmark"""
+    conn = pool.getconn()
+    cur = conn.cursor()
+    try:
+        for table, sink_table in SINK_TABLES.items():
+            cur.execute(f"DELETE FROM {table} WHERE {sink_table.pk} LIKE %s", (KEY_PREFIX + '%',))
+        cur.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE consumer_group = %s", (BENCH_GROUP_ID,))
+        conn.commit()
+    finally:
+        cur.close()
+        pool.putconn(conn)
+
+def poll_batches(messages, batch_rows):
+    """Potong stream message per batch_rows menjadi msg_pack seperti consumer.poll()"""
+    for start in range(0, len(messages), batch_rows):
+        msg_pack = {}
+        for message in messages[start:start + batch_rows]:
+            msg_pack.setdefault(BenchPartition(message.topic, message.partition), []).append(message)
+        yield msg_pack
+
+def build_engine(pool, deserialize, config, topic_partitions, dead_letter, decoder):
+    """Applier seperti main() sink: single-thread atau ApplyWorker per subset partition"""
+    workers = max(1, min(config['workers'], len(topic_partitions)))
+    if workers == 1:
+        snapshot = SnapshotLoader() if SNAPSHOT_COPY_ENABLED else None
+        applier = BatchApplier(pool, deserialize, BENCH_GROUP_ID, snapshot, decoder=decoder,
+                               dead_letter=dead_letter)
+        return applier, [applier]
+    appliers = []
+    for index in range(workers):
+        snapshot = SnapshotLoader(suffix=f"_w{index}") if SNAPSHOT_COPY_ENABLED else None
+        appliers.append(BatchApplier(pool, deserialize, BENCH_GROUP_ID, snapshot, name=f"worker-{index}",
+                                     decoder=decoder, dead_letter=dead_letter))
+    return ParallelApplier([ApplyWorker(applier) for applier in appliers], topic_partitions), appliers
+
+def run_config(config):
+    """Jalankan satu konfigurasi (di process anak); return dict hasil"""
+    generator = LoadGenerator(config['tables'], config['skew'], parse_op_mix(config['op_mix']),
+                              config['partitions'], config['seed'])
+    messages = list(generator.messages(config['records']))
+    topic_partitions = sorted({BenchPartition(m.topic, m.partition) for m in messages})
+    base_rss = peak_rss_mb()
+
+    pool = OdsConnectionPool(max(1, config['workers']))
+    conn = pool.getconn()
+    try:
+        ensure_checkpoint_table(conn)
+    finally:
+        pool.putconn(conn)
+    cleanup(pool)
+
+    deserialize = create_deserializer(config['deserializer'])
+    decoder = None
+    if config['decode_processes'] > 0:
+        decoder = DecodePool(config['decode_processes'], DECODE_CHUNK_SIZE, deserialize)
+    dlq_dir = tempfile.TemporaryDirectory(prefix="ods_bench_dlq_")
+    dead_letter = FileDeadLetterQueue(f"{dlq_dir.name}/dlq.jsonl")
+    engine, appliers = build_engine(pool, deserialize, config, topic_partitions, dead_letter, decoder)
+
+    latencies = []
+    written = 0
+    try:
+        started = time.perf_counter()
+        for msg_pack in poll_batches(messages, config['batch_rows']):
+            batch_started = time.perf_counter()
+            written += sum(engine.apply(msg_pack).values())
+            latencies.append((time.perf_counter() - batch_started, 1))
+        elapsed = time.perf_counter() - started
+    finally:
+        engine.close()
+        if decoder is not None:
+            decoder.close()
+        dead_letter.close()
+        dlq_dir.cleanup()
+        if not config['keep_data']:
+            cleanup(pool)
+        pool.closeall()
+
+    peak = peak_rss_mb()
+    return dict(config,
+                messages=len(messages),
+                written=written,
+                dead_letters=sum(applier.dead_letters for applier in appliers),
+                batches=len(latencies),
+                seconds=elapsed,
+                records_per_sec=len(messages) / elapsed if elapsed else 0.0,
+                p50_ms=weighted_percentile(latencies, 0.50) * 1000,
+                p99_ms=weighted_percentile(latencies, 0.99) * 1000,
+                peak_rss_mb=peak,
+                sink_rss_mb=peak - base_rss)
+
+def print_results(results):
+    print(f"\n{'skew':>5} {'op mix':<24} {'batch':>6} {'wrk':>3} {'rec/s':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'written':>8} {'peak MB':>8} {'+sink MB':>8}")
+    for r in results:
+        print(f"{r['skew']:>5g} {r['op_mix']:<24} {r['batch_rows']:>6} {r['workers']:>3} "
+              f"{r['records_per_sec']:>9.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['written']:>8} "
+              f"{r['peak_rss_mb']:>8.1f} {r['sink_rss_mb']:>8.1f}")
+        if r['dead_letters']:
+            print(f"      ⚠ {r['dead_letters']} record masuk DLQ")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end custom_ods_sink dengan message sintetis")
+    parser.add_argument("--records", type=int, default=20000, help="Message per konfigurasi (default: 20000)")
+    parser.add_argument("--table", action="append", choices=sorted(SINK_TABLES),
+                        help="Tabel yang di-generate (bisa diulang; default: semua)")
+    parser.add_argument("--skew", type=float, action="append",
+                        help="Skew key update/delete (bisa diulang; default: 1)")
+    parser.add_argument("--op-mix", action="append",
+                        help=f"Bobot op r/c/u/d (bisa diulang; default: {format_op_mix(DEFAULT_OP_MIX)})")
+    parser.add_argument("--batch-rows", type=int, action="append",
+                        help="Message per batch / poll (bisa diulang; default: 1000)")
+    parser.add_argument("--workers", type=int, action="append",
+                        help="Apply worker paralel (bisa diulang; default: 1)")
+    parser.add_argument("--partitions", type=int, default=1, help="Partition per topic (default: 1)")
+    parser.add_argument("--deserializer", choices=[name for name in DESERIALIZERS if name in ('json', 'envelope')],
+                        default="envelope", help="Deserializer JSON (default: envelope)")
+    parser.add_argument("--decode-processes", type=int, default=0, help="Process DecodePool (default: 0)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-data", action="store_true", help="Jangan hapus row BENCH- setelah konfigurasi terakhir")
+    parser.add_argument("--json", help="Simpan hasil ke file JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if psycopg2 is None:
+        print("✗ Error: psycopg2 tidak terinstall")
+        print("  Install dengan: pip install psycopg2-binary")
+        sys.exit(1)
+    try:
+        op_mixes = [format_op_mix(parse_op_mix(value)) for value in (args.op_mix or [format_op_mix(DEFAULT_OP_MIX)])]
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(2)
+
+    configs = []
+    for skew, op_mix, batch_rows, workers in itertools.product(
+            args.skew or [1.0], op_mixes, args.batch_rows or [1000], args.workers or [1]):
+        configs.append({
+            'tables': args.table, 'records': args.records, 'skew': skew, 'op_mix': op_mix,
+            'batch_rows': max(1, batch_rows), 'workers': workers, 'partitions': args.partitions,
+            'deserializer': args.deserializer, 'decode_processes': args.decode_processes,
+            'seed': args.seed, 'keep_data': False,
+        })
+    configs[-1]['keep_data'] = args.keep_data
+
+    print("=" * 60)
+    print("Benchmark End-to-End ODS Sink")
+    print("=" * 60)
+    print(f"{len(configs)} konfigurasi x {args.records} message, deserializer {args.deserializer}, "
+          f"{args.partitions} partition per topic")
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    for index, config in enumerate(configs, 1):
+        print(f"\n[{index}/{len(configs)}] skew {config['skew']:g}, op mix {config['op_mix']}, "
+              f"batch {config['batch_rows']}, {config['workers']} worker...")
+        # Process baru per konfigurasi: peak RSS tidak terbawa dari konfigurasi sebelumnya
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            try:
+                result = executor.submit(run_config, config).result()
+            except Exception as e:
+                print(f"✗ Error: {e}")
+                sys.exit(1)
+        print(f"  ✓ {result['records_per_sec']:.0f} rec/s, p99 {result['p99_ms']:.1f} ms")
+        results.append(result)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Hasil disimpan ke {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Capture topic Kafka ke file dump (binary atau JSONL) untuk replay tanpa
+broker lewat custom_ods_sink.py --source file:<path>
+
+Default membaca dari awal setiap partition sampai end offset saat start
+(seperti --mode drain sink); --follow jalan terus sampai Ctrl+C. Consumer
+tanpa group, jadi offset consumer group sink tidak berubah. Key/value
+disimpan apa adanya (bytes Kafka) beserta partition, offset dan timestamp.
+
+Contoh:
+    python py_script/capture_topics.py ./dumps/cdc-20261017.odsdump
+    python py_script/capture_topics.py ./dumps/customers.jsonl --topic customers --from-offset 120000
+    python py_script/capture_topics.py ./dumps/cdc-week.odsdump --follow
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from kafka import KafkaConsumer, TopicPartition
+
+from custom_ods_sink import (
+    DATABASE_NAME,
+    KAFKA_BOOTSTRAP_SERVERS,
+    TOPIC_PREFIX,
+    TOPICS,
+    parse_offset_overrides,
+    offset_override_for,
+)
+from sink_source import open_dump_writer, replay_group_id
+
+def capture(consumer, writer, topic_partitions, follow=False, max_records=None):
+    """Poll dan tulis record ke writer; return jumlah record per TopicPartition"""
+    end_offsets = consumer.end_offsets(topic_partitions)
+    done = {tp for tp in topic_partitions if not follow and consumer.position(tp) >= end_offsets[tp]}
+    counts = {tp: 0 for tp in topic_partitions}
+    last_report = time.monotonic()
+    while len(done) < len(topic_partitions):
+        msg_pack = consumer.poll(timeout_ms=1000, max_records=5000)
+        for tp, messages in msg_pack.items():
+            for message in messages:
+                if not follow and message.offset >= end_offsets[tp]:
+                    break
+                writer.write(message)
+                counts[tp] += 1
+                if max_records and writer.count >= max_records:
+                    return counts
+        if not follow:
+            for tp in topic_partitions:
+                if tp not in done and consumer.position(tp) >= end_offsets[tp]:
+                    done.add(tp)
+                    consumer.pause(tp)
+        now = time.monotonic()
+        if now - last_report >= 10:
+            writer.flush()
+            print(f"  ... {writer.count} record")
+            last_report = now
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture topic Kafka ke file dump untuk replay sink")
+    parser.add_argument("out", help="File dump baru (.jsonl = JSONL, selain itu binary)")
+    parser.add_argument("--topic", action="append",
+                        help="Topic atau nama tabel (bisa diulang; default: topic sink ODS)")
+    parser.add_argument("--format", choices=("binary", "jsonl"), help="Format dump (default: dari extension)")
+    parser.add_argument("--from-offset", action="append", metavar="OFFSET|TOPIC:PARTITION:OFFSET",
+                        help="Mulai dari offset tertentu (default: awal partition); bisa diulang")
+    parser.add_argument("--follow", action="store_true", help="Jalan terus (tidak berhenti di end offset)")
+    parser.add_argument("--max-records", type=int, help="Berhenti setelah N record")
+    args = parser.parse_args()
+
+    try:
+        overrides = parse_offset_overrides(args.from_offset)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(2)
+    topics = [topic if '.' in topic else f"{TOPIC_PREFIX}.{DATABASE_NAME}.{topic}"
+              for topic in (args.topic or TOPICS)]
+    if os.path.exists(args.out):
+        print(f"✗ Error: {args.out} sudah ada (dump tidak di-append/ditimpa)")
+        sys.exit(2)
+
+    print("=" * 60)
+    print("Capture Kafka Topics")
+    print("=" * 60)
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        client_id='topic_capture',
+        enable_auto_commit=False,
+    )
+    topic_partitions = []
+    for topic in topics:
+        partitions = consumer.partitions_for_topic(topic)
+        if partitions:
+            topic_partitions.extend(TopicPartition(topic, p) for p in sorted(partitions))
+            print(f"  ✓ Topic {topic}: {len(partitions)} partition(s)")
+        else:
+            print(f"  ⚠ Topic {topic}: tidak ditemukan")
+    if not topic_partitions:
+        consumer.close()
+        sys.exit(1)
+    consumer.assign(topic_partitions)
+    consumer.seek_to_beginning()
+    for tp in topic_partitions:
+        offset = offset_override_for(tp, overrides)
+        if offset is not None:
+            consumer.seek(tp, offset)
+
+    writer = open_dump_writer(args.out, args.format)
+    print(f"\n✓ Menulis {writer.format} dump ke {args.out}"
+          + (" (follow, Ctrl+C untuk stop)" if args.follow else " (sampai end offset saat start)"))
+    started = time.perf_counter()
+    counts = {}
+    try:
+        counts = capture(consumer, writer, topic_partitions, args.follow, args.max_records)
+    except KeyboardInterrupt:
+        print("\n✓ Stopped.")
+    finally:
+        writer.close()
+        consumer.close()
+
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(args.out)
+    print(f"\n✓ {writer.count} record, {size / 1e6:.1f} MB dalam {elapsed:.1f} detik")
+    for tp, n in counts.items():
+        print(f"  - {tp.topic}[{tp.partition}]: {n} record")
+    print(f"  Replay: python py_script/custom_ods_sink.py --source file:{args.out} "
+          f"--group-id {replay_group_id('file:' + args.out)} --mode drain")
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +1,216 @@
 #!/usr/bin/env python3
 """
-Script untuk cek apakah topic Kafka ada dan berapa banyak message di dalamnya
+Script untuk cek topic Kafka: jumlah message per topic/partition dan lag
+consumer group
+
+Semua partition di-query sekaligus dengan satu client: beginning_offsets /
+end_offsets satu request batch untuk semua partition, committed offset satu
+request per group (list_consumer_group_offsets). Mode --watch me-refresh
+tampilan di tempat dengan rate message masuk (end offset) vs keluar
+(committed offset group).
+
+Contoh:
+    python py_script/check_kafka_topics.py
+    python py_script/check_kafka_topics.py --partitions
+    python py_script/check_kafka_topics.py --group custom-ods-sink --watch --interval 2
+    python py_script/check_kafka_topics.py --all-groups
 """
 
-from kafka import KafkaConsumer
-from kafka.admin import KafkaAdminClient, NewTopic
-from kafka.errors import TopicAlreadyExistsError
+import argparse
+import os
 import sys
+import time
 
-import os
+from kafka import KafkaConsumer, TopicPartition
+from kafka.admin import KafkaAdminClient
 
 KAFKA_BOOTSTRAP_SERVERS = [os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")]
 TOPIC_PREFIX = os.environ.get("DEBEZIUM_TOPIC_PREFIX", "mks_finance")
 DATABASE_NAME = os.environ.get("DEBEZIUM_DATABASE_NAME", "mks_finance_dw")
+CONSUMER_GROUP_ID = os.environ.get("ODS_SINK_GROUP_ID", "custom-ods-sink")
 TOPICS = [
     f"{TOPIC_PREFIX}.{DATABASE_NAME}.customers",
     f"{TOPIC_PREFIX}.{DATABASE_NAME}.credit_applications",
     f"{TOPIC_PREFIX}.{DATABASE_NAME}.vehicle_ownership"
 ]
 
-def check_topics():
-    """Cek status topic"""
+# ANSI: cursor ke kiri atas + hapus layar (refresh di tempat untuk --watch)
+CLEAR_SCREEN = "\033[H\033[J"
+
+def list_partitions(consumer, topics):
+    """TopicPartition semua topic dari satu fetch metadata cluster"""
+    consumer.topics()
+    partitions = {}
+    for topic in topics:
+        ids = consumer.partitions_for_topic(topic)
+        if ids:
+            partitions[topic] = [TopicPartition(topic, p) for p in sorted(ids)]
+    return partitions
+
+def group_offsets(admin, group, partitions):
+    """Committed offset group per TopicPartition (satu request untuk semua partition)"""
+    committed = admin.list_consumer_group_offsets(group, partitions=partitions)
+    return {tp: meta.offset for tp, meta in committed.items() if meta is not None and meta.offset >= 0}
+
+def take_snapshot(consumer, admin, partitions, groups):
+    """Offset semua partition dan committed offset semua group pada satu waktu"""
+    all_partitions = [tp for tps in partitions.values() for tp in tps]
+    return {
+        'at': time.monotonic(),
+        'beginning': consumer.beginning_offsets(all_partitions),
+        'end': consumer.end_offsets(all_partitions),
+        'committed': {group: group_offsets(admin, group, all_partitions) for group in groups},
+    }
+
+def group_lag(snapshot, group, tps):
+    """Lag group untuk list partition; partition tanpa commit dihitung dari awal"""
+    committed = snapshot['committed'][group]
+    lag = 0
+    missing = 0
+    for tp in tps:
+        position = committed.get(tp)
+        if position is None:
+            missing += 1
+            position = snapshot['beginning'][tp]
+        lag += max(0, snapshot['end'][tp] - position)
+    return lag, missing
+
+def _rate(current, previous, elapsed):
+    return (current - previous) / elapsed if elapsed > 0 else 0.0
+
+def render(snapshot, partitions, groups, previous=None, show_partitions=False):
+    """Baris laporan per topic (dan per partition); rate jika ada snapshot sebelumnya"""
+    elapsed = snapshot['at'] - previous['at'] if previous else 0
+    lines = []
+    total_messages = 0
+    total_lag = {group: 0 for group in groups}
+    for topic, tps in partitions.items():
+        begin = sum(snapshot['beginning'][tp] for tp in tps)
+        end = sum(snapshot['end'][tp] for tp in tps)
+        total_messages += end - begin
+        line = f"{topic} ({len(tps)} partition): {end - begin} messages"
+        if previous:
+            line += f", in {_rate(end, sum(previous['end'][tp] for tp in tps), elapsed):.1f} msg/s"
+        lines.append(line)
+        for group in groups:
+            lag, missing = group_lag(snapshot, group, tps)
+            total_lag[group] += lag
+            line = f"  group {group}: lag {lag}"
+            if previous:
+                now_committed = snapshot['committed'][group]
+                before_committed = previous['committed'].get(group, {})
+                out_now = sum(now_committed.get(tp, 0) for tp in tps)
+                # Partition yang baru pertama kali commit tidak dihitung sebagai lonjakan rate
+                out_before = sum(before_committed.get(tp, now_committed.get(tp, 0)) for tp in tps)
+                line += f", out {_rate(out_now, out_before, elapsed):.1f} msg/s"
+            if missing:
+                line += f" ({missing} partition belum ada commit)"
+            lines.append(line)
+        if show_partitions:
+            for tp in tps:
+                line = (f"    [{tp.partition}] offset {snapshot['beginning'][tp]}..{snapshot['end'][tp]} "
+                        f"({snapshot['end'][tp] - snapshot['beginning'][tp]} messages)")
+                for group in groups:
+                    committed = snapshot['committed'][group].get(tp)
+                    if committed is None:
+                        line += f", {group}: -"
+                    else:
+                        line += f", {group}: committed {committed} lag {max(0, snapshot['end'][tp] - committed)}"
+                lines.append(line)
+    lines.append("")
+    lines.append(f"Total: {total_messages} messages")
+    for group, lag in total_lag.items():
+        lines.append(f"  group {group}: total lag {lag}")
+    return lines
+
+def check_topics(args):
+    """Cek status topic, jumlah message dan lag consumer group"""
     print("=" * 60)
     print("Cek Kafka Topics")
     print("=" * 60)
-    
+
+    admin_client = None
+    consumer = None
     try:
-        # Buat admin client
         admin_client = KafkaAdminClient(
             bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
             client_id='topic_checker'
         )
-        
-        # List semua topic
-        print("\nMengambil daftar topic...")
-        # list_topics() returns a list of topic names
-        all_topics = admin_client.list_topics()
-        
+        # Satu consumer tanpa group, hanya untuk metadata dan offset
+        consumer = KafkaConsumer(
+            bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+            client_id='topic_checker',
+            enable_auto_commit=False
+        )
+
+        topics = args.topic or TOPICS
+        all_topics = set(admin_client.list_topics())
         print(f"\n✓ Total topic di Kafka: {len(all_topics)}")
         print(f"\nTopic yang dimonitor:")
-        for topic in TOPICS:
+        for topic in topics:
             if topic in all_topics:
                 print(f"  ✓ {topic} - ADA")
             else:
                 print(f"  ✗ {topic} - TIDAK ADA")
-        
-        # Cek jumlah message di setiap topic menggunakan kafka consumer
-        print("\n" + "=" * 60)
-        print("Cek Jumlah Message di Topic")
-        print("=" * 60)
-        
-        for topic in TOPICS:
-            if topic not in all_topics:
-                print(f"\n{topic}: Topic tidak ada")
-                continue
-                
-            try:
-                # Buat consumer untuk cek offset - langsung assign, jangan subscribe
-                from kafka import TopicPartition
-                import time
-                
-                # Get partitions dulu dengan consumer terpisah
-                temp_consumer = KafkaConsumer(
-                    bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-                    consumer_timeout_ms=1000
-                )
-                partitions = temp_consumer.partitions_for_topic(topic)
-                temp_consumer.close()
-                
-                if not partitions:
-                    print(f"\n{topic}: Tidak ada partition")
-                    continue
-                
-                print(f"\n{topic}:")
-                total_messages = 0
-                
-                # Cek setiap partition dengan assign langsung
-                for partition in partitions:
-                    try:
-                        consumer = KafkaConsumer(
-                            bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-                            enable_auto_commit=False,
-                            consumer_timeout_ms=2000
-                        )
-                        
-                        tp = TopicPartition(topic, partition)
-                        consumer.assign([tp])
-                        
-                        # Seek to beginning
-                        consumer.seek_to_beginning(tp)
-                        low_offset = consumer.position(tp)
-                        
-                        # Seek to end
-                        consumer.seek_to_end(tp)
-                        high_offset = consumer.position(tp)
-                        
-                        msg_count = high_offset - low_offset
-                        total_messages += msg_count
-                        print(f"  Partition {partition}: {msg_count} messages (offset: {low_offset} to {high_offset})")
-                        
-                        consumer.close()
-                    except Exception as e:
-                        print(f"  Partition {partition}: Error - {e}")
-                
-                if total_messages == 0:
-                    print(f"  ⚠ Tidak ada message di topic ini")
-                else:
-                    print(f"  ✓ Total: {total_messages} messages")
-                
-            except Exception as e:
-                print(f"\n{topic}: Error - {e}")
-                import traceback
-                traceback.print_exc()
-        
-        admin_client.close()
-        
+
+        partitions = list_partitions(consumer, [topic for topic in topics if topic in all_topics])
+        if not partitions:
+            print("\n⚠ Tidak ada partition untuk topic yang dimonitor")
+            return
+
+        if args.all_groups:
+            groups = sorted(group for group, _ in admin_client.list_consumer_groups())
+        else:
+            groups = args.group or [CONSUMER_GROUP_ID]
+
+        snapshot = take_snapshot(consumer, admin_client, partitions, groups)
+        if args.all_groups:
+            # Hanya group yang punya committed offset di topic yang dimonitor
+            groups = [group for group in groups if snapshot['committed'][group]]
+        if not args.watch:
+            print("\n" + "=" * 60)
+            print("Jumlah Message dan Lag Consumer Group")
+            print("=" * 60 + "\n")
+            print("\n".join(render(snapshot, partitions, groups, show_partitions=args.partitions)))
+            return
+
+        previous = None
+        while True:
+            lines = render(snapshot, partitions, groups, previous, args.partitions)
+            sys.stdout.write(CLEAR_SCREEN)
+            print(f"Kafka lag ({time.strftime('%H:%M:%S')}, refresh {args.interval:g} detik, Ctrl+C untuk stop)\n")
+            print("\n".join(lines))
+            sys.stdout.flush()
+            time.sleep(args.interval)
+            previous = snapshot
+            snapshot = take_snapshot(consumer, admin_client, partitions, groups)
+
+    except KeyboardInterrupt:
+        print("\n✓ Stopped.")
     except Exception as e:
         print(f"\n✗ Error: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if consumer is not None:
+            consumer.close()
+        if admin_client is not None:
+            admin_client.close()
 
-if __name__ == "__main__":
-    check_topics()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cek topic Kafka: jumlah message dan lag consumer group")
+    parser.add_argument("--topic", action="append",
+                        help="Topic yang dicek (bisa diulang; default: topic sink ODS)")
+    groups = parser.add_mutually_exclusive_group()
+    groups.add_argument("--group", action="append",
+                        help=f"Consumer group untuk lag (bisa diulang; default: {CONSUMER_GROUP_ID})")
+    groups.add_argument("--all-groups", action="store_true", help="Lag semua consumer group di cluster")
+    parser.add_argument("--partitions", action="store_true", help="Tampilkan detail per partition")
+    parser.add_argument("--watch", action="store_true",
+                        help="Refresh terus di tempat dengan rate msg/s masuk vs keluar")
+    parser.add_argument("--interval", type=float, default=5.0, help="Interval refresh --watch (detik, default: 5)")
+    return parser.parse_args(argv)
 
+if __name__ == "__main__":
+    check_topics(parse_args())
@@ -4,36 +4,80 @@ Custom consumer untuk sink data dari Kafka ke ODS PostgreSQL
 Mengconvert format Debezium ke format PostgreSQL
 """
 
-import json
+import argparse
 import base64
-from datetime import datetime, timedelta
+import json
+import binascii
+import io
+from datetime import date, datetime
+import multiprocessing
 import os
+import queue
+import signal
 import sys
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Context, Decimal, MAX_EMAX, MAX_PREC, MIN_EMIN
+from functools import lru_cache
 
+# Dependency Kafka/PostgreSQL dicek saat main() jalan, supaya converter bisa
+# di-import (benchmark, tooling offline) tanpa kafka-python/psycopg2
 try:
     from kafka import KafkaConsumer
 except ImportError:
-    print("✗ Error: kafka-python tidak terinstall")
-    print("  Install dengan: pip install kafka-python")
-    sys.exit(1)
+    KafkaConsumer = None
 
 try:
     import psycopg2
+    from psycopg2.extras import execute_values
+    from psycopg2.pool import ThreadedConnectionPool
 except ImportError:
-    print("✗ Error: psycopg2 tidak terinstall")
-    print("  Install dengan: pip install psycopg2-binary")
-    sys.exit(1)
+    psycopg2 = None
+
+# JSON backend opsional yang lebih cepat dari stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Avro (opsional): fastavro untuk decode, registry lokal/HTTP untuk schema
+try:
+    import fastavro
+except ImportError:
+    fastavro = None
+
+from local_schema_registry import HEADER_SIZE, MAGIC_BYTE, open_registry
+from sink_metrics import DEFAULT_SIZE_BUCKETS, MetricsRegistry, start_metrics_server
+from sink_source import open_source, replay_group_id
+
+def check_dependencies(kafka=True):
+    """Exit dengan pesan install jika kafka-python / psycopg2 tidak ada
+
+    kafka=False untuk source file dump (replay tanpa broker).
+    """
+    if kafka and KafkaConsumer is None:
+        print("✗ Error: kafka-python tidak terinstall")
+        print("  Install dengan: pip install kafka-python")
+        sys.exit(1)
+    if psycopg2 is None:
+        print("✗ Error: psycopg2 tidak terinstall")
+        print("  Install dengan: pip install psycopg2-binary")
+        sys.exit(1)
 
 # Kafka config
 # Note: Update topic names to match your DEBEZIUM_TOPIC_PREFIX and database name
 KAFKA_BOOTSTRAP_SERVERS = [os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")]
 TOPIC_PREFIX = os.environ.get("DEBEZIUM_TOPIC_PREFIX", "mks_finance")
 DATABASE_NAME = os.environ.get("DEBEZIUM_DATABASE_NAME", "mks_finance_dw")
-TOPICS = [
-    f"{TOPIC_PREFIX}.{DATABASE_NAME}.customers",
-    f"{TOPIC_PREFIX}.{DATABASE_NAME}.credit_applications",
-    f"{TOPIC_PREFIX}.{DATABASE_NAME}.vehicle_ownership"
-]
+# TOPICS di-generate dari TABLE_REGISTRY (lihat di bawah)
 
 # PostgreSQL config
 # Note: Update these values in .env file for production
@@ -45,12 +89,161 @@ PG_CONFIG = {
     'database': os.environ.get("ODS_DB", "ods_db")
 }
 
+# Consumer group tetap supaya restart resume dari committed offset
+CONSUMER_GROUP_ID = os.environ.get("ODS_SINK_GROUP_ID", "custom-ods-sink")
+
+# Tabel ODS untuk checkpoint offset per (group, topic, partition); ditulis di
+# transaksi yang sama dengan data batch dan jadi sumber posisi saat startup
+CHECKPOINT_TABLE = "ods_sink_offsets"
+
+# Jumlah apply worker thread (partition dibagi antar worker). Thread kena GIL:
+# yang tumpang-tindih hanya waktu tunggu PostgreSQL, bukan decode/convert
+APPLY_WORKERS = int(os.environ.get("ODS_SINK_WORKERS", "1"))
+
+# Decode stage multi-process: jumlah process (0 = decode di process utama)
+# dan jumlah message per chunk yang dikirim ke satu process
+DECODE_PROCESSES = int(os.environ.get("ODS_SINK_DECODE_PROCESSES", "0"))
+DECODE_CHUNK_SIZE = int(os.environ.get("ODS_SINK_DECODE_CHUNK_SIZE", "500"))
+
+# Jumlah row per EXECUTE upsert (array per kolom)
+UPSERT_PAGE_SIZE = int(os.environ.get("ODS_UPSERT_PAGE_SIZE", "500"))
+
+# Flush policy: batch di-flush ke ODS jika salah satu batas tercapai
+# (jumlah row, total bytes value, atau umur message tertua dalam ms).
+# ODS_FLUSH_TARGET_P99_MS > 0 mengaktifkan mode adaptive: ukuran batch
+# naik saat load tinggi dan turun saat stream sepi supaya p99 latency
+# sink (fetch -> commit ODS) di bawah target.
+FLUSH_MAX_ROWS = int(os.environ.get("ODS_FLUSH_MAX_ROWS", "1000"))
+FLUSH_MAX_BYTES = int(os.environ.get("ODS_FLUSH_MAX_BYTES", str(16 * 1024 * 1024)))
+FLUSH_LINGER_MS = int(os.environ.get("ODS_FLUSH_LINGER_MS", "200"))
+FLUSH_TARGET_P99_MS = int(os.environ.get("ODS_FLUSH_TARGET_P99_MS", "0"))
+FLUSH_MIN_ROWS = 100
+
+# Delete (__deleted / __op = 'd' dan tombstone): hard = DELETE row di ODS
+# (set-based per batch) | soft = row tetap ada dengan cdc_operation = 'd'
+DELETE_MODE = os.environ.get("ODS_SINK_DELETE_MODE", "hard")
+DELETE_MODES = ('hard', 'soft')
+
+# Mode run: idle (exit setelah 10 poll kosong) | daemon (tidak pernah exit
+# karena idle, SIGTERM = flush terakhir lalu stop) | drain (exit tepat saat
+# semua partition mencapai end offset yang diambil saat start)
+SINK_MODE = os.environ.get("ODS_SINK_MODE", "idle")
+SINK_MODES = ('idle', 'daemon', 'drain')
+
+# Daemon mode: timeout poll saat idle naik dua kali lipat sampai batas ini (ms)
+IDLE_MAX_BACKOFF_MS = int(os.environ.get("ODS_SINK_IDLE_MAX_BACKOFF_MS", "5000"))
+
+# Maksimum batch in flight (antre + sedang ditulis) di write stage; jika
+# penuh, partition Kafka di-pause sampai ada slot
+WRITE_QUEUE_BATCHES = int(os.environ.get("ODS_WRITE_QUEUE_BATCHES", "4"))
+
+# Sumber message: kafka, atau file:<path> untuk replay dump hasil
+# capture_topics.py tanpa broker (file, direktori, atau path dipisah koma)
+SINK_SOURCE = os.environ.get("ODS_SINK_SOURCE", "kafka")
+
+# Dead-letter queue untuk record yang tetap gagal ditulis setelah bisection
+# batch: path file JSONL lokal, atau kafka:<topic> untuk DLQ topic
+DLQ_LOCATION = os.environ.get("ODS_SINK_DLQ", "./ods_sink_dlq.jsonl")
+
+# Pool koneksi PostgreSQL (dipakai bersama apply worker); 0 = sama dengan --workers
+PG_POOL_SIZE = int(os.environ.get("ODS_PG_POOL_SIZE", "0"))
+
+# Reconnect setelah koneksi PostgreSQL putus (failover): jumlah percobaan
+# dan batas backoff (detik, eksponensial dari 1 detik)
+PG_RECONNECT_ATTEMPTS = int(os.environ.get("ODS_PG_RECONNECT_ATTEMPTS", "10"))
+PG_RECONNECT_MAX_BACKOFF = float(os.environ.get("ODS_PG_RECONNECT_MAX_BACKOFF", "30"))
+
+# Retry seluruh batch untuk error transient PostgreSQL (deadlock, serialization
+# failure, lock/statement timeout) sebelum dianggap gagal; backoff eksponensial
+# dari 0.5 detik
+PG_TRANSIENT_RETRIES = int(os.environ.get("ODS_PG_TRANSIENT_RETRIES", "3"))
+
+# Snapshot mode: record initial snapshot (__op = 'r') di-load via COPY ke
+# unlogged staging table lalu di-merge set-based ke tabel ODS
+SNAPSHOT_COPY_ENABLED = os.environ.get("ODS_SNAPSHOT_COPY", "1") == "1"
+SNAPSHOT_POLL_RECORDS = int(os.environ.get("ODS_SNAPSHOT_POLL_RECORDS", "5000"))
+# Minimum row 'r' berturut-turut per tabel sebelum masuk snapshot mode; row 'r'
+# sporadis (mis. re-snapshot beberapa row) tetap lewat upsert biasa
+SNAPSHOT_MIN_ROWS = int(os.environ.get("ODS_SNAPSHOT_MIN_ROWS", str(SNAPSHOT_POLL_RECORDS // 10)))
+STAGING_TABLE_PREFIX = "ods_stage_"
+
+# Deserializer message Kafka: envelope (schema di-cache per topic) | json (parse penuh)
+# | schemaless (connector dengan schemas.enable=false) | avro (Confluent wire format)
+DESERIALIZER = os.environ.get("ODS_SINK_DESERIALIZER", "envelope")
+# JSON backend: auto (orjson > ujson > json) | orjson | ujson | json
+JSON_BACKEND = os.environ.get("ODS_SINK_JSON_BACKEND", "auto")
+# Mode schemaless: file JSON {tabel/topic: schema Connect} untuk schema cache
+SCHEMA_FILE = os.environ.get("ODS_SINK_SCHEMA_FILE")
+
+# Deserializer avro: URL Confluent Schema Registry atau direktori registry lokal
+SCHEMA_REGISTRY = os.environ.get("ODS_SINK_SCHEMA_REGISTRY", "./schema_registry")
+
+# Sesuai decimal.handling.mode connector (precise | string | double).
+# Dipakai jika message tidak membawa schema; jika ada, schema yang menang.
+DECIMAL_HANDLING_MODE = os.environ.get("DEBEZIUM_DECIMAL_HANDLING_MODE", "precise")
+
+# Endpoint HTTP metrics format Prometheus (0 = nonaktif) dan interval
+# refresh consumer lag (end_offsets - position) dalam detik
+METRICS_PORT = int(os.environ.get("ODS_SINK_METRICS_PORT", "9108"))
+METRICS_HOST = os.environ.get("ODS_SINK_METRICS_HOST", "0.0.0.0")
+METRICS_LAG_INTERVAL = float(os.environ.get("ODS_SINK_METRICS_LAG_INTERVAL", "5"))
+
+# Freshness: SLA source commit MySQL -> commit ODS dalam ms (0 = tanpa SLA);
+# jika di-set, jadi batas bucket histogram supaya % dalam SLA bisa dihitung
+FRESHNESS_SLA_MS = int(os.environ.get("ODS_SINK_FRESHNESS_SLA_MS", "0"))
+FRESHNESS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+# ==================================================
+# METRICS
+# ==================================================
+# Label partition '' = tidak per partition (mis. hasil decode pool, commit
+# transaksi yang mencakup semua tabel); label kosong tidak di-render
+METRICS = MetricsRegistry()
+RECORDS_TOTAL = METRICS.counter(
+    "ods_sink_records_total", "Message Kafka yang diproses sink", ("table", "partition"))
+RECORDS_RATE = METRICS.gauge(
+    "ods_sink_records_per_second", "Message per detik sejak refresh lag sebelumnya", ("table", "partition"))
+WRITTEN_TOTAL = METRICS.counter(
+    "ods_sink_written_total", "Record (setelah compaction) yang ditulis ke ODS", ("table",))
+BATCH_RECORDS = METRICS.histogram(
+    "ods_sink_batch_records", "Jumlah record per tabel per batch yang ditulis", ("table",),
+    buckets=DEFAULT_SIZE_BUCKETS)
+CONVERT_SECONDS = METRICS.histogram(
+    "ods_sink_convert_seconds", "Waktu deserialize + convert per batch", ("table", "partition"))
+WRITE_SECONDS = METRICS.histogram(
+    "ods_sink_write_seconds", "Waktu delete + upsert per tabel per batch", ("table",))
+COMMIT_SECONDS = METRICS.histogram(
+    "ods_sink_commit_seconds", "Waktu checkpoint + COMMIT transaksi batch")
+ERRORS_TOTAL = METRICS.counter(
+    "ods_sink_errors_total", "Error per stage (deserialize, convert, decode, write, dlq)",
+    ("table", "partition", "stage"))
+CONSUMER_LAG = METRICS.gauge(
+    "ods_sink_consumer_lag", "Lag consumer: end offset - position", ("table", "partition"))
+END_OFFSET = METRICS.gauge(
+    "ods_sink_end_offset", "End offset partition Kafka", ("table", "partition"))
+POSITION = METRICS.gauge(
+    "ods_sink_position", "Posisi consumer (offset berikutnya yang di-fetch)", ("table", "partition"))
+WRITE_QUEUE_DEPTH = METRICS.gauge(
+    "ods_sink_write_queue_depth", "Batch in flight di write stage")
+FLUSH_BATCH_ROWS = METRICS.gauge(
+    "ods_sink_flush_batch_rows", "Target ukuran batch flush policy saat ini")
+# stage: source_to_kafka (commit MySQL -> append Kafka), kafka_to_ods
+# (append Kafka -> commit ODS), source_to_ods (end-to-end)
+FRESHNESS_SECONDS = METRICS.histogram(
+    "ods_sink_freshness_seconds", "Latency record dari commit MySQL sampai commit ODS per stage",
+    ("table", "partition", "stage"),
+    buckets=sorted(set(FRESHNESS_BUCKETS) | ({FRESHNESS_SLA_MS / 1000} if FRESHNESS_SLA_MS > 0 else set())))
+LAST_SOURCE_TIMESTAMP = METRICS.gauge(
+    "ods_sink_last_source_timestamp_seconds",
+    "Waktu commit MySQL (epoch) record terbaru yang sudah di-commit ke ODS", ("table", "partition"))
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
 def convert_debezium_date(epoch_days):
     """Convert Debezium date (epoch days) ke PostgreSQL date"""
     if epoch_days is None:
         return None
-    base_date = datetime(1970, 1, 1)
-    return (base_date + timedelta(days=epoch_days)).date()
+    return date.fromordinal(EPOCH_ORDINAL + epoch_days)
 
 def convert_debezium_timestamp(ts_ms):
     """Convert Debezium timestamp (milliseconds) ke PostgreSQL timestamp"""
@@ -58,543 +251,2452 @@ def convert_debezium_timestamp(ts_ms):
         return None
     return datetime.fromtimestamp(ts_ms / 1000.0)
 
-def convert_debezium_decimal(decimal_base64, scale=2):
-    """Convert Debezium decimal (base64) ke numeric
-    Debezium decimal adalah base64 encoded BigDecimal bytes
-    Format: [unscaled_value_bytes] dengan scale
+# Context dengan precision maksimum: scaleb tidak pernah membulatkan
+_EXACT_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+# Jumlah value decimal yang gagal di-decode, per field
+DECIMAL_DECODE_ERRORS = {}
+
+def _decimal_decode_error(field, value, error):
+    """Hitung error decode; warning hanya di-print sekali per field"""
+    field = field or 'decimal'
+    count = DECIMAL_DECODE_ERRORS.get(field, 0)
+    DECIMAL_DECODE_ERRORS[field] = count + 1
+    if count == 0:
+        print(f"⚠ Warning: Gagal decode decimal {field} {str(value)[:20]}...: {error} "
+              f"(warning berikutnya untuk field ini tidak di-print)")
+    return None
+
+def _decode_decimal_value(value, exponent, mode):
+    """Slow path: VariableScaleDecimal, string/double mode, atau value yang sudah numeric"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, dict):
+        # io.debezium.data.VariableScaleDecimal: {"scale": s, "value": base64}
+        return _decode_decimal_value(value['value'], -int(value['scale']), 'precise')
+    if isinstance(value, (bytes, bytearray)):
+        unscaled = int.from_bytes(value, 'big', signed=True)
+        return _EXACT_CONTEXT.scaleb(Decimal(unscaled), exponent)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    if isinstance(value, int) or mode != 'precise':
+        return Decimal(value)
+    unscaled = int.from_bytes(binascii.a2b_base64(value), 'big', signed=True)
+    return _EXACT_CONTEXT.scaleb(Decimal(unscaled), exponent)
+
+@lru_cache(maxsize=None)
+def decimal_decoder(field, scale, mode='precise'):
+    """Decoder Decimal (exact, ukuran bebas) untuk satu (field, scale, mode)
+
+    Mode precise: base64 dari unscaled value two's-complement big-endian
+    (Java BigDecimal.unscaledValue().toByteArray()), di-scale dengan scale dari
+    schema. Decoder di-cache, jadi per message hanya satu function call.
+    Value yang gagal di-decode dihitung di DECIMAL_DECODE_ERRORS dan jadi None.
     """
+    exponent = -int(scale or 0)
+
+    if mode == 'precise':
+        def decode(value, _a2b=binascii.a2b_base64, _from_bytes=int.from_bytes,
+                   _Decimal=Decimal, _scaleb=_EXACT_CONTEXT.scaleb, _str=str):
+            if value.__class__ is _str:
+                try:
+                    return _scaleb(_Decimal(_from_bytes(_a2b(value), 'big', signed=True)), exponent)
+                except Exception:
+                    pass
+            try:
+                return _decode_decimal_value(value, exponent, mode)
+            except Exception as e:
+                return _decimal_decode_error(field, value, e)
+    else:
+        def decode(value):
+            try:
+                return _decode_decimal_value(value, exponent, mode)
+            except Exception as e:
+                return _decimal_decode_error(field, value, e)
+    return decode
+
+def convert_debezium_decimal(decimal_base64, scale=2, mode=None):
+    """Convert Debezium decimal (base64 unscaled bytes) ke Decimal exact"""
     if decimal_base64 is None:
         return None
-    try:
-        # Decode base64
-        decoded = base64.b64decode(decimal_base64)
-        
-        # Debezium decimal menggunakan Java BigDecimal serialization
-        # Byte pertama adalah scale, sisanya adalah unscaled value (big-endian)
-        if len(decoded) < 1:
+    return decimal_decoder(None, scale, mode or DECIMAL_HANDLING_MODE)(decimal_base64)
+
+def schema_decimal_params(schema):
+    """Ambil (scale, mode) per field decimal dari schema Debezium JsonConverter
+
+    precise -> type bytes dengan name org.apache.kafka.connect.data.Decimal
+    (scale di parameters); string/double -> type string/double.
+    """
+    params = {}
+    for field in schema.get('fields', ()):
+        name = field.get('name')
+        if name == 'org.apache.kafka.connect.data.Decimal':
+            params[field['field']] = (int(field.get('parameters', {}).get('scale', 0)), 'precise')
+        elif name == 'io.debezium.data.VariableScaleDecimal':
+            params[field['field']] = (0, 'precise')
+        elif field.get('type') in ('string', 'double'):
+            params[field['field']] = (None, field['type'])
+    return params
+
+def avro_logical_fields(schema):
+    """Ambil logicalType per field dari schema record Avro (termasuk union null)"""
+    logical = {}
+    for field in schema.get('fields', ()):
+        field_type = field.get('type')
+        for candidate in (field_type if isinstance(field_type, list) else [field_type]):
+            if isinstance(candidate, dict) and candidate.get('logicalType'):
+                logical[field['name']] = candidate['logicalType']
+    return logical
+
+def _local_naive(value):
+    """Datetime aware (Avro timestamp-millis, UTC) -> naive local time
+
+    Sama dengan hasil convert_debezium_timestamp untuk JSON (fromtimestamp).
+    """
+    return value.astimezone().replace(tzinfo=None)
+
+# ==================================================
+# TABLE REGISTRY
+# ==================================================
+# Tipe logical Debezium per kolom, menentukan konversi value payload
+STRING = 'string'
+INT = 'int'
+DATE = 'date'            # io.debezium.time.Date (epoch days)
+TIMESTAMP = 'timestamp'  # io.debezium.time.Timestamp (epoch milliseconds)
+DECIMAL = 'decimal'      # org.apache.kafka.connect.data.Decimal (base64, scale dari schema)
+OPERATION = 'operation'  # __op Debezium; 'd' jika __deleted (delete.handling.mode=rewrite)
+
+# Tipe array PostgreSQL per tipe logical untuk parameter prepared statement
+PG_ARRAY_TYPES = {
+    STRING: 'text[]',
+    INT: 'bigint[]',
+    DATE: 'date[]',
+    TIMESTAMP: 'timestamp[]',
+    DECIMAL: 'numeric[]',
+    OPERATION: 'text[]',
+}
+
+# source: nama field di payload jika beda dengan nama kolom
+# default: value jika field tidak ada di payload (payload.get(field, default))
+# update: False untuk kolom yang tidak di-overwrite saat ON CONFLICT
+Column = namedtuple('Column', 'name type scale default source update',
+                    defaults=(STRING, None, None, None, True))
+
+# Metadata CDC yang ditambahkan transform ExtractNewRecordState (add.fields)
+CDC_COLUMNS = [
+    Column('cdc_timestamp', TIMESTAMP, source='__source_ts_ms'),
+    Column('cdc_operation', OPERATION, default='r', source='__op'),
+]
+
+# Satu entry per tabel ODS. Menambah tabel baru cukup menambah entry di sini
+# (dan DDL-nya di ods_schema.sql); converter dan statement upsert di-generate.
+TABLE_REGISTRY = {
+    'customers': {
+        'pk': 'customer_id',
+        'columns': [
+            Column('customer_id'),
+            Column('nik'),
+            Column('full_name'),
+            Column('date_of_birth', DATE),
+            Column('gender'),
+            Column('marital_status'),
+            Column('phone_number'),
+            Column('email'),
+            Column('address'),
+            Column('city'),
+            Column('province'),
+            Column('postal_code'),
+            Column('occupation'),
+            Column('employer_name'),
+            Column('monthly_income', DECIMAL, scale=2),
+            Column('employment_status'),
+            Column('years_of_employment', INT),
+            Column('education_level'),
+            Column('emergency_contact_name'),
+            Column('emergency_contact_phone'),
+            Column('emergency_contact_relation'),
+            Column('credit_score', INT),
+            Column('customer_segment'),
+            Column('registration_date', TIMESTAMP),
+            Column('last_updated', TIMESTAMP),
+            Column('status', default='Active'),
+            Column('created_by', default='SYSTEM', update=False),
+            Column('updated_by', default='SYSTEM'),
+        ],
+    },
+    'credit_applications': {
+        'pk': 'application_id',
+        'columns': [
+            Column('application_id'),
+            Column('customer_id'),
+            Column('application_date', TIMESTAMP),
+            Column('vehicle_type'),
+            Column('vehicle_brand'),
+            Column('vehicle_model'),
+            Column('vehicle_year', INT),
+            Column('vehicle_price', DECIMAL, scale=2),
+            Column('down_payment', DECIMAL, scale=2),
+            Column('loan_amount', DECIMAL, scale=2),
+            Column('tenor_months', INT),
+            Column('interest_rate', DECIMAL, scale=2),
+            Column('monthly_installment', DECIMAL, scale=2),
+            Column('application_status'),
+            Column('approval_date', TIMESTAMP),
+            Column('rejection_reason'),
+            Column('disbursement_date', DATE),
+            Column('first_installment_date', DATE),
+            Column('last_payment_date', DATE),
+            Column('outstanding_amount', DECIMAL, scale=2),
+            Column('payment_status', default='Current'),
+            Column('collateral_status', default='Held'),
+            Column('notes'),
+            Column('processed_by'),
+            Column('approved_by'),
+            Column('created_date', TIMESTAMP),
+        ],
+    },
+    'vehicle_ownership': {
+        'pk': 'ownership_id',
+        'columns': [
+            Column('ownership_id'),
+            Column('customer_id'),
+            Column('vehicle_type'),
+            Column('brand'),
+            Column('model'),
+            Column('year', INT),
+            Column('vehicle_price', DECIMAL, scale=2),
+            Column('purchase_date', DATE),
+            Column('ownership_status'),
+            Column('registration_number'),
+            Column('chassis_number'),
+            Column('engine_number'),
+            Column('created_date', TIMESTAMP),
+        ],
+    },
+}
+
+def build_converter(table, columns, decimal_params=None, logical_fields=None):
+    """Generate converter payload Debezium -> record dict untuk satu tabel
+
+    Source function di-generate sekali saat startup supaya per message tidak
+    ada loop/branching per kolom: setiap kolom jadi satu expression literal.
+    decimal_params (field -> (scale, mode)) dari schema message meng-override
+    scale registry; setiap kolom decimal dapat decoder cached sendiri.
+    logical_fields (field -> logicalType Avro) menandai field yang sudah
+    di-decode deserializer (date/Decimal dipakai langsung).
+    """
+    decimal_params = decimal_params or {}
+    logical_fields = logical_fields or {}
+    namespace = {
+        '_date': convert_debezium_date,
+        '_timestamp': convert_debezium_timestamp,
+        '_local_naive': _local_naive,
+        '_deleted': ('true', True),
+    }
+    lines = [f"def convert_{table}_record(payload):", "    get = payload.get", "    return {"]
+    for column in columns:
+        field = column.source or column.name
+        if column.default is None:
+            expr = f"get({field!r})"
+        else:
+            expr = f"get({field!r}, {column.default!r})"
+        # None di-check inline supaya field kosong tidak perlu function call
+        logical = logical_fields.get(field)
+        if logical in ('timestamp-millis', 'timestamp-micros'):
+            expr = f"None if (v := {expr}) is None else _local_naive(v)"
+        elif logical is not None:
+            pass
+        elif column.type == DATE:
+            expr = f"None if (v := {expr}) is None else _date(v)"
+        elif column.type == TIMESTAMP:
+            expr = f"None if (v := {expr}) is None else _timestamp(v)"
+        elif column.type == DECIMAL:
+            scale, mode = decimal_params.get(field, (column.scale, DECIMAL_HANDLING_MODE))
+            if scale is None:
+                scale = column.scale
+            decoder = f"_decimal_{column.name}"
+            namespace[decoder] = decimal_decoder(f"{table}.{column.name}", scale, mode)
+            expr = f"None if (v := {expr}) is None else {decoder}(v)"
+        elif column.type == OPERATION:
+            expr = f"'d' if get('__deleted') in _deleted else {expr}"
+        lines.append(f"        {column.name!r}: {expr},")
+    lines.append("    }")
+    exec(compile("\n".join(lines), f"<converter {table}>", "exec"), namespace)
+    return namespace[f"convert_{table}_record"]
+
+class SinkTable:
+    """Satu tabel ODS: converter dan statement upsert hasil generate dari registry"""
+
+    def __init__(self, name, pk, columns):
+        self.name = name
+        self.pk = pk
+        self.columns = list(columns) + CDC_COLUMNS
+        self.column_names = [column.name for column in self.columns]
+        self.convert = build_converter(name, self.columns)
+        self._decimal_fields = {
+            column.source or column.name for column in self.columns if column.type == DECIMAL
+        }
+        self._converters = {((), ()): self.convert}
+        # (schema, converter) terakhir; satu tuple supaya aman dibaca antar thread
+        self._last = (None, self.convert)
+
+        col_list = ", ".join(self.column_names)
+        updates = ",\n        ".join(
+            f"{column.name} = EXCLUDED.{column.name}"
+            for column in self.columns if column.name != pk and column.update
+        )
+        self.conflict_sql = f"ON CONFLICT ({pk}) DO UPDATE SET\n        {updates}"
+
+        # Prepared statement per koneksi (lihat prepare_statements): satu
+        # array per kolom di-unnest jadi rows, jadi statement di-parse/plan
+        # sekali per koneksi dan tiap batch hanya mengirim data
+        array_types = [PG_ARRAY_TYPES[column.type] for column in self.columns]
+        self.pk_array_type = pk_type = next(PG_ARRAY_TYPES[c.type] for c in self.columns if c.name == pk)
+        params = ", ".join(f"${i}" for i in range(1, len(array_types) + 1))
+        self.upsert_statement = f"ods_upsert_{name}"
+        self.delete_statement = f"ods_delete_{name}"
+        self.prepare_sql = (
+            f"PREPARE {self.upsert_statement} ({', '.join(array_types)}) AS\n"
+            f"    INSERT INTO {name} ({col_list})\n"
+            f"    SELECT * FROM unnest({params})\n"
+            f"    {self.conflict_sql}"
+        )
+        self.prepare_delete_sql = (
+            f"PREPARE {self.delete_statement} ({pk_type}) AS\n"
+            f"    DELETE FROM {name} WHERE {pk} = ANY($1)"
+        )
+        self.upsert_sql = f"EXECUTE {self.upsert_statement} (" + ", ".join(f"%s::{t}" for t in array_types) + ")"
+        self.delete_sql = f"EXECUTE {self.delete_statement} (%s::{pk_type})"
+
+    def converter_for(self, schema):
+        """Converter yang sesuai dengan schema message (scale/mode decimal)
+
+        Schema yang sama (object identik) langsung memakai converter terakhir;
+        kombinasi (field, scale, mode) berbeda di-generate sekali lalu di-cache.
+        """
+        if schema is None:
+            return self.convert
+        last_schema, last_convert = self._last
+        if schema is last_schema:
+            return last_convert
+        if schema.get('type') == 'record':
+            # Schema Avro: date/timestamp/decimal sudah di-decode via logicalType
+            params = {}
+            logical = avro_logical_fields(schema)
+        else:
+            params = {
+                field: param for field, param in schema_decimal_params(schema).items()
+                if field in self._decimal_fields
+            }
+            logical = {}
+        key = (tuple(sorted(params.items())), tuple(sorted(logical.items())))
+        convert = self._converters.get(key)
+        if convert is None:
+            convert = build_converter(self.name, self.columns, params, logical)
+            self._converters[key] = convert
+        self._last = (schema, convert)
+        return convert
+
+    def upsert(self, cur, records):
+        """Upsert batch records via prepared statement (satu EXECUTE per page)"""
+        for start in range(0, len(records), UPSERT_PAGE_SIZE):
+            page = records[start:start + UPSERT_PAGE_SIZE]
+            cur.execute(self.upsert_sql, [
+                [record.get(column) for record in page] for column in self.column_names
+            ])
+
+    def delete(self, cur, keys):
+        """Hapus row berdasarkan list primary key via prepared statement"""
+        if keys:
+            cur.execute(self.delete_sql, (list(keys),))
+
+    def tombstone_record(self, key):
+        """Record delete key-only (dari tombstone): semua kolom None kecuali pk"""
+        record = dict.fromkeys(self.column_names)
+        record[self.pk] = key
+        record['cdc_operation'] = 'd'
+        return record
+
+SINK_TABLES = {
+    name: SinkTable(name, spec['pk'], spec['columns'])
+    for name, spec in TABLE_REGISTRY.items()
+}
+
+TOPICS = [f"{TOPIC_PREFIX}.{DATABASE_NAME}.{table}" for table in TABLE_REGISTRY]
+
+# Nama lama tetap tersedia untuk script lain yang import converter langsung
+convert_customer_record = SINK_TABLES['customers'].convert
+convert_credit_application_record = SINK_TABLES['credit_applications'].convert
+convert_vehicle_ownership_record = SINK_TABLES['vehicle_ownership'].convert
+
+def table_for_topic(topic):
+    """Ambil nama tabel ODS dari nama topic Debezium"""
+    return topic.rsplit('.', 1)[-1]
+
+def topic_for_table(table):
+    """Nama topic Debezium untuk satu tabel ODS"""
+    return f"{TOPIC_PREFIX}.{DATABASE_NAME}.{table}"
+
+# ==================================================
+# DESERIALIZER
+# ==================================================
+def get_json_loads(backend="auto"):
+    """Return (nama backend, fungsi loads(bytes)) sesuai pilihan dan library yang ada"""
+    if backend in ("auto", "orjson") and orjson is not None:
+        return "orjson", orjson.loads
+    if backend in ("auto", "ujson") and ujson is not None:
+        return "ujson", ujson.loads
+    if backend not in ("auto", "json"):
+        print(f"⚠ JSON backend {backend} tidak terinstall, pakai json (stdlib)")
+    return "json", json.loads
+
+class JsonDeserializer:
+    """Parse penuh message JsonConverter (schema + payload) per message"""
+
+    name = "json"
+
+    def __init__(self, json_backend="auto"):
+        self.backend, self.loads = get_json_loads(json_backend)
+
+    def __call__(self, topic, raw):
+        if not raw:
             return None
-        
-        # Simplified: coba parse sebagai big-endian integer
-        # Note: Ini simplified version, untuk production perlu implementasi lengkap
-        if len(decoded) <= 8:
-            # Untuk nilai kecil, bisa langsung convert
-            value = int.from_bytes(decoded, byteorder='big', signed=True)
-            # Apply scale
-            return float(value) / (10 ** scale)
+        return self.loads(raw)
+
+    def decode_key(self, topic, raw):
+        """Parse key message (dengan atau tanpa envelope schema) -> payload key"""
+        if not raw:
+            return None
+        key = self.loads(raw)
+        if isinstance(key, dict) and 'schema' in key and 'payload' in key:
+            return key['payload']
+        return key
+
+class EnvelopeDeserializer(JsonDeserializer):
+    """Deserializer JsonConverter yang tidak mem-parse blok schema per message
+
+    Message Debezium berbentuk {"schema":{...},"payload":{...}}. Bytes schema
+    dipotong tanpa di-parse dan dicocokkan dengan cache per topic (fingerprint
+    = bytes schema itu sendiri); schema hanya di-parse saat pertama kali
+    muncul atau berubah. Hanya payload yang di-parse per message. Object
+    schema yang di-cache selalu sama, jadi converter_for() juga kena cache.
+    Message dengan bentuk lain di-parse penuh (fallback).
+    """
+
+    name = "envelope"
+
+    SCHEMA_PREFIX = b'{"schema":'
+    PAYLOAD_SEPARATOR = b',"payload":'
+
+    def __init__(self, json_backend="auto"):
+        super().__init__(json_backend)
+        self.last_schema = {}     # topic -> (schema bytes, parsed schema)
+        self.schema_cache = {}    # schema bytes -> parsed schema
+        self.schema_parses = 0
+        self.fallbacks = 0
+
+    def _schema_for(self, topic, schema_bytes):
+        last = self.last_schema.get(topic)
+        if last is not None and last[0] == schema_bytes:
+            return last[1]
+        schema = self.schema_cache.get(schema_bytes)
+        if schema is None:
+            schema = self.loads(schema_bytes)
+            self.schema_cache[schema_bytes] = schema
+            self.schema_parses += 1
+        self.last_schema[topic] = (schema_bytes, schema)
+        return schema
+
+    def __call__(self, topic, raw):
+        if not raw:
+            return None
+        if raw.startswith(self.SCHEMA_PREFIX):
+            split = raw.find(self.PAYLOAD_SEPARATOR, len(self.SCHEMA_PREFIX))
+            end = raw.rfind(b'}')
+            if split > 0 and end > split:
+                try:
+                    schema = self._schema_for(topic, raw[len(self.SCHEMA_PREFIX):split])
+                    payload = self.loads(raw[split + len(self.PAYLOAD_SEPARATOR):end])
+                    return {'schema': schema, 'payload': payload}
+                except ValueError:
+                    pass
+        self.fallbacks += 1
+        return self.loads(raw)
+
+def ods_decimal_schema(conn, table):
+    """Bangun schema Connect (hanya field decimal) dari definisi tabel di ODS
+
+    Dipakai untuk mode schemaless: scale diambil dari NUMERIC(p,s) kolom ODS,
+    tipe field mengikuti DECIMAL_HANDLING_MODE connector.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT column_name, numeric_scale FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s AND data_type = 'numeric'",
+            (table,)
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    return decimal_schema(table, rows)
+
+def decimal_schema(table, numeric_columns):
+    """Schema Connect (hanya field decimal) dari list (column_name, numeric_scale)"""
+    fields = []
+    for column_name, numeric_scale in numeric_columns:
+        if DECIMAL_HANDLING_MODE == 'precise':
+            fields.append({
+                'field': column_name,
+                'type': 'bytes',
+                'name': 'org.apache.kafka.connect.data.Decimal',
+                'parameters': {'scale': str(numeric_scale or 0)},
+            })
         else:
-            # Untuk nilai besar, perlu BigInteger handling
-            # Untuk sekarang, return None dan log warning
-            print(f"⚠ Warning: Decimal value terlalu besar, skip: {decimal_base64[:20]}...")
+            fields.append({'field': column_name, 'type': DECIMAL_HANDLING_MODE})
+    return {'type': 'struct', 'name': f"ods.{table}", 'fields': fields}
+
+class SchemalessDeserializer(EnvelopeDeserializer):
+    """Deserializer untuk connector dengan schemas.enable=false
+
+    Message hanya berisi payload, schema diambil dari cache per topic:
+    di-bootstrap dari file schema lokal (ODS_SINK_SCHEMA_FILE) atau dari
+    definisi tabel ODS. Message yang masih membawa envelope (mis. saat
+    migrasi connector) tetap di-handle dan schema-nya ikut mengisi cache.
+    """
+
+    name = "schemaless"
+
+    def __init__(self, json_backend="auto", schema_file=None):
+        super().__init__(json_backend)
+        self.topic_schemas = {}
+        self.schema_file = schema_file if schema_file is not None else SCHEMA_FILE
+        if self.schema_file:
+            self.load_schema_file(self.schema_file)
+
+    def load_schema_file(self, path):
+        """Load schema dari file JSON: {topic atau tabel: schema Connect}"""
+        with open(path, 'rb') as f:
+            schemas = self.loads(f.read())
+        for name, schema in schemas.items():
+            if '.' in name:
+                self.topic_schemas[name] = schema
+            else:
+                self.topic_schemas[f"{TOPIC_PREFIX}.{DATABASE_NAME}.{name}"] = schema
+        print(f"✓ Schema cache: {len(schemas)} schema dari {path}")
+
+    def bootstrap(self, conn, topics):
+        """Isi schema cache dari definisi tabel ODS untuk topic yang belum punya schema"""
+        for topic in topics:
+            if topic in self.topic_schemas:
+                continue
+            table = table_for_topic(topic)
+            self.topic_schemas[topic] = ods_decimal_schema(conn, table)
+            print(f"✓ Schema cache: {topic} dari tabel ODS {table}")
+
+    def __call__(self, topic, raw):
+        if not raw:
             return None
-    except Exception as e:
-        print(f"⚠ Warning: Gagal decode decimal {decimal_base64[:20]}...: {e}")
+        if raw.startswith(self.SCHEMA_PREFIX):
+            value = super().__call__(topic, raw)
+            if isinstance(value, dict) and 'schema' in value:
+                self.topic_schemas[topic] = value['schema']
+            return value
+        return {'schema': self.topic_schemas.get(topic), 'payload': self.loads(raw)}
+
+class AvroDeserializer:
+    """Deserializer Avro Confluent wire format (magic byte + schema id + body)
+
+    Schema di-cache per schema id: registry (HTTP atau direktori lokal, lihat
+    local_schema_registry.py) hanya ditanya sekali per id. fastavro men-decode
+    logical type (date, timestamp-millis, decimal) langsung ke date/datetime/
+    Decimal, jadi converter tidak perlu konversi format Debezium lagi.
+    """
+
+    name = "avro"
+    backend = "fastavro"
+
+    def __init__(self, json_backend="auto", registry=None):
+        if fastavro is None:
+            print("✗ Error: fastavro tidak terinstall")
+            print("  Install dengan: pip install fastavro")
+            sys.exit(1)
+        self.registry = registry if registry is not None else open_registry(SCHEMA_REGISTRY)
+        self.schemas = {}   # schema id -> (schema dict, parsed schema)
+
+    def _schema(self, schema_id):
+        entry = self.schemas.get(schema_id)
+        if entry is None:
+            schema = self.registry.get_schema(schema_id)
+            entry = (schema, fastavro.parse_schema(schema))
+            self.schemas[schema_id] = entry
+            print(f"✓ Avro schema id {schema_id} ({schema.get('name', '?')}) di-load dari registry")
+        return entry
+
+    def __call__(self, topic, raw):
+        if not raw:
+            return None
+        if len(raw) < HEADER_SIZE or raw[0] != MAGIC_BYTE:
+            raise ValueError(f"Bukan Confluent Avro wire format (magic byte {raw[0]})")
+        schema, parsed = self._schema(int.from_bytes(raw[1:HEADER_SIZE], 'big'))
+        buf = io.BytesIO(raw)
+        buf.seek(HEADER_SIZE)
+        return {'schema': schema, 'payload': fastavro.schemaless_reader(buf, parsed)}
+
+    def decode_key(self, topic, raw):
+        """Decode key Avro (schema key juga terdaftar di registry)"""
+        if not raw:
+            return None
+        return self(topic, raw)['payload']
+
+DESERIALIZERS = {
+    'envelope': EnvelopeDeserializer,
+    'json': JsonDeserializer,
+    'schemaless': SchemalessDeserializer,
+    'avro': AvroDeserializer,
+}
+
+def create_deserializer(name=DESERIALIZER, json_backend=JSON_BACKEND):
+    """Buat deserializer (topic, raw bytes) -> dict message sesuai nama"""
+    if name not in DESERIALIZERS:
+        raise ValueError(f"Deserializer tidak dikenal: {name} (pilihan: {', '.join(DESERIALIZERS)})")
+    return DESERIALIZERS[name](json_backend)
+
+def tombstone_record(deserialize, sink_table, topic, raw_key, delete_mode=None):
+    """Record delete dari tombstone (value None), atau None jika diabaikan
+
+    Dengan delete.handling.mode=rewrite, event delete (__deleted=true) sudah
+    datang sebelum tombstone-nya. Mode hard: tombstone tetap jadi delete
+    key-only (idempotent). Mode soft: tombstone diabaikan supaya row soft
+    delete tidak tertimpa record kosong.
+    """
+    if (delete_mode or DELETE_MODE) == 'soft':
+        return None
+    key = deserialize.decode_key(topic, raw_key)
+    if isinstance(key, dict):
+        key = key.get(sink_table.pk)
+    if key is None:
         return None
+    return sink_table.tombstone_record(key)
 
-def convert_customer_record(payload):
-    """Convert Debezium customer record ke format PostgreSQL"""
-    record = {}
-    
-    # Simple fields
-    record['customer_id'] = payload.get('customer_id')
-    record['nik'] = payload.get('nik')
-    record['full_name'] = payload.get('full_name')
-    record['gender'] = payload.get('gender')
-    record['marital_status'] = payload.get('marital_status')
-    record['phone_number'] = payload.get('phone_number')
-    record['email'] = payload.get('email')
-    record['address'] = payload.get('address')
-    record['city'] = payload.get('city')
-    record['province'] = payload.get('province')
-    record['postal_code'] = payload.get('postal_code')
-    record['occupation'] = payload.get('occupation')
-    record['employer_name'] = payload.get('employer_name')
-    record['employment_status'] = payload.get('employment_status')
-    record['years_of_employment'] = payload.get('years_of_employment')
-    record['education_level'] = payload.get('education_level')
-    record['emergency_contact_name'] = payload.get('emergency_contact_name')
-    record['emergency_contact_phone'] = payload.get('emergency_contact_phone')
-    record['emergency_contact_relation'] = payload.get('emergency_contact_relation')
-    record['credit_score'] = payload.get('credit_score')
-    record['customer_segment'] = payload.get('customer_segment')
-    record['status'] = payload.get('status', 'Active')
-    record['created_by'] = payload.get('created_by', 'SYSTEM')
-    record['updated_by'] = payload.get('updated_by', 'SYSTEM')
-    
-    # Convert special formats
-    record['date_of_birth'] = convert_debezium_date(payload.get('date_of_birth'))
-    record['registration_date'] = convert_debezium_timestamp(payload.get('registration_date'))
-    record['last_updated'] = convert_debezium_timestamp(payload.get('last_updated'))
-    
-    # Monthly income - decode base64 decimal
-    monthly_income = payload.get('monthly_income')
-    record['monthly_income'] = convert_debezium_decimal(monthly_income, scale=2)
-    
-    # CDC metadata
-    record['cdc_operation'] = payload.get('__op', 'r')
-    record['cdc_timestamp'] = convert_debezium_timestamp(payload.get('__source_ts_ms'))
-    
-    return record
+# ==================================================
+# DECODE POOL (multi-process)
+# ==================================================
+_decode_deserialize = None
 
-def insert_customer(conn, record):
-    """Insert customer record ke PostgreSQL"""
-    cur = conn.cursor()
-    
-    sql = """
-    INSERT INTO customers (
-        customer_id, nik, full_name, date_of_birth, gender,
-        marital_status, phone_number, email, address, city,
-        province, postal_code, occupation, employer_name, monthly_income,
-        employment_status, years_of_employment, education_level,
-        emergency_contact_name, emergency_contact_phone,
-        emergency_contact_relation, credit_score, customer_segment,
-        registration_date, last_updated, status, created_by, updated_by,
-        cdc_timestamp, cdc_operation
-    ) VALUES (
-        %(customer_id)s, %(nik)s, %(full_name)s, %(date_of_birth)s, %(gender)s,
-        %(marital_status)s, %(phone_number)s, %(email)s, %(address)s, %(city)s,
-        %(province)s, %(postal_code)s, %(occupation)s, %(employer_name)s, %(monthly_income)s,
-        %(employment_status)s, %(years_of_employment)s, %(education_level)s,
-        %(emergency_contact_name)s, %(emergency_contact_phone)s,
-        %(emergency_contact_relation)s, %(credit_score)s, %(customer_segment)s,
-        %(registration_date)s, %(last_updated)s, %(status)s, %(created_by)s, %(updated_by)s,
-        %(cdc_timestamp)s, %(cdc_operation)s
-    ) ON CONFLICT (customer_id) DO UPDATE SET
-        nik = EXCLUDED.nik,
-        full_name = EXCLUDED.full_name,
-        date_of_birth = EXCLUDED.date_of_birth,
-        gender = EXCLUDED.gender,
-        marital_status = EXCLUDED.marital_status,
-        phone_number = EXCLUDED.phone_number,
-        email = EXCLUDED.email,
-        address = EXCLUDED.address,
-        city = EXCLUDED.city,
-        province = EXCLUDED.province,
-        postal_code = EXCLUDED.postal_code,
-        occupation = EXCLUDED.occupation,
-        employer_name = EXCLUDED.employer_name,
-        monthly_income = EXCLUDED.monthly_income,
-        employment_status = EXCLUDED.employment_status,
-        years_of_employment = EXCLUDED.years_of_employment,
-        education_level = EXCLUDED.education_level,
-        emergency_contact_name = EXCLUDED.emergency_contact_name,
-        emergency_contact_phone = EXCLUDED.emergency_contact_phone,
-        emergency_contact_relation = EXCLUDED.emergency_contact_relation,
-        credit_score = EXCLUDED.credit_score,
-        customer_segment = EXCLUDED.customer_segment,
-        registration_date = EXCLUDED.registration_date,
-        last_updated = EXCLUDED.last_updated,
-        status = EXCLUDED.status,
-        updated_by = EXCLUDED.updated_by,
-        cdc_timestamp = EXCLUDED.cdc_timestamp,
-        cdc_operation = EXCLUDED.cdc_operation;
+def _init_decode_process(name, json_backend, topic_schemas):
+    """Initializer process decode: deserializer sendiri per process"""
+    global _decode_deserialize
+    # Ctrl+C ditangani process utama (yang menutup pool)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _decode_deserialize = create_deserializer(name, json_backend)
+    if topic_schemas:
+        _decode_deserialize.topic_schemas.update(topic_schemas)
+
+def decode_chunk(items):
+    """Deserialize + convert satu chunk (topic, partition, offset, raw bytes)
+
+    Item: (topic, partition, offset, timestamp, raw key, raw value).
+    Jalan di process decode. Return (rows, errors): rows berisi tuple ringkas
+    (tabel, partition, offset, timestamp, pk, values) dengan values urut column_names
+    tabel; errors berisi (tabel, partition, pesan, entry DLQ) yang di-print,
+    dihitung di metrics dan ditulis ke DLQ oleh process utama.
     """
-    
+    rows = []
+    errors = []
+    for topic, partition, offset, timestamp, raw_key, raw in items:
+        table = table_for_topic(topic)
+        sink_table = SINK_TABLES.get(table)
+        if sink_table is None:
+            continue
+        try:
+            if not raw:
+                # Tombstone: delete key-only tanpa warning
+                record = tombstone_record(_decode_deserialize, sink_table, topic, raw_key)
+                if record is not None:
+                    rows.append((table, partition, offset, timestamp, record[sink_table.pk],
+                                 tuple([record[column] for column in sink_table.column_names])))
+                continue
+            value = _decode_deserialize(topic, raw)
+            if not value or 'payload' not in value:
+                error = "tidak ada payload"
+                errors.append((table, partition, f"⚠ {topic} offset {offset}: {error}",
+                               failed_message_entry(topic, partition, offset, raw_key, raw, error)))
+                continue
+            record = sink_table.converter_for(value.get('schema'))(value['payload'])
+        except Exception as e:
+            errors.append((table, partition, f"✗ Error decode {topic} offset {offset}: {e}",
+                           failed_message_entry(topic, partition, offset, raw_key, raw, e)))
+            continue
+        key = record.get(sink_table.pk) if record else None
+        if key:
+            rows.append((table, partition, offset, timestamp, key,
+                         tuple([record[column] for column in sink_table.column_names])))
+        else:
+            error = f"record tanpa {sink_table.pk}"
+            errors.append((table, partition, f"⚠ {topic} offset {offset}: {error}",
+                           failed_message_entry(topic, partition, offset, raw_key, raw, error)))
+    return rows, errors
+
+class DecodePool:
+    """Pool process untuk deserialize + convert (CPU-bound, tidak kena GIL)
+
+    Message satu poll dibagi per chunk_size lalu di-decode paralel; hasilnya
+    tuple ringkas per row (lebih murah di-pickle daripada dict) yang di-zip
+    kembali ke record di process utama. Process dibuat dengan start method
+    spawn supaya tidak mewarisi thread Kafka / koneksi PostgreSQL.
+    """
+
+    def __init__(self, processes, chunk_size, deserialize):
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_decode_process,
+            initargs=(deserialize.name, deserialize.backend, getattr(deserialize, 'topic_schemas', None)),
+        )
+
+    def decode(self, messages):
+        """Decode list message Kafka; return (rows, errors) urut sesuai input"""
+        items = [(m.topic, m.partition, m.offset, m.timestamp, m.key, m.value) for m in messages]
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        rows = []
+        errors = []
+        for chunk_rows, chunk_errors in self.executor.map(decode_chunk, chunks):
+            rows.extend(chunk_rows)
+            errors.extend(chunk_errors)
+        return rows, errors
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+class BatchCompactor:
+    """Compaction per flush window: satu event terakhir per primary key
+
+    Event untuk key yang sama di-collapse ke versi terbaru berdasarkan offset
+    Kafka (last-writer-wins). Karena delete juga event biasa, delete selalu
+    menang atas upsert yang lebih lama untuk key tersebut. Counter events
+    (masuk) dan writes (keluar) per tabel dipakai untuk menghitung berapa
+    write ke ODS yang dihemat.
+    """
+
+    def __init__(self, tables):
+        self.pending = {table: {} for table in tables}
+        self.events = {table: 0 for table in tables}
+        self.writes = {table: 0 for table in tables}
+
+    def add(self, table, key, record, partition, offset, timestamp=None):
+        """Tambah satu event; simpan hanya jika lebih baru dari yang sudah ada
+
+        timestamp: timestamp message Kafka (ms), untuk freshness.
+        """
+        self.events[table] += 1
+        pending = self.pending[table]
+        current = pending.get(key)
+        # Debezium mem-partition berdasarkan primary key, jadi offset cukup
+        # untuk urutan; jika partition berbeda, event yang datang terakhir menang
+        if current is None or current[0] != partition or offset > current[1]:
+            pending[key] = (partition, offset, record, timestamp)
+
+    def __len__(self):
+        return sum(len(pending) for pending in self.pending.values())
+
+    def drain(self, with_sources=False):
+        """Ambil hasil compaction (dict tabel -> {pk: record}) lalu reset window
+
+        Dengan with_sources, return (batch, sources) dengan sources berisi
+        tabel -> {pk: (partition, offset, timestamp)} event yang menang
+        (untuk DLQ dan freshness).
+        """
+        batch = {}
+        sources = {}
+        for table, pending in self.pending.items():
+            batch[table] = {key: item[2] for key, item in pending.items()}
+            if with_sources:
+                sources[table] = {key: (item[0], item[1], item[3]) for key, item in pending.items()}
+            self.writes[table] += len(pending)
+            self.pending[table] = {}
+        if with_sources:
+            return batch, sources
+        return batch
+
+    def stats(self):
+        """Counter compaction kumulatif per tabel: events, writes, saved"""
+        return {
+            table: {
+                'events': self.events[table],
+                'writes': self.writes[table],
+                'saved': self.events[table] - self.writes[table],
+            }
+            for table in self.events
+        }
+
+    def saved_total(self):
+        return sum(self.events.values()) - sum(self.writes.values())
+
+def _copy_text_value(value):
+    """Format satu value untuk COPY text format (NULL = \\N, escape tab/newline)"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class SnapshotLoader:
+    """COPY-based bulk load untuk initial snapshot Debezium (__op = 'r')
+
+    Record snapshot di-COPY ke unlogged staging table per tabel ODS, lalu
+    di-merge dengan satu INSERT ... SELECT ... ON CONFLICT. Semua langkah
+    berjalan di transaksi batch milik caller, jadi offset Kafka tetap hanya
+    di-commit setelah data masuk ke tabel ODS. Snapshot mode dimulai setelah
+    tabel menerima min_rows row 'r' berturut-turut (sebelum itu row 'r' lewat
+    upsert biasa), dan berakhir saat batch tabel tersebut tidak lagi berisi
+    row 'r' (fase snapshot selesai): staging table di-drop dan tabel kembali
+    ke upsert path biasa. State (active_tables, seen_rows) disimpan oleh
+    begin() dan dipulihkan oleh rollback() jika transaksi batch gagal, jadi
+    DROP yang di-rollback atau batch yang di-retry tidak mengubah state.
+    """
+
+    def __init__(self, suffix="", min_rows=SNAPSHOT_MIN_ROWS):
+        # suffix membedakan staging table antar apply worker paralel
+        self.suffix = suffix
+        self.min_rows = min_rows
+        self.active_tables = set()
+        self.seen_rows = {}  # tabel -> jumlah row 'r' berturut-turut sebelum snapshot mode
+        self.saved = None
+
+    def begin(self):
+        """Simpan state sebelum transaksi batch (dipulihkan oleh rollback)"""
+        self.saved = (set(self.active_tables), dict(self.seen_rows))
+
+    def rollback(self):
+        """Transaksi batch di-rollback: kembalikan state ke saat begin()"""
+        if self.saved is not None:
+            self.active_tables, self.seen_rows = self.saved
+            self.saved = None
+
+    @property
+    def active(self):
+        return bool(self.active_tables)
+
+    def stage_table(self, table):
+        return f"{STAGING_TABLE_PREFIX}{table}{self.suffix}"
+
+    def wants(self, table, count):
+        """True jika count row 'r' batch ini di-load via COPY (snapshot mode)"""
+        if table in self.active_tables:
+            return True
+        seen = self.seen_rows[table] = self.seen_rows.get(table, 0) + count
+        return seen >= self.min_rows
+
+    def end(self, cur, table):
+        """Batch tabel tanpa row 'r': reset hitungan, akhiri snapshot mode jika aktif"""
+        self.seen_rows.pop(table, None)
+        if table in self.active_tables:
+            self.finish(cur, table)
+
+    def load(self, cur, table, records):
+        """COPY records ke staging table lalu merge ke tabel ODS"""
+        sink_table = SINK_TABLES[table]
+        stage = self.stage_table(table)
+        col_list = ", ".join(sink_table.column_names)
+        if table not in self.active_tables:
+            print(f"✓ Snapshot mode untuk {table}: COPY via {stage}")
+        cur.execute(f"CREATE UNLOGGED TABLE IF NOT EXISTS {stage} (LIKE {table} INCLUDING DEFAULTS)")
+        cur.execute(f"TRUNCATE {stage}")
+        buf = io.StringIO()
+        for record in records:
+            buf.write('\t'.join(_copy_text_value(record.get(col)) for col in sink_table.column_names))
+            buf.write('\n')
+        buf.seek(0)
+        cur.copy_expert(f"COPY {stage} ({col_list}) FROM STDIN", buf)
+        cur.execute(f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {stage}\n    {sink_table.conflict_sql}")
+        self.active_tables.add(table)
+
+    def finish(self, cur, table):
+        """Akhiri snapshot mode untuk satu tabel (drop staging table)"""
+        cur.execute(f"DROP TABLE IF EXISTS {self.stage_table(table)}")
+        self.active_tables.discard(table)
+        print(f"✓ Snapshot {table} selesai, kembali ke upsert path")
+
+    def close(self, conn):
+        """Drop semua staging table yang masih ada (dipanggil saat shutdown)"""
+        if not self.active_tables:
+            return
+        cur = conn.cursor()
+        self.begin()
+        try:
+            for table in list(self.active_tables):
+                self.finish(cur, table)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.rollback()
+            print(f"⚠ Warning: Gagal drop staging table: {e}")
+        finally:
+            cur.close()
+
+# ==================================================
+# POSTGRESQL CONNECTION POOL
+# ==================================================
+def prepare_statements(conn):
+    """PREPARE statement upsert dan delete semua tabel di satu koneksi"""
+    cur = conn.cursor()
     try:
-        cur.execute(sql, record)
+        for sink_table in SINK_TABLES.values():
+            cur.execute(sink_table.prepare_sql)
+            cur.execute(sink_table.prepare_delete_sql)
         conn.commit()
-        return True
-    except Exception as e:
-        conn.rollback()
-        print(f"✗ Error inserting customer {record.get('customer_id')}: {e}")
-        return False
     finally:
         cur.close()
 
-def convert_credit_application_record(payload):
-    """Convert Debezium credit_application record ke format PostgreSQL"""
-    record = {}
-    
-    # Simple fields
-    record['application_id'] = payload.get('application_id')
-    record['customer_id'] = payload.get('customer_id')
-    record['vehicle_type'] = payload.get('vehicle_type')
-    record['vehicle_brand'] = payload.get('vehicle_brand')
-    record['vehicle_model'] = payload.get('vehicle_model')
-    record['vehicle_year'] = payload.get('vehicle_year')
-    record['tenor_months'] = payload.get('tenor_months')
-    record['application_status'] = payload.get('application_status')
-    record['rejection_reason'] = payload.get('rejection_reason')
-    record['payment_status'] = payload.get('payment_status', 'Current')
-    record['collateral_status'] = payload.get('collateral_status', 'Held')
-    record['notes'] = payload.get('notes')
-    record['processed_by'] = payload.get('processed_by')
-    record['approved_by'] = payload.get('approved_by')
-    
-    # Convert timestamps
-    record['application_date'] = convert_debezium_timestamp(payload.get('application_date'))
-    record['approval_date'] = convert_debezium_timestamp(payload.get('approval_date'))
-    record['created_date'] = convert_debezium_timestamp(payload.get('created_date'))
-    
-    # Convert dates (epoch days) - jika None, tetap None
-    disbursement_date = payload.get('disbursement_date')
-    record['disbursement_date'] = convert_debezium_date(disbursement_date) if disbursement_date else None
-    
-    first_installment_date = payload.get('first_installment_date')
-    record['first_installment_date'] = convert_debezium_date(first_installment_date) if first_installment_date else None
-    
-    last_payment_date = payload.get('last_payment_date')
-    record['last_payment_date'] = convert_debezium_date(last_payment_date) if last_payment_date else None
-    
-    # Convert decimals
-    record['vehicle_price'] = convert_debezium_decimal(payload.get('vehicle_price'), scale=2)
-    record['down_payment'] = convert_debezium_decimal(payload.get('down_payment'), scale=2)
-    record['loan_amount'] = convert_debezium_decimal(payload.get('loan_amount'), scale=2)
-    record['interest_rate'] = convert_debezium_decimal(payload.get('interest_rate'), scale=2)
-    record['monthly_installment'] = convert_debezium_decimal(payload.get('monthly_installment'), scale=2)
-    record['outstanding_amount'] = convert_debezium_decimal(payload.get('outstanding_amount'), scale=2)
-    
-    # CDC metadata
-    record['cdc_operation'] = payload.get('__op', 'r')
-    record['cdc_timestamp'] = convert_debezium_timestamp(payload.get('__source_ts_ms'))
-    
-    return record
+def connection_errors():
+    """Exception psycopg2 yang berarti koneksi putus (bukan error data)"""
+    return (psycopg2.OperationalError, psycopg2.InterfaceError)
 
-def insert_credit_application(conn, record):
-    """Insert credit_application record ke PostgreSQL"""
-    cur = conn.cursor()
-    
-    # Handle None values untuk timestamps
-    if record.get('approval_date') is None:
-        record['approval_date'] = None
-    if record.get('created_date') is None:
-        record['created_date'] = None
-    
-    sql = """
-    INSERT INTO credit_applications (
-        application_id, customer_id, application_date, vehicle_type, vehicle_brand,
-        vehicle_model, vehicle_year, vehicle_price, down_payment, loan_amount,
-        tenor_months, interest_rate, monthly_installment, application_status,
-        approval_date, rejection_reason, disbursement_date, first_installment_date,
-        last_payment_date, outstanding_amount, payment_status, collateral_status,
-        notes, processed_by, approved_by, created_date, cdc_timestamp, cdc_operation
-    ) VALUES (
-        %(application_id)s, %(customer_id)s, %(application_date)s, %(vehicle_type)s, %(vehicle_brand)s,
-        %(vehicle_model)s, %(vehicle_year)s, %(vehicle_price)s, %(down_payment)s, %(loan_amount)s,
-        %(tenor_months)s, %(interest_rate)s, %(monthly_installment)s, %(application_status)s,
-        %(approval_date)s, %(rejection_reason)s, %(disbursement_date)s, %(first_installment_date)s,
-        %(last_payment_date)s, %(outstanding_amount)s, %(payment_status)s, %(collateral_status)s,
-        %(notes)s, %(processed_by)s, %(approved_by)s, %(created_date)s, %(cdc_timestamp)s, %(cdc_operation)s
-    ) ON CONFLICT (application_id) DO UPDATE SET
-        customer_id = EXCLUDED.customer_id,
-        application_date = EXCLUDED.application_date,
-        vehicle_type = EXCLUDED.vehicle_type,
-        vehicle_brand = EXCLUDED.vehicle_brand,
-        vehicle_model = EXCLUDED.vehicle_model,
-        vehicle_year = EXCLUDED.vehicle_year,
-        vehicle_price = EXCLUDED.vehicle_price,
-        down_payment = EXCLUDED.down_payment,
-        loan_amount = EXCLUDED.loan_amount,
-        tenor_months = EXCLUDED.tenor_months,
-        interest_rate = EXCLUDED.interest_rate,
-        monthly_installment = EXCLUDED.monthly_installment,
-        application_status = EXCLUDED.application_status,
-        approval_date = EXCLUDED.approval_date,
-        rejection_reason = EXCLUDED.rejection_reason,
-        disbursement_date = EXCLUDED.disbursement_date,
-        first_installment_date = EXCLUDED.first_installment_date,
-        last_payment_date = EXCLUDED.last_payment_date,
-        outstanding_amount = EXCLUDED.outstanding_amount,
-        payment_status = EXCLUDED.payment_status,
-        collateral_status = EXCLUDED.collateral_status,
-        notes = EXCLUDED.notes,
-        processed_by = EXCLUDED.processed_by,
-        approved_by = EXCLUDED.approved_by,
-        created_date = EXCLUDED.created_date,
-        cdc_timestamp = EXCLUDED.cdc_timestamp,
-        cdc_operation = EXCLUDED.cdc_operation;
+# SQLSTATE transient: class 40 (40001 serialization_failure, 40P01 deadlock_detected),
+# 55P03 lock_not_available, 57014 query_canceled (statement_timeout)
+TRANSIENT_SQLSTATES = ('55P03', '57014')
+# SQLSTATE error data: class 22 (data_exception), 23 (integrity_constraint_violation)
+DATA_ERROR_CLASSES = ('22', '23')
+
+def error_sqlstate(error):
+    """SQLSTATE exception psycopg2 (pgcode) atau asyncpg (sqlstate); None jika bukan error server"""
+    return getattr(error, 'pgcode', None) or getattr(error, 'sqlstate', None)
+
+def is_transient_error(error):
+    """Error yang hilang jika transaksi diulang (deadlock, serialization, timeout)"""
+    sqlstate = error_sqlstate(error) or ''
+    return sqlstate.startswith('40') or sqlstate in TRANSIENT_SQLSTATES
+
+def is_data_error(error):
+    """Error karena isi record: SQLSTATE class 22/23, atau value yang ditolak
+    driver sebelum dikirim (mis. karakter NUL di string). Hanya error ini yang
+    di-bisection ke DLQ; error lain (schema, permission, bug) di-raise.
     """
-    
+    sqlstate = error_sqlstate(error)
+    if sqlstate is None:
+        return isinstance(error, (ValueError, TypeError))
+    return sqlstate[:2] in DATA_ERROR_CLASSES
+
+class OdsConnectionPool:
+    """Pool koneksi PostgreSQL terbatas, dipakai bersama semua apply worker
+
+    getconn() menunggu jika semua koneksi sedang dipakai (bukan error seperti
+    ThreadedConnectionPool). Setiap koneksi baru langsung di-PREPARE sekali.
+    Koneksi yang putus dikembalikan dengan discard() dan diganti koneksi baru
+    pada getconn() berikutnya.
+
+    minconn = maxconn: putconn() ThreadedConnectionPool menutup koneksi idle
+    di atas minconn, jadi dengan minconn lebih kecil setiap batch worker
+    paralel membuka koneksi baru dan PREPARE ulang. Status prepared disimpan
+    per object koneksi (WeakSet), bukan id(), karena id koneksi yang sudah
+    ditutup bisa dipakai ulang oleh koneksi baru yang belum di-PREPARE.
+    """
+
+    def __init__(self, maxconn, config=None):
+        self.maxconn = maxconn
+        self.pool = ThreadedConnectionPool(maxconn, maxconn, **(config or PG_CONFIG))
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.prepared = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        self.slots.acquire()
+        try:
+            conn = self.pool.getconn()
+            with self.lock:
+                new = conn not in self.prepared
+            if new:
+                try:
+                    prepare_statements(conn)
+                except Exception:
+                    self.pool.putconn(conn, close=True)
+                    raise
+                with self.lock:
+                    self.prepared.add(conn)
+            return conn
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            self.pool.putconn(conn)
+        finally:
+            self.slots.release()
+
+    def discard(self, conn):
+        """Buang koneksi rusak (mis. setelah failover) dari pool"""
+        with self.lock:
+            self.prepared.discard(conn)
+        try:
+            self.pool.putconn(conn, close=True)
+        except Exception:
+            pass
+        finally:
+            self.slots.release()
+
+    def getconn_retry(self, name="sink"):
+        """getconn() dengan retry + backoff selama PostgreSQL belum bisa di-connect"""
+        for attempt in range(1, PG_RECONNECT_ATTEMPTS + 1):
+            try:
+                return self.getconn()
+            except connection_errors() as e:
+                if attempt == PG_RECONNECT_ATTEMPTS:
+                    raise
+                wait = min(2 ** (attempt - 1), PG_RECONNECT_MAX_BACKOFF)
+                print(f"⚠ [{name}] Gagal connect ke PostgreSQL ({e}), retry {attempt} dalam {wait:.0f} detik...")
+                time.sleep(wait)
+
+    def closeall(self):
+        self.pool.closeall()
+
+# ==================================================
+# OFFSET CHECKPOINT (ODS)
+# ==================================================
+CHECKPOINT_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+        consumer_group TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        partition INTEGER NOT NULL,
+        next_offset BIGINT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (consumer_group, topic, partition)
+    )
+"""
+
+CHECKPOINT_UPSERT_SQL = f"""
+    INSERT INTO {CHECKPOINT_TABLE} (consumer_group, topic, partition, next_offset, updated_at)
+    VALUES %s
+    ON CONFLICT (consumer_group, topic, partition) DO UPDATE SET
+        next_offset = EXCLUDED.next_offset,
+        updated_at = EXCLUDED.updated_at
+"""
+
+def ensure_checkpoint_table(conn):
+    """Buat tabel checkpoint offset jika belum ada (deployment lama)"""
+    cur = conn.cursor()
     try:
-        cur.execute(sql, record)
+        cur.execute(CHECKPOINT_DDL)
         conn.commit()
-        return True
-    except Exception as e:
-        conn.rollback()
-        app_id = record.get('application_id', 'UNKNOWN')
-        print(f"✗ Error inserting credit_application {app_id}: {e}")
-        # Print record untuk debugging (hanya untuk beberapa error pertama)
-        if 'application_id' in record and record['application_id']:
-            print(f"  Record: application_id={record.get('application_id')}, customer_id={record.get('customer_id')}")
-            print(f"  application_date={record.get('application_date')}, approval_date={record.get('approval_date')}")
-        return False
     finally:
         cur.close()
 
-def convert_vehicle_ownership_record(payload):
-    """Convert Debezium vehicle_ownership record ke format PostgreSQL"""
-    record = {}
-    
-    # Simple fields
-    record['ownership_id'] = payload.get('ownership_id')
-    record['customer_id'] = payload.get('customer_id')
-    record['vehicle_type'] = payload.get('vehicle_type')
-    record['brand'] = payload.get('brand')
-    record['model'] = payload.get('model')
-    record['year'] = payload.get('year')
-    record['ownership_status'] = payload.get('ownership_status')
-    record['registration_number'] = payload.get('registration_number')
-    record['chassis_number'] = payload.get('chassis_number')
-    record['engine_number'] = payload.get('engine_number')
-    
-    # Convert special formats
-    record['vehicle_price'] = convert_debezium_decimal(payload.get('vehicle_price'), scale=2)
-    record['purchase_date'] = convert_debezium_date(payload.get('purchase_date'))
-    record['created_date'] = convert_debezium_timestamp(payload.get('created_date'))
-    
-    # CDC metadata
-    record['cdc_operation'] = payload.get('__op', 'r')
-    record['cdc_timestamp'] = convert_debezium_timestamp(payload.get('__source_ts_ms'))
-    
-    return record
-
-def insert_vehicle_ownership(conn, record):
-    """Insert vehicle_ownership record ke PostgreSQL"""
+def load_checkpoints(conn, group_id):
+    """Load checkpoint offset group: dict (topic, partition) -> next_offset"""
     cur = conn.cursor()
-    
-    # Handle None values
-    if record.get('created_date') is None:
-        record['created_date'] = None
-    
-    sql = """
-    INSERT INTO vehicle_ownership (
-        ownership_id, customer_id, vehicle_type, brand, model,
-        year, vehicle_price, purchase_date, ownership_status,
-        registration_number, chassis_number, engine_number,
-        created_date, cdc_timestamp, cdc_operation
-    ) VALUES (
-        %(ownership_id)s, %(customer_id)s, %(vehicle_type)s, %(brand)s, %(model)s,
-        %(year)s, %(vehicle_price)s, %(purchase_date)s, %(ownership_status)s,
-        %(registration_number)s, %(chassis_number)s, %(engine_number)s,
-        %(created_date)s, %(cdc_timestamp)s, %(cdc_operation)s
-    ) ON CONFLICT (ownership_id) DO UPDATE SET
-        customer_id = EXCLUDED.customer_id,
-        vehicle_type = EXCLUDED.vehicle_type,
-        brand = EXCLUDED.brand,
-        model = EXCLUDED.model,
-        year = EXCLUDED.year,
-        vehicle_price = EXCLUDED.vehicle_price,
-        purchase_date = EXCLUDED.purchase_date,
-        ownership_status = EXCLUDED.ownership_status,
-        registration_number = EXCLUDED.registration_number,
-        chassis_number = EXCLUDED.chassis_number,
-        engine_number = EXCLUDED.engine_number,
-        created_date = EXCLUDED.created_date,
-        cdc_timestamp = EXCLUDED.cdc_timestamp,
-        cdc_operation = EXCLUDED.cdc_operation;
+    try:
+        cur.execute(
+            f"SELECT topic, partition, next_offset FROM {CHECKPOINT_TABLE} WHERE consumer_group = %s",
+            (group_id,)
+        )
+        return {(topic, partition): next_offset for topic, partition, next_offset in cur.fetchall()}
+    finally:
+        conn.commit()
+        cur.close()
+
+def save_checkpoints(cur, group_id, offsets):
+    """Upsert checkpoint offset (dict (topic, partition) -> next_offset) di transaksi caller"""
+    if not offsets:
+        return
+    now = datetime.now()
+    execute_values(cur, CHECKPOINT_UPSERT_SQL, [
+        (group_id, topic, partition, next_offset, now)
+        for (topic, partition), next_offset in offsets.items()
+    ])
+
+# ==================================================
+# DEAD-LETTER QUEUE
+# ==================================================
+def _dlq_json_default(value):
+    """Value record yang tidak native JSON: date/datetime ISO, Decimal string exact"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa ditulis ke DLQ")
+
+def dead_letter_entry(table, key, record, source, error, group_id=None):
+    """Entry DLQ untuk satu record: posisi Kafka, error, dan record hasil convert"""
+    partition, offset = source[:2] if source else (None, None)
+    return {
+        'topic': topic_for_table(table),
+        'partition': partition,
+        'offset': offset,
+        'table': table,
+        'key': key,
+        'group_id': group_id,
+        'error': str(error).strip(),
+        'failed_at': datetime.now().isoformat(),
+        'record': record,
+    }
+
+def failed_message_entry(topic, partition, offset, raw_key, raw_value, error, group_id=None):
+    """Entry DLQ untuk message yang gagal deserialize / convert (belum jadi record)
+
+    record None; key dan value Kafka disimpan apa adanya: raw_key / raw_value
+    (string UTF-8) atau raw_key_b64 / raw_value_b64 untuk data biner (Avro),
+    supaya replay_dlq.py bisa decode ulang setelah penyebabnya diperbaiki.
     """
-    
+    entry = {
+        'topic': topic,
+        'partition': partition,
+        'offset': offset,
+        'table': table_for_topic(topic),
+        'key': None,
+        'group_id': group_id,
+        'error': str(error).strip(),
+        'failed_at': datetime.now().isoformat(),
+        'record': None,
+    }
+    for field, raw in (('raw_key', raw_key), ('raw_value', raw_value)):
+        if raw is None:
+            entry[field] = None
+            continue
+        try:
+            entry[field] = bytes(raw).decode('utf-8')
+        except UnicodeDecodeError:
+            entry[f"{field}_b64"] = base64.b64encode(raw).decode('ascii')
+    if entry.get('raw_key') is not None:
+        entry['key'] = entry['raw_key']
+    return entry
+
+def failed_message_raw(entry):
+    """(raw key, raw value) bytes dari entry failed_message_entry"""
+    raw = []
+    for field in ('raw_key', 'raw_value'):
+        if entry.get(f"{field}_b64") is not None:
+            raw.append(base64.b64decode(entry[f"{field}_b64"]))
+        elif entry.get(field) is not None:
+            raw.append(entry[field].encode('utf-8'))
+        else:
+            raw.append(None)
+    return tuple(raw)
+
+# Parser value JSON DLQ kembali ke tipe Python per tipe logical kolom
+_DLQ_RESTORE = {
+    DATE: date.fromisoformat,
+    TIMESTAMP: datetime.fromisoformat,
+    DECIMAL: Decimal,
+}
+
+def restore_dead_letter_record(entry):
+    """Record dari entry DLQ dengan tipe asli (date/datetime/Decimal) per kolom tabel"""
+    sink_table = SINK_TABLES[entry['table']]
+    record = entry['record']
+    restored = {}
+    for column in sink_table.columns:
+        value = record.get(column.name)
+        restore = _DLQ_RESTORE.get(column.type)
+        restored[column.name] = value if value is None or restore is None else restore(value)
+    return restored
+
+class FileDeadLetterQueue:
+    """DLQ file JSONL lokal: satu entry per baris, append + fsync per write"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.location = self.path
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, entries):
+        lines = "".join(json.dumps(entry, default=_dlq_json_default, ensure_ascii=False) + "\n"
+                        for entry in entries)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.count += len(entries)
+
+    def read(self):
+        """Iterasi semua entry di file DLQ (kosong jika file belum ada)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def close(self):
+        pass
+
+class KafkaDeadLetterQueue:
+    """DLQ topic Kafka: entry JSON dengan key = primary key record
+
+    write() baru return setelah semua entry di-ack broker (acks=all), jadi
+    checkpoint offset tidak pernah melewati record yang belum masuk DLQ.
+    """
+
+    def __init__(self, topic):
+        from kafka import KafkaProducer
+        self.topic = topic
+        self.location = f"kafka:{topic}"
+        self.producer = KafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, acks='all')
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, entries):
+        with self.lock:
+            futures = [
+                self.producer.send(
+                    self.topic,
+                    key=str(entry['key']).encode('utf-8'),
+                    value=json.dumps(entry, default=_dlq_json_default, ensure_ascii=False).encode('utf-8'),
+                )
+                for entry in entries
+            ]
+            self.producer.flush()
+            for future in futures:
+                future.get()
+            self.count += len(entries)
+
+    def read(self, idle_timeout_ms=5000):
+        """Iterasi entry DLQ topic dari awal sampai tidak ada message baru"""
+        consumer = KafkaConsumer(
+            self.topic,
+            bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+            auto_offset_reset='earliest',
+            enable_auto_commit=False,
+            consumer_timeout_ms=idle_timeout_ms,
+        )
+        try:
+            for message in consumer:
+                if message.value:
+                    yield json.loads(message.value)
+        finally:
+            consumer.close()
+
+    def close(self):
+        self.producer.close()
+
+def open_dead_letter(location=None):
+    """DLQ dari kafka:<topic> atau path file JSONL lokal"""
+    location = location or DLQ_LOCATION
+    if location.startswith("kafka:"):
+        return KafkaDeadLetterQueue(location[len("kafka:"):])
+    return FileDeadLetterQueue(location)
+
+def write_batch(conn, batch, snapshot=None, group_id=None, offsets=None):
+    """Tulis satu batch (dict tabel -> {pk: record}) ke PostgreSQL dalam satu transaksi
+
+    Semua tabel di-upsert dengan multi-row INSERT ... ON CONFLICT lalu di-commit
+    sekali. Record delete (cdc_operation 'd') di-DELETE set-based per tabel
+    (DELETE_MODE hard) atau ikut di-upsert sebagai soft delete. Jika snapshot (SnapshotLoader) diberikan, record dengan
+    cdc_operation 'r' di-load via COPY + merge terlebih dahulu selama tabel
+    dalam snapshot mode (SnapshotLoader.wants). Jika offsets
+    diberikan, checkpoint offset ikut ditulis di transaksi yang sama sehingga
+    data dan posisi Kafka selalu konsisten (exactly-once apply). Jika gagal,
+    transaksi dan state snapshot di-rollback lalu exception di-raise ulang.
+    Return dict tabel -> jumlah record yang ditulis.
+    """
+    written = {}
+    cur = conn.cursor()
+    if snapshot is not None:
+        snapshot.begin()
     try:
-        cur.execute(sql, record)
+        for table, records in batch.items():
+            if not records:
+                continue
+            started = time.perf_counter()
+            rows = list(records.values())
+            if DELETE_MODE == 'hard':
+                # Delete set-based: satu DELETE ... = ANY(...) per tabel per batch
+                deletes = [r for r in rows if r.get('cdc_operation') == 'd']
+                if deletes:
+                    rows = [r for r in rows if r.get('cdc_operation') != 'd']
+                    pk = SINK_TABLES[table].pk
+                    SINK_TABLES[table].delete(cur, [r[pk] for r in deletes])
+            if snapshot is not None:
+                snapshot_rows = [r for r in rows if r.get('cdc_operation') == 'r']
+                if not snapshot_rows:
+                    snapshot.end(cur, table)
+                elif snapshot.wants(table, len(snapshot_rows)):
+                    rows = [r for r in rows if r.get('cdc_operation') != 'r']
+                    snapshot.load(cur, table, snapshot_rows)
+            if rows:
+                SINK_TABLES[table].upsert(cur, rows)
+            written[table] = len(records)
+            WRITE_SECONDS.observe((table,), time.perf_counter() - started)
+            BATCH_RECORDS.observe((table,), len(records))
+        started = time.perf_counter()
+        if group_id is not None:
+            save_checkpoints(cur, group_id, offsets)
         conn.commit()
-        return True
-    except Exception as e:
+        COMMIT_SECONDS.observe((), time.perf_counter() - started)
+        return written
+    except Exception:
         conn.rollback()
-        own_id = record.get('ownership_id', 'UNKNOWN')
-        print(f"✗ Error inserting vehicle_ownership {own_id}: {e}")
-        # Print record untuk debugging (hanya untuk beberapa error pertama)
-        if 'ownership_id' in record and record['ownership_id']:
-            print(f"  Record: ownership_id={record.get('ownership_id')}, customer_id={record.get('customer_id')}")
-            print(f"  purchase_date={record.get('purchase_date')}, created_date={record.get('created_date')}")
-        return False
+        if snapshot is not None:
+            snapshot.rollback()
+        raise
     finally:
         cur.close()
 
-def main():
+def write_batch_retry(conn, batch, snapshot=None, group_id=None, offsets=None, name="sink"):
+    """write_batch dengan retry untuk error transient (is_transient_error)
+
+    Transaksi yang gagal sudah di-rollback write_batch, jadi seluruh batch +
+    checkpoint aman ditulis ulang. Setelah PG_TRANSIENT_RETRIES kali retry,
+    atau untuk error lain, exception di-raise ulang.
+    """
+    for attempt in range(1, PG_TRANSIENT_RETRIES + 2):
+        try:
+            return write_batch(conn, batch, snapshot, group_id, offsets)
+        except Exception as e:
+            if attempt > PG_TRANSIENT_RETRIES or not is_transient_error(e):
+                raise
+            wait = min(0.5 * 2 ** (attempt - 1), PG_RECONNECT_MAX_BACKOFF)
+            print(f"⚠ [{name}] Error transient PostgreSQL ({error_sqlstate(e)}), "
+                  f"ulang batch {attempt} dalam {wait:.1f} detik: {e}")
+            time.sleep(wait)
+
+def batch_of_items(items):
+    """List (tabel, pk, record) -> batch dict tabel -> {pk: record}"""
+    batch = {}
+    for table, key, record in items:
+        batch.setdefault(table, {})[key] = record
+    return batch
+
+def write_batch_bisect(conn, batch, error, dead_letter, sources=None, group_id=None, offsets=None):
+    """Fallback setelah write_batch gagal: bisection untuk mengisolasi record rusak
+
+    Batch yang gagal dibelah dua berulang kali; setiap bagian yang berhasil
+    di-commit dalam satu transaksi, jadi record sehat tetap ditulis per batch
+    (log2 transaksi tambahan, bukan satu per row). Record yang tetap gagal
+    sendirian ditulis ke dead_letter bersama topic, partition, offset (dari
+    sources) dan error-nya. Key unik per batch (hasil compaction), jadi urutan
+    commit antar bagian tidak berpengaruh. Checkpoint offset ditulis setelah
+    DLQ di-flush (at-least-once; upsert idempotent). Bagian yang kena error
+    transient ditulis ulang (write_batch_retry). Koneksi putus dan error
+    selain error data (is_data_error) di-raise ulang supaya record sehat
+    tidak masuk DLQ.
+    Return (dict tabel -> jumlah record yang ditulis, set (tabel, pk) yang
+    masuk DLQ).
+    """
+    sources = sources or {}
+    ERRORS_TOTAL.inc(('', '', 'write'))
+    items = [(table, key, record) for table, records in batch.items() for key, record in records.items()]
+    written = {}
+    dead = []
+    failed = [(items, error)]
+    while failed:
+        part, part_error = failed.pop()
+        if len(part) == 1:
+            table, key, record = part[0]
+            dead.append(dead_letter_entry(table, key, record, sources.get(table, {}).get(key),
+                                          part_error, group_id))
+            continue
+        mid = len(part) // 2
+        for half in (part[:mid], part[mid:]):
+            try:
+                for table, n in write_batch_retry(conn, batch_of_items(half)).items():
+                    written[table] = written.get(table, 0) + n
+            except connection_errors():
+                raise
+            except Exception as e:
+                if not is_data_error(e):
+                    raise
+                failed.append((half, e))
+    if dead:
+        # DLQ harus durable sebelum checkpoint melewati offset record tersebut
+        dead_letter.write(dead)
+        for entry in dead:
+            ERRORS_TOTAL.inc((entry['table'], '' if entry['partition'] is None else entry['partition'], 'dlq'))
+        for entry in dead[:5]:
+            print(f"✗ DLQ {entry['table']} {entry['key']} ({entry['topic']}[{entry['partition']}] "
+                  f"offset {entry['offset']}): {entry['error']}")
+        if len(dead) > 5:
+            print(f"⚠ ... {len(dead) - 5} record lain di batch ini masuk DLQ")
+    if group_id is not None and offsets:
+        cur = conn.cursor()
+        try:
+            save_checkpoints(cur, group_id, offsets)
+            conn.commit()
+        except connection_errors():
+            raise
+        except Exception as e:
+            conn.rollback()
+            print(f"✗ Error menyimpan checkpoint offset: {e}")
+        finally:
+            cur.close()
+    return written, {(entry['table'], entry['key']) for entry in dead}
+
+# ==================================================
+# FRESHNESS
+# ==================================================
+def observe_freshness(batch, sources, committed_at=None, exclude=None):
+    """Catat freshness record yang baru di-commit ke ODS per tabel/partition
+
+    Per record: commit MySQL (cdc_timestamp dari __source_ts_ms) -> append
+    Kafka (timestamp message), Kafka -> commit ODS, dan end-to-end. Diukur
+    pada record hasil compaction, yaitu versi yang terlihat di ODS. Value
+    dikumpulkan per (tabel, partition) lalu dimasukkan ke histogram sekali;
+    selisih negatif (clock skew antar host) dicatat sebagai 0. exclude: set
+    (tabel, pk) yang tidak ter-commit (masuk DLQ), tidak ikut diukur.
+    """
+    committed_at = committed_at or time.time()
+    for table, records in batch.items():
+        table_sources = sources.get(table)
+        if not records or not table_sources:
+            continue
+        samples = {}       # partition -> (source_to_kafka, kafka_to_ods, source_to_ods)
+        last_source = {}   # partition -> commit MySQL terbaru (epoch detik)
+        for key, record in records.items():
+            source = table_sources.get(key)
+            if source is None or (exclude and (table, key) in exclude):
+                continue
+            partition, _, kafka_ms = source
+            sample = samples.get(partition)
+            if sample is None:
+                sample = samples[partition] = ([], [], [])
+            source_dt = record.get('cdc_timestamp')
+            source_at = source_dt.timestamp() if source_dt is not None else None
+            kafka_at = kafka_ms / 1000 if kafka_ms is not None and kafka_ms >= 0 else None
+            if source_at is not None:
+                sample[2].append(max(0.0, committed_at - source_at))
+                if source_at > last_source.get(partition, 0.0):
+                    last_source[partition] = source_at
+                if kafka_at is not None:
+                    sample[0].append(max(0.0, kafka_at - source_at))
+            if kafka_at is not None:
+                sample[1].append(max(0.0, committed_at - kafka_at))
+        for partition, (source_to_kafka, kafka_to_ods, source_to_ods) in samples.items():
+            FRESHNESS_SECONDS.observe_many((table, partition, 'source_to_kafka'), source_to_kafka)
+            FRESHNESS_SECONDS.observe_many((table, partition, 'kafka_to_ods'), kafka_to_ods)
+            FRESHNESS_SECONDS.observe_many((table, partition, 'source_to_ods'), source_to_ods)
+        for partition, source_at in last_source.items():
+            LAST_SOURCE_TIMESTAMP.set((table, partition), source_at)
+
+def print_freshness_stats():
+    """Print ringkasan freshness per tabel (p50/p99 dari histogram)"""
+    def fmt(seconds):
+        return "-" if seconds is None else f"{seconds:.2f}s"
+    lines = []
+    for table in SINK_TABLES:
+        p50 = FRESHNESS_SECONDS.quantile(0.5, table=table, stage='source_to_ods')
+        if p50 is None:
+            continue
+        line = (f"  - {table}: p50 {fmt(p50)}, "
+                f"p99 {fmt(FRESHNESS_SECONDS.quantile(0.99, table=table, stage='source_to_ods'))} "
+                f"(source->kafka p99 {fmt(FRESHNESS_SECONDS.quantile(0.99, table=table, stage='source_to_kafka'))}, "
+                f"kafka->ODS p99 {fmt(FRESHNESS_SECONDS.quantile(0.99, table=table, stage='kafka_to_ods'))})")
+        if FRESHNESS_SLA_MS > 0:
+            within = FRESHNESS_SECONDS.fraction_le(FRESHNESS_SLA_MS / 1000, table=table, stage='source_to_ods')
+            line += f", {within * 100:.2f}% dalam SLA {FRESHNESS_SLA_MS} ms"
+        lines.append(line)
+    if lines:
+        print("  Freshness (commit MySQL -> commit ODS):")
+        for line in lines:
+            print(line)
+
+# ==================================================
+# FLUSH POLICY
+# ==================================================
+def weighted_percentile(samples, q):
+    """Percentile dari list (value, weight)"""
+    total = sum(weight for _, weight in samples)
+    if not total:
+        return 0.0
+    threshold = total * q
+    seen = 0
+    ordered = sorted(samples)
+    for value, weight in ordered:
+        seen += weight
+        if seen >= threshold:
+            return value
+    return ordered[-1][0]
+
+class FlushPolicy:
+    """Kapan message yang sudah di-poll di-flush ke ODS
+
+    Batch di-flush jika jumlah row mencapai batch_rows, total bytes value
+    mencapai max_bytes, atau message tertua sudah menunggu linger_ms.
+    Dengan target_p99_ms, batch_rows di-adapt setelah setiap flush dari
+    latency sink (waktu fetch -> commit ODS) per message:
+    - p99 di atas target: batch_rows dan linger dipotong setengah
+    - batch penuh (stream ramai) dan p99 di bawah setengah target: batch_rows x2
+    - flush karena linger dengan batch kecil (stream sepi): batch_rows turun
+    Latency sink dipakai (bukan umur message sejak source) karena hanya itu
+    yang dipengaruhi ukuran batch; saat catch-up lag, batch besar justru
+    menghabiskan backlog lebih cepat.
+    """
+
+    def __init__(self, max_rows=FLUSH_MAX_ROWS, max_bytes=FLUSH_MAX_BYTES,
+                 linger_ms=FLUSH_LINGER_MS, target_p99_ms=FLUSH_TARGET_P99_MS):
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max_bytes
+        self.max_linger_ms = linger_ms
+        self.target_p99_ms = target_p99_ms
+        self.adaptive = target_p99_ms > 0
+        self.min_rows = min(FLUSH_MIN_ROWS, self.max_rows)
+        self.batch_rows = self.min_rows if self.adaptive else self.max_rows
+        self.linger_ms = min(linger_ms, target_p99_ms / 2) if self.adaptive else linger_ms
+        self.samples = deque(maxlen=200)   # (latency ms, jumlah message) per poll
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.bytes = 0
+        self.polls = []   # (waktu fetch monotonic, jumlah message)
+
+    def add(self, msg_pack):
+        """Catat hasil satu poll yang masuk ke batch pending"""
+        rows = 0
+        nbytes = 0
+        for messages in msg_pack.values():
+            rows += len(messages)
+            for message in messages:
+                if message.value:
+                    nbytes += len(message.value)
+        if rows:
+            self.rows += rows
+            self.bytes += nbytes
+            self.polls.append((time.monotonic(), rows))
+
+    def age_ms(self, now=None):
+        if not self.polls:
+            return 0.0
+        return ((now or time.monotonic()) - self.polls[0][0]) * 1000
+
+    def reason(self, now=None, row_floor=0):
+        """Alasan flush ('rows' | 'bytes' | 'linger') atau None jika belum waktunya"""
+        if not self.rows:
+            return None
+        if self.rows >= max(self.batch_rows, row_floor):
+            return 'rows'
+        if self.bytes >= self.max_bytes:
+            return 'bytes'
+        if self.age_ms(now) >= self.linger_ms:
+            return 'linger'
+        return None
+
+    def poll_timeout_ms(self, idle_ms=1000):
+        """Timeout poll: sisa linger jika ada batch pending"""
+        if not self.rows:
+            return idle_ms
+        return max(0, int(self.linger_ms - self.age_ms()))
+
+    def poll_max_records(self, row_floor=0):
+        return max(1, max(self.batch_rows, row_floor) - self.rows)
+
+    def take(self, reason):
+        """Ambil info batch pending untuk di-flush lalu mulai batch baru"""
+        flush = (reason, self.rows, self.polls)
+        self.reset()
+        return flush
+
+    def flushed(self, flush):
+        """Catat latency batch (dari take()) yang sudah di-commit lalu adapt ukuran batch"""
+        reason, rows, polls = flush
+        now = time.monotonic()
+        for fetched_at, poll_rows in polls:
+            self.samples.append(((now - fetched_at) * 1000, poll_rows))
+        if not self.adaptive:
+            return
+        p99 = weighted_percentile(list(self.samples), 0.99)
+        if p99 > self.target_p99_ms:
+            self.batch_rows = max(self.min_rows, self.batch_rows // 2)
+            self.linger_ms = max(1, self.linger_ms / 2)
+            self.samples.clear()
+        elif reason == 'rows' and p99 < self.target_p99_ms / 2:
+            self.batch_rows = min(self.max_rows, self.batch_rows * 2)
+        elif reason == 'linger':
+            if rows < self.batch_rows // 4:
+                self.batch_rows = max(self.min_rows, self.batch_rows // 2)
+            self.linger_ms = min(self.max_linger_ms, self.target_p99_ms / 2, self.linger_ms * 2)
+
+    def p99_ms(self):
+        return weighted_percentile(list(self.samples), 0.99)
+
+# ==================================================
+# WRITE STAGE (backpressure)
+# ==================================================
+class WriteStage(threading.Thread):
+    """Stage write ODS di thread sendiri dengan antrean batch terbatas
+
+    Thread utama tetap poll Kafka selama write berjalan. Jumlah batch in
+    flight (antre + sedang ditulis) dibatasi max_batches; jika penuh, thread
+    utama mem-pause partition Kafka sampai ada slot, jadi memory tetap flat
+    saat ODS melambat. Hasil write dikembalikan lewat antrean done dan
+    offset Kafka di-commit oleh thread utama (KafkaConsumer tidak thread-safe).
+    Setelah satu batch gagal, batch berikutnya tidak ditulis.
+    """
+
+    def __init__(self, engine, max_batches):
+        super().__init__(name="ods-writer", daemon=True)
+        self.engine = engine
+        self.max_batches = max(1, max_batches)
+        self.tasks = queue.Queue()
+        self.done = queue.Queue()
+        self.inflight = 0       # hanya diubah thread utama
+        self.max_depth = 0
+
+    def full(self):
+        return self.inflight >= self.max_batches
+
+    def submit(self, msg_pack, flush):
+        offsets = {tp: messages[-1].offset + 1 for tp, messages in msg_pack.items() if messages}
+        self.inflight += 1
+        self.max_depth = max(self.max_depth, self.inflight)
+        self.tasks.put((msg_pack, offsets, flush))
+
+    def completed(self, timeout=None):
+        """Hasil write yang sudah selesai: list (offsets, flush, written)
+
+        Raise ulang exception jika write batch gagal. Dengan timeout, tunggu
+        sampai ada minimal satu hasil (atau timeout habis).
+        """
+        results = []
+        while True:
+            try:
+                if timeout is not None and not results:
+                    item = self.done.get(timeout=timeout)
+                else:
+                    item = self.done.get_nowait()
+            except queue.Empty:
+                return results
+            self.inflight -= 1
+            offsets, flush, written, error = item
+            if error is not None:
+                raise error
+            results.append((offsets, flush, written))
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            msg_pack, offsets, flush = task
+            try:
+                written = self.engine.apply(msg_pack)
+            except Exception as e:
+                self.done.put((offsets, flush, None, e))
+                break
+            self.done.put((offsets, flush, written, None))
+
+    def close(self):
+        """Tunggu batch yang sudah antre selesai ditulis lalu stop thread"""
+        self.tasks.put(None)
+        self.join()
+
+# ==================================================
+# APPLY ENGINE
+# ==================================================
+class BatchApplier:
+    """Deserialize, convert, compact, lalu tulis message poll ke ODS
+
+    Koneksi PostgreSQL diambil dari OdsConnectionPool per batch. Mode
+    single-thread memakai satu applier langsung; mode paralel memakai satu
+    applier per ApplyWorker.
+    """
+
+    def __init__(self, pool, deserialize, group_id, snapshot=None, name="sink", decoder=None,
+                 dead_letter=None):
+        self.pool = pool
+        self.deserialize = deserialize
+        self.decoder = decoder
+        self.group_id = group_id
+        self.snapshot = snapshot
+        self.name = name
+        self.dead_letter = dead_letter
+        self.compactor = BatchCompactor(SINK_TABLES)
+        self.counts = {table: 0 for table in SINK_TABLES}
+        self.message_count = 0
+        self.dead_letters = 0
+        self.failed = []  # entry DLQ message gagal decode, ditulis sebelum checkpoint
+
+    def fail_message(self, message, error):
+        """Catat message yang gagal deserialize / convert untuk DLQ (jika ada)"""
+        if self.dead_letter is not None:
+            self.failed.append(failed_message_entry(message.topic, message.partition, message.offset,
+                                                    message.key, message.value, error, self.group_id))
+
+    def take_failed(self):
+        """Ambil entry DLQ message gagal decode sejak panggilan terakhir"""
+        failed, self.failed = self.failed, []
+        return failed
+
+    def write_failed(self, failed):
+        """Tulis entry message gagal decode ke DLQ; harus sebelum checkpoint melewati offset-nya"""
+        if not failed:
+            return
+        self.dead_letter.write(failed)
+        self.dead_letters += len(failed)
+        for entry in failed:
+            ERRORS_TOTAL.inc((entry['table'], entry['partition'], 'dlq'))
+        print(f"✗ [{self.name}] {len(failed)} message gagal decode masuk DLQ {self.dead_letter.location}")
+
+    def add_message(self, message):
+        """Deserialize + convert satu message Kafka lalu masukkan ke compactor"""
+        self.message_count += 1
+        message_count = self.message_count
+        if not message.value:
+            self.add_tombstone(message)
+            return
+        try:
+            value = self.deserialize(message.topic, message.value)
+        except Exception as e:
+            ERRORS_TOTAL.inc((table_for_topic(message.topic), message.partition, 'deserialize'))
+            print(f"✗ Error deserialize message {message_count} di {message.topic} "
+                  f"offset {message.offset}: {e}")
+            self.fail_message(message, e)
+            return
+        
+        if not value:
+            print(f"⚠ Message {message_count} di {message.topic}: value is None")
+            self.fail_message(message, "value is None")
+            return
+        
+        if 'payload' not in value:
+            print(f"⚠ Message {message_count} di {message.topic}: tidak ada payload")
+            print(f"   Keys: {list(value.keys()) if isinstance(value, dict) else type(value)}")
+            self.fail_message(message, "tidak ada payload")
+            return
+        
+        payload = value['payload']
+        table = table_for_topic(message.topic)
+        if table not in SINK_TABLES:
+            return
+        sink_table = SINK_TABLES[table]
+        pk = sink_table.pk
+        
+        try:
+            record = sink_table.converter_for(value.get('schema'))(payload)
+            if record and record.get(pk):
+                self.compactor.add(table, record[pk], record, message.partition, message.offset,
+                                   message.timestamp)
+            else:
+                if message_count % 50 == 0:
+                    print(f"⚠ Record {table} tanpa {pk}: {payload.get(pk, 'N/A')}")
+                self.fail_message(message, f"record tanpa {pk}")
+        except Exception as e:
+            ERRORS_TOTAL.inc((table, message.partition, 'convert'))
+            print(f"✗ Error processing {table} message {message_count}: {e}")
+            self.fail_message(message, e)
+            if message_count <= 5:  # Print detail untuk 5 error pertama
+                import traceback
+                traceback.print_exc()
+
+    def add_tombstone(self, message):
+        """Tombstone (drop.tombstones=false): delete key-only, tanpa warning per message"""
+        sink_table = SINK_TABLES.get(table_for_topic(message.topic))
+        if sink_table is None:
+            return
+        try:
+            record = tombstone_record(self.deserialize, sink_table, message.topic, message.key)
+        except Exception as e:
+            ERRORS_TOTAL.inc((sink_table.name, message.partition, 'deserialize'))
+            print(f"✗ Error decode key tombstone {message.topic} offset {message.offset}: {e}")
+            self.fail_message(message, e)
+            return
+        if record is not None:
+            self.compactor.add(sink_table.name, record[sink_table.pk], record,
+                               message.partition, message.offset, message.timestamp)
+
+    def add_decoded(self, messages):
+        """Decode message via DecodePool lalu masukkan row hasilnya ke compactor"""
+        self.message_count += len(messages)
+        rows, errors = self.decoder.decode(messages)
+        for table, partition, error, entry in errors:
+            ERRORS_TOTAL.inc((table, partition, 'decode'))
+            if self.dead_letter is not None:
+                entry['group_id'] = self.group_id
+                self.failed.append(entry)
+        for _, _, error, _ in errors[:5]:
+            print(error)
+        if len(errors) > 5:
+            print(f"⚠ ... {len(errors) - 5} error decode lainnya di batch ini")
+        for table, partition, offset, timestamp, key, values in rows:
+            record = dict(zip(SINK_TABLES[table].column_names, values))
+            self.compactor.add(table, key, record, partition, offset, timestamp)
+
+    def apply(self, msg_pack):
+        """Apply satu poll batch (dict TopicPartition -> messages)
+
+        Compactor menyisakan satu event terbaru per primary key; ini juga
+        wajib karena multi-row INSERT ... ON CONFLICT tidak boleh update row
+        yang sama dua kali. Batch dan checkpoint offset ditulis dalam satu
+        transaksi. Message yang gagal deserialize / convert ditulis ke DLQ
+        (bytes Kafka asli) sebelum checkpoint melewati offset-nya.
+        Return dict tabel -> jumlah record yang ditulis.
+        """
+        offsets = {}
+        for topic_partition, messages in msg_pack.items():
+            if messages:
+                offsets[(topic_partition.topic, topic_partition.partition)] = messages[-1].offset + 1
+                RECORDS_TOTAL.inc((table_for_topic(topic_partition.topic), topic_partition.partition),
+                                  len(messages))
+        if self.decoder is not None:
+            started = time.perf_counter()
+            self.add_decoded([message for messages in msg_pack.values() for message in messages])
+            CONVERT_SECONDS.observe(('', ''), time.perf_counter() - started)
+        else:
+            # Waktu convert per partition: satu pasang perf_counter per partition per batch
+            for topic_partition, messages in msg_pack.items():
+                started = time.perf_counter()
+                for message in messages:
+                    self.add_message(message)
+                CONVERT_SECONDS.observe((table_for_topic(topic_partition.topic), topic_partition.partition),
+                                        time.perf_counter() - started)
+        
+        batch, sources = self.compactor.drain(with_sources=True)
+        # Message gagal decode ke DLQ dulu: checkpoint batch ini melewati offset-nya
+        self.write_failed(self.take_failed())
+        written, dead_keys = self.write(batch, offsets, sources)
+        observe_freshness(batch, sources, exclude=dead_keys)
+        for table, n in written.items():
+            self.counts[table] += n
+            WRITTEN_TOTAL.inc((table,), n)
+        return written
+
+    def write(self, batch, offsets, sources=None):
+        """Tulis batch dengan koneksi dari pool; reconnect jika koneksi putus
+
+        Transaksi yang gagal karena koneksi putus (failover) tidak ter-commit,
+        jadi batch + checkpoint aman ditulis ulang dengan koneksi baru. Error
+        transient (deadlock, serialization, timeout) diulang dulu; hanya error
+        data yang di-bisection (write_batch_bisect) dan record rusak masuk DLQ.
+        Return (dict tabel -> jumlah record yang ditulis, set (tabel, pk) DLQ).
+        """
+        for attempt in range(1, PG_RECONNECT_ATTEMPTS + 1):
+            conn = self.pool.getconn_retry(self.name)
+            dead_keys = set()
+            try:
+                try:
+                    written = write_batch_retry(conn, batch, self.snapshot, self.group_id, offsets,
+                                                self.name)
+                except connection_errors():
+                    raise
+                except Exception as e:
+                    if self.dead_letter is None or not is_data_error(e):
+                        raise
+                    print(f"✗ [{self.name}] Error writing batch, bisection untuk isolasi record rusak: {e}")
+                    written, dead_keys = write_batch_bisect(conn, batch, e, self.dead_letter, sources,
+                                                            self.group_id, offsets)
+                    self.dead_letters += len(dead_keys)
+            except connection_errors() as e:
+                self.pool.discard(conn)
+                if attempt == PG_RECONNECT_ATTEMPTS:
+                    raise
+                print(f"⚠ [{self.name}] Koneksi PostgreSQL putus ({e}), reconnect dan tulis ulang batch...")
+                continue
+            self.pool.putconn(conn)
+            return written, dead_keys
+
+    def close(self):
+        if self.snapshot is not None and self.snapshot.active:
+            conn = self.pool.getconn()
+            try:
+                self.snapshot.close(conn)
+            finally:
+                self.pool.putconn(conn)
+
+class ApplyWorker(threading.Thread):
+    """Thread apply dengan koneksi PostgreSQL sendiri untuk subset partition
+
+    Setiap TopicPartition dimiliki tepat satu worker, jadi urutan per primary
+    key (Debezium mem-partition berdasarkan key) tetap terjaga. Deserialize,
+    convert dan compaction tetap berjalan di bawah GIL; yang paralel hanya
+    I/O ke PostgreSQL.
+    """
+
+    def __init__(self, applier):
+        super().__init__(name=applier.name, daemon=True)
+        self.applier = applier
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+
+    def submit(self, msg_pack):
+        self.tasks.put(msg_pack)
+
+    def wait(self):
+        """Tunggu hasil submit terakhir; raise ulang exception dari worker"""
+        written, error = self.results.get()
+        if error is not None:
+            raise error
+        return written
+
+    def stop(self):
+        self.tasks.put(None)
+
+    def run(self):
+        while True:
+            msg_pack = self.tasks.get()
+            if msg_pack is None:
+                break
+            try:
+                self.results.put((self.applier.apply(msg_pack), None))
+            except Exception as e:
+                self.results.put((None, e))
+
+class ParallelApplier:
+    """Bagi poll batch ke ApplyWorker per partition, tunggu semua selesai
+
+    apply() baru return setelah setiap worker yang menerima message sudah
+    commit batch-nya, jadi offset Kafka hanya di-commit setelah semua flush.
+    """
+
+    def __init__(self, workers, topic_partitions):
+        self.workers = workers
+        self.owner = {tp: index % len(workers) for index, tp in enumerate(topic_partitions)}
+        for worker in workers:
+            worker.start()
+
+    def apply(self, msg_pack):
+        parts = {}
+        for tp, messages in msg_pack.items():
+            parts.setdefault(self.owner.get(tp, 0), {})[tp] = messages
+        for index, part in parts.items():
+            self.workers[index].submit(part)
+        written = {}
+        error = None
+        for index in parts:
+            try:
+                for table, n in self.workers[index].wait().items():
+                    written[table] = written.get(table, 0) + n
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return written
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join()
+            worker.applier.close()
+
+class LagMonitor:
+    """Refresh gauge consumer lag dan records/s per partition secara periodik
+
+    Dipanggil dari thread utama (KafkaConsumer tidak thread-safe). End offset
+    semua partition diambil dengan satu request end_offsets per refresh;
+    position() dibaca dari state lokal consumer.
+    """
+
+    def __init__(self, consumer, topic_partitions, interval=METRICS_LAG_INTERVAL):
+        self.consumer = consumer
+        self.topic_partitions = topic_partitions
+        self.interval = interval
+        self.last_at = None
+        self.last_records = {}
+        self.failures = 0
+
+    def maybe_refresh(self, now=None):
+        now = now or time.monotonic()
+        if self.last_at is None or now - self.last_at >= self.interval:
+            self.refresh(now)
+
+    def refresh(self, now):
+        try:
+            end_offsets = self.consumer.end_offsets(self.topic_partitions)
+            for tp in self.topic_partitions:
+                labels = (table_for_topic(tp.topic), tp.partition)
+                position = self.consumer.position(tp)
+                END_OFFSET.set(labels, end_offsets[tp])
+                POSITION.set(labels, position)
+                CONSUMER_LAG.set(labels, max(0, end_offsets[tp] - position))
+        except Exception as e:
+            self.failures += 1
+            if self.failures == 1:
+                print(f"⚠ Warning: Gagal refresh consumer lag untuk metrics: {e}")
+        records = RECORDS_TOTAL.snapshot()
+        if self.last_at is not None and now > self.last_at:
+            elapsed = now - self.last_at
+            for labels, total in records.items():
+                RECORDS_RATE.set(labels, (total - self.last_records.get(labels, 0)) / elapsed)
+        self.last_at = now
+        self.last_records = records
+
+def print_compaction_stats(compactor):
+    """Print ringkasan counter compaction per tabel dan freshness"""
+    print("  Compaction (events -> writes, saved):")
+    for table, stat in compactor.stats().items():
+        print(f"  - {table}: {stat['events']} -> {stat['writes']}, saved {stat['saved']}")
+    print_freshness_stats()
+    if DECIMAL_DECODE_ERRORS:
+        print("  Decimal decode errors (value jadi NULL):")
+        for field, count in DECIMAL_DECODE_ERRORS.items():
+            print(f"  - {field}: {count}")
+
+def trim_to_end_offsets(consumer, msg_pack, end_offsets, drained):
+    """Mode drain: buang message di/after end offset target, pause partition yang sudah sampai
+
+    Partition tanpa message baru dicek lewat position() supaya offset yang
+    dilewati (control record, compaction) tidak membuat drain menunggu terus.
+    """
+    trimmed = {}
+    for tp, messages in msg_pack.items():
+        end = end_offsets[tp]
+        if messages and messages[-1].offset >= end - 1:
+            messages = [message for message in messages if message.offset < end]
+            drained.add(tp)
+            consumer.pause(tp)
+        if messages:
+            trimmed[tp] = messages
+    if not trimmed:
+        for tp, end in end_offsets.items():
+            if tp not in drained and consumer.position(tp) >= end:
+                drained.add(tp)
+                consumer.pause(tp)
+    return trimmed
+
+def parse_offset_overrides(values):
+    """Parse --from-offset: 'OFFSET' (semua partition) atau 'TOPIC:PARTITION:OFFSET'
+
+    TOPIC boleh nama topic lengkap atau nama tabel. Return list of
+    (topic atau None, partition atau None, offset).
+    """
+    overrides = []
+    for value in values or []:
+        parts = value.rsplit(':', 2)
+        if len(parts) == 1:
+            overrides.append((None, None, int(parts[0])))
+        elif len(parts) == 3:
+            topic, partition, offset = parts
+            if '.' not in topic:
+                topic = f"{TOPIC_PREFIX}.{DATABASE_NAME}.{topic}"
+            overrides.append((topic, int(partition), int(offset)))
+        else:
+            raise ValueError(f"Format --from-offset tidak valid: {value} (OFFSET atau TOPIC:PARTITION:OFFSET)")
+    return overrides
+
+def offset_override_for(tp, overrides):
+    """Offset override untuk satu TopicPartition (yang paling spesifik menang)"""
+    result = None
+    for topic, partition, offset in overrides:
+        if topic is None:
+            if result is None:
+                result = offset
+        elif topic == tp.topic and partition == tp.partition:
+            return offset
+    return result
+
+def seek_start_positions(consumer, topic_partitions, checkpoints, from_beginning=False, offset_overrides=()):
+    """Seek posisi awal: --from-beginning, --from-offset, lalu checkpoint ODS
+
+    Partition tanpa override/checkpoint tidak di-seek, jadi mulai dari
+    committed offset Kafka (atau auto_offset_reset jika belum pernah commit).
+    """
+    if from_beginning:
+        print("\nSeeking to beginning of all partitions (--from-beginning)...")
+        consumer.seek_to_beginning()
+    elif offset_overrides:
+        print("\nSeeking ke offset override (--from-offset)...")
+        for tp in topic_partitions:
+            offset = offset_override_for(tp, offset_overrides)
+            if offset is not None:
+                consumer.seek(tp, offset)
+    elif checkpoints:
+        print(f"\nSeeking ke checkpoint offset di {CHECKPOINT_TABLE}...")
+        for tp in topic_partitions:
+            offset = checkpoints.get((tp.topic, tp.partition))
+            if offset is not None:
+                consumer.seek(tp, offset)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Custom ODS Sink: Kafka (Debezium) -> PostgreSQL ODS")
+    parser.add_argument("--group-id",
+                        help=f"Consumer group (default: {CONSUMER_GROUP_ID}, atau replay-<nama dump> untuk "
+                             "--source file:); resume dari offset yang sudah di-commit")
+    parser.add_argument("--mode", choices=SINK_MODES, default=SINK_MODE,
+                        help="idle: exit setelah 10 poll kosong (default) | daemon: jalan terus, "
+                             "SIGTERM = flush lalu stop | drain: exit saat semua partition mencapai end offset saat start")
+    parser.add_argument("--workers", type=int, default=APPLY_WORKERS,
+                        help="Jumlah apply worker thread per partition, masing-masing koneksi PostgreSQL. "
+                             "Decode/convert tetap kena GIL; hanya membantu jika PostgreSQL yang jadi "
+                             "bottleneck (decode CPU-bound: --decode-processes)")
+    parser.add_argument("--flush-max-rows", type=int, default=FLUSH_MAX_ROWS,
+                        help=f"Flush jika batch mencapai N row (default: {FLUSH_MAX_ROWS})")
+    parser.add_argument("--flush-max-bytes", type=int, default=FLUSH_MAX_BYTES,
+                        help=f"Flush jika total value mencapai N bytes (default: {FLUSH_MAX_BYTES})")
+    parser.add_argument("--flush-linger-ms", type=int, default=FLUSH_LINGER_MS,
+                        help=f"Flush jika message tertua sudah menunggu N ms (default: {FLUSH_LINGER_MS})")
+    parser.add_argument("--flush-target-p99-ms", type=int, default=FLUSH_TARGET_P99_MS,
+                        help="Mode adaptive: target p99 latency sink dalam ms (0 = nonaktif)")
+    parser.add_argument("--write-queue-batches", type=int, default=WRITE_QUEUE_BATCHES,
+                        help=f"Maksimum batch in flight sebelum fetch Kafka di-pause (default: {WRITE_QUEUE_BATCHES})")
+    parser.add_argument("--source", default=SINK_SOURCE,
+                        help="Sumber message: kafka (default) atau file:<path> untuk replay dump "
+                             "capture_topics.py tanpa broker (file, direktori, atau path dipisah koma)")
+    parser.add_argument("--dlq", default=DLQ_LOCATION,
+                        help=f"Dead-letter queue record gagal: file JSONL atau kafka:<topic> (default: {DLQ_LOCATION})")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help=f"Port endpoint HTTP /metrics format Prometheus (default: {METRICS_PORT}, 0 = nonaktif)")
+    parser.add_argument("--pg-pool-size", type=int, default=PG_POOL_SIZE,
+                        help="Maksimum koneksi PostgreSQL di pool (default: sama dengan --workers)")
+    parser.add_argument("--decode-processes", type=int, default=DECODE_PROCESSES,
+                        help="Jumlah process untuk deserialize + convert (0 = di process utama)")
+    parser.add_argument("--decode-chunk-size", type=int, default=DECODE_CHUNK_SIZE,
+                        help=f"Jumlah message per chunk decode (default: {DECODE_CHUNK_SIZE})")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--from-beginning", action="store_true",
+                       help="Abaikan committed offset, mulai dari awal semua partition (backfill)")
+    start.add_argument("--from-offset", action="append", metavar="OFFSET|TOPIC:PARTITION:OFFSET",
+                       help="Mulai dari offset tertentu; bisa diulang per partition")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        offset_overrides = parse_offset_overrides(args.from_offset)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(2)
+    if DELETE_MODE not in DELETE_MODES:
+        print(f"✗ Error: ODS_SINK_DELETE_MODE tidak dikenal: {DELETE_MODE} (pilihan: {', '.join(DELETE_MODES)})")
+        sys.exit(2)
+    check_dependencies(kafka=args.source == "kafka")
     print("=" * 60)
     print("Custom ODS Sink Consumer")
     print("=" * 60)
-    print("\n⚠ PERINGATAN: Script ini akan consume dari Kafka")
-    print("Pastikan sink connectors sudah di-stop untuk menghindari duplicate processing")
+    if args.source == "kafka":
+        print("\n⚠ PERINGATAN: Script ini akan consume dari Kafka")
+        print("Pastikan sink connectors sudah di-stop untuk menghindari duplicate processing")
+    else:
+        print(f"\n⚠ Replay dari file dump ({args.source}); pastikan target ODS benar")
     print("\nTekan Ctrl+C untuk stop")
     
-    # Connect ke PostgreSQL
+    # Pool koneksi PostgreSQL (dipakai bersama apply worker)
+    pool_size = max(1, args.pg_pool_size or args.workers)
     try:
-        conn = psycopg2.connect(**PG_CONFIG)
-        print("\n✓ Connected ke PostgreSQL")
+        pool = OdsConnectionPool(pool_size)
+        conn = pool.getconn()
+        print(f"\n✓ Connected ke PostgreSQL (pool {pool_size} koneksi)")
     except Exception as e:
         print(f"\n✗ Gagal connect ke PostgreSQL: {e}")
         sys.exit(1)
     
-    # Create Kafka consumer
-    # Gunakan group_id yang berbeda setiap kali untuk force read from beginning
-    import time
-    group_id = f'custom-ods-sink-{int(time.time())}'
-    
-    print(f"\n✓ Consumer group: {group_id} (baru setiap run)")
-    
-    # Buat consumer tanpa subscribe (akan assign manual)
-    from kafka import TopicPartition
+    # Consumer group tetap: restart melanjutkan dari offset yang sudah
+    # di-commit (checkpoint ODS per group), bukan replay dari awal. Replay
+    # file dump default ke group sendiri supaya checkpoint sink tidak tertimpa
+    group_id = args.group_id
+    if group_id is None:
+        group_id = CONSUMER_GROUP_ID if args.source == "kafka" else replay_group_id(args.source)
+    print(f"\n✓ Consumer group: {group_id}")
     
-    consumer = KafkaConsumer(
-        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-        auto_offset_reset='earliest',
-        enable_auto_commit=False,  # Disable auto commit untuk kontrol manual
-        group_id=group_id,
-        value_deserializer=lambda m: json.loads(m.decode('utf-8')) if m else None,
-        consumer_timeout_ms=30000  # Timeout 30 detik jika tidak ada message
-    )
+    # Source tanpa subscribe (akan assign manual): KafkaConsumer atau file dump
+    try:
+        consumer = open_source(args.source, group_id, KAFKA_BOOTSTRAP_SERVERS)
+    except (OSError, ValueError) as e:
+        print(f"\n✗ Gagal membuka source {args.source}: {e}")
+        pool.closeall()
+        sys.exit(1)
     
-    print(f"\n✓ Connected ke Kafka")
+    deserialize = create_deserializer()
+    if hasattr(deserialize, 'bootstrap'):
+        deserialize.bootstrap(conn, TOPICS)
+    print(f"\n✓ Source: {consumer.name} ({consumer.location})")
+    print(f"✓ Deserializer: {deserialize.name} (JSON backend: {deserialize.backend})")
     print(f"✓ Listening topics: {', '.join(TOPICS)}")
+    print(f"✓ Delete mode: {DELETE_MODE}")
+    dead_letter = open_dead_letter(args.dlq)
+    print(f"✓ Dead-letter queue: {dead_letter.location}")
     
     # Cek apakah ada message di topics dan dapatkan partitions
+    # (tanpa join group)
     print("\nChecking topics for partitions...")
     topic_partitions = []
     
-    # Subscribe dulu untuk mendapatkan metadata, lalu unsubscribe
-    consumer.subscribe(TOPICS)
-    consumer.poll(timeout_ms=2000)  # Trigger metadata fetch
-    
+    source_partitions = consumer.partitions(TOPICS)
     for topic in TOPICS:
-        partitions = consumer.partitions_for_topic(topic)
+        partitions = source_partitions.get(topic)
         if partitions:
-            for partition in partitions:
-                tp = TopicPartition(topic, partition)
-                topic_partitions.append(tp)
+            topic_partitions.extend(partitions)
             print(f"  ✓ Topic {topic}: {len(partitions)} partition(s)")
         else:
             print(f"  ⚠ Topic {topic}: tidak ditemukan")
     
-    # Unsubscribe sebelum assign
-    consumer.unsubscribe()
-    
     if not topic_partitions:
         print("\n⚠ Tidak ada partition ditemukan. Cek apakah topics ada di Kafka.")
         consumer.close()
-        conn.close()
+        pool.closeall()
         sys.exit(1)
     
     # Assign partitions (manual assignment - tidak bisa combine dengan subscribe)
     consumer.assign(topic_partitions)
     
-    # Seek to beginning untuk semua partitions
-    print("\nSeeking to beginning of all partitions...")
-    consumer.seek_to_beginning()
+    # Posisi awal: checkpoint di ODS (default, ditulis atomik bersama data),
+    # committed offset Kafka jika belum ada checkpoint, atau override eksplisit
+    try:
+        ensure_checkpoint_table(conn)
+        checkpoints = load_checkpoints(conn, group_id)
+    except Exception as e:
+        print(f"\n✗ Gagal load checkpoint offset dari {CHECKPOINT_TABLE}: {e}")
+        consumer.close()
+        pool.closeall()
+        sys.exit(1)
+    
+    seek_start_positions(consumer, topic_partitions, checkpoints, args.from_beginning, offset_overrides)
     
     # Cek current position dan end offset
     print("\nPartition positions:")
+    end_offsets = consumer.end_offsets(topic_partitions)
     for tp in topic_partitions:
         position = consumer.position(tp)
-        # Get end offset untuk cek apakah ada message
-        end_offset = consumer.end_offsets([tp])[tp]
-        print(f"  {tp.topic}[{tp.partition}]: position = {position}, end_offset = {end_offset}")
+        committed = consumer.committed(tp)
+        end_offset = end_offsets[tp]
+        print(f"  {tp.topic}[{tp.partition}]: position = {position}, committed = {committed}, end_offset = {end_offset}")
         if end_offset == 0:
             print(f"    ⚠ Partition kosong (tidak ada message)")
         elif position >= end_offset:
             print(f"    ⚠ Sudah di akhir (tidak ada message baru)")
     
+    # Decode stage opsional di process terpisah (dipakai bersama semua worker)
+    decoder = None
+    if args.decode_processes > 0:
+        decoder = DecodePool(args.decode_processes, max(1, args.decode_chunk_size), deserialize)
+        print(f"\n✓ Decode pool: {args.decode_processes} process, chunk {decoder.chunk_size} message")
+    # Batch minimal supaya semua process decode kebagian chunk
+    row_floor = 0 if decoder is None else decoder.processes * decoder.chunk_size
+    
+    policy = FlushPolicy(args.flush_max_rows, args.flush_max_bytes,
+                         args.flush_linger_ms, args.flush_target_p99_ms)
+    if policy.adaptive:
+        print(f"\n✓ Flush policy adaptive: target p99 {policy.target_p99_ms} ms, "
+              f"batch {policy.min_rows}..{policy.max_rows} rows, max {policy.max_bytes} bytes")
+    else:
+        print(f"\n✓ Flush policy: max {policy.max_rows} rows / {policy.max_bytes} bytes / "
+              f"linger {policy.linger_ms} ms")
+    
+    # Koneksi setup dikembalikan ke pool; applier mengambil koneksi per batch
+    pool.putconn(conn)
+    
+    # Apply engine: single-thread, atau worker paralel (berbagi pool koneksi
+    # PostgreSQL) yang masing-masing memiliki subset partition
+    workers = max(1, min(args.workers, len(topic_partitions)))
+    if workers == 1:
+        snapshot = SnapshotLoader() if SNAPSHOT_COPY_ENABLED else None
+        appliers = [BatchApplier(pool, deserialize, group_id, snapshot, decoder=decoder,
+                                 dead_letter=dead_letter)]
+        engine = appliers[0]
+    else:
+        appliers = []
+        for index in range(workers):
+            snapshot = SnapshotLoader(suffix=f"_w{index}") if SNAPSHOT_COPY_ENABLED else None
+            appliers.append(BatchApplier(pool, deserialize, group_id, snapshot,
+                                         name=f"worker-{index}", decoder=decoder,
+                                         dead_letter=dead_letter))
+        engine = ParallelApplier([ApplyWorker(applier) for applier in appliers], topic_partitions)
+        print(f"\n✓ Parallel apply: {workers} worker (pool {pool.maxconn} koneksi PostgreSQL)")
+        for tp, index in engine.owner.items():
+            print(f"  {tp.topic}[{tp.partition}] -> worker-{index}")
+    
+    def snapshot_active():
+        return any(a.snapshot is not None and a.snapshot.active for a in appliers)
+    
+    def total_counts():
+        counts = {table: 0 for table in SINK_TABLES}
+        for applier in appliers:
+            for table, n in applier.counts.items():
+                counts[table] += n
+        return counts
+    
+    def print_stats():
+        compactor = BatchCompactor(SINK_TABLES)
+        for applier in appliers:
+            for table in SINK_TABLES:
+                compactor.events[table] += applier.compactor.events[table]
+                compactor.writes[table] += applier.compactor.writes[table]
+        print_compaction_stats(compactor)
+        dead = sum(applier.dead_letters for applier in appliers)
+        if dead:
+            print(f"  Dead-letter queue: {dead} record di {dead_letter.location} "
+                  f"(replay: python py_script/replay_dlq.py)")
+        return compactor
+    
     print("\nProcessing messages...\n")
     
-    customer_count = 0
-    app_count = 0
-    vehicle_count = 0
     message_count = 0
     empty_poll_count = 0
-    max_empty_polls = 10  # Stop setelah 10 kali poll kosong berturut-turut
+    max_empty_polls = 10  # Mode idle: stop setelah 10 kali poll kosong berturut-turut
+    idle_timeout_ms = 1000
+    pending = {}  # TopicPartition -> messages yang belum di-flush
+    
+    # Mode drain: target = end offset saat start; partition yang sudah sampai
+    # di-pause dan message setelah target dibuang (diproses run berikutnya)
+    mode = args.mode
+    drained = set()
+    if mode == 'drain':
+        drained = {tp for tp in topic_partitions if consumer.position(tp) >= end_offsets[tp]}
+        if drained:
+            consumer.pause(*drained)
+        print(f"\n✓ Mode drain: sampai end offset saat start "
+              f"({len(topic_partitions) - len(drained)} partition belum di akhir)")
+    elif mode == 'daemon':
+        print("\n✓ Mode daemon: tidak exit saat idle, SIGTERM = flush lalu stop")
+    
+    # Endpoint metrics (scrape Prometheus); lag di-refresh dari loop utama
+    metrics_server = None
+    lag_monitor = None
+    if args.metrics_port:
+        try:
+            metrics_server = start_metrics_server(METRICS, args.metrics_port, METRICS_HOST)
+            lag_monitor = LagMonitor(consumer, topic_partitions)
+            print(f"\n✓ Metrics: http://{METRICS_HOST}:{args.metrics_port}/metrics "
+                  f"(lag refresh {lag_monitor.interval:g} detik)")
+        except OSError as e:
+            print(f"\n⚠ Warning: Gagal start endpoint metrics di port {args.metrics_port}: {e}")
+    
+    # SIGTERM (docker stop, systemd): flush batch pending lalu stop dengan rapi
+    stop_requested = []
+    def request_stop(signum, frame):
+        stop_requested.append(signum)
+    signal.signal(signal.SIGTERM, request_stop)
+    exit_code = 0
+    finished = False
+    
+    # Write ODS di thread terpisah; fetch Kafka jalan terus selama ada slot
+    writer = WriteStage(engine, args.write_queue_batches)
+    writer.start()
+    paused = False
+    pause_count = 0
+    paused_since = None
+    paused_seconds = 0.0
+    print(f"✓ Write queue: maksimum {writer.max_batches} batch in flight")
+    
+    def commit_completed(timeout=None):
+        """Commit offset Kafka batch yang sudah di-commit ke ODS oleh write stage"""
+        for offsets, flush, written in writer.completed(timeout):
+            # Sumber kebenaran posisi adalah checkpoint ODS; commit Kafka untuk
+            # monitoring lag dan fallback jika tabel checkpoint kosong.
+            consumer.commit(offsets)
+            policy.flushed(flush)
+            FLUSH_BATCH_ROWS.set((), policy.batch_rows)
+            if written:
+                counts = total_counts()
+                saved = sum(applier.compactor.saved_total() for applier in appliers)
+                print(f"✓ Processed: {counts['customers']} customers, {counts['credit_applications']} applications, {counts['vehicle_ownership']} vehicles "
+                      f"(compaction saved {saved} writes, flush: {flush[0]}, batch {policy.batch_rows} rows, "
+                      f"queue {writer.inflight}/{writer.max_batches})...")
     
     try:
         while True:
-            # Poll messages dengan timeout
-            msg_pack = consumer.poll(timeout_ms=1000, max_records=100)
+            commit_completed()
+            if lag_monitor is not None:
+                lag_monitor.maybe_refresh()
+            WRITE_QUEUE_DEPTH.set((), writer.inflight)
+            
+            # Backpressure: pause semua partition selama write queue penuh
+            if writer.full() and not paused:
+                consumer.pause(*topic_partitions)
+                paused = True
+                pause_count += 1
+                paused_since = time.monotonic()
+                if pause_count == 1 or pause_count % 50 == 0:
+                    print(f"⚠ Write queue penuh ({writer.inflight}/{writer.max_batches} batch), "
+                          f"pause fetch Kafka ({pause_count} kali)")
+            elif paused and not writer.full():
+                consumer.resume(*[tp for tp in topic_partitions if tp not in drained])
+                paused = False
+                paused_seconds += time.monotonic() - paused_since
+            
+            if paused:
+                # Partition di-pause: tunggu write selesai (poll tetap dipanggil
+                # supaya metadata/koneksi Kafka tetap terjaga)
+                consumer.poll(timeout_ms=0)
+                commit_completed(timeout=0.1)
+                continue
+            
+            # Batch lebih besar selama snapshot (COPY efisien untuk batch besar)
+            floor = max(row_floor, SNAPSHOT_POLL_RECORDS) if snapshot_active() else row_floor
+            msg_pack = consumer.poll(timeout_ms=policy.poll_timeout_ms(idle_timeout_ms),
+                                     max_records=policy.poll_max_records(floor))
+            
+            if mode == 'drain':
+                msg_pack = trim_to_end_offsets(consumer, msg_pack, end_offsets, drained)
+            
+            if msg_pack:
+                empty_poll_count = 0  # Reset counter jika ada message
+                idle_timeout_ms = 1000
+                message_count += sum(len(messages) for messages in msg_pack.values())
+                policy.add(msg_pack)
+                for tp, messages in msg_pack.items():
+                    pending.setdefault(tp, []).extend(messages)
+            
+            reason = policy.reason(row_floor=floor)
+            finished = bool(stop_requested) or (mode == 'drain' and len(drained) == len(topic_partitions))
+            if finished:
+                if pending:
+                    writer.submit(pending, policy.take('shutdown' if stop_requested else 'drain'))
+                    pending = {}
+                if stop_requested:
+                    print("\n✓ SIGTERM diterima: flush batch terakhir lalu stop")
+                else:
+                    print("\n✓ Semua partition sudah mencapai end offset saat start")
+                print(f"   Total messages processed: {message_count}")
+                break
+            if reason is not None:
+                # Batch + checkpoint offset ditulis write stage (per worker satu
+                # transaksi PostgreSQL); offset Kafka di-commit setelah selesai
+                writer.submit(pending, policy.take(reason))
+                pending = {}
+                continue
             
-            if not msg_pack:
+            if not msg_pack and not pending and not writer.inflight:
+                if mode == 'daemon':
+                    # Backoff idle: long poll lebih panjang, langsung kembali saat ada message
+                    idle_timeout_ms = min(idle_timeout_ms * 2, IDLE_MAX_BACKOFF_MS)
+                    continue
+                if mode == 'drain':
+                    continue
                 empty_poll_count += 1
                 if empty_poll_count % 5 == 0:
                     print(f"  Waiting for messages... (empty polls: {empty_poll_count})")
                 if empty_poll_count >= max_empty_polls:
                     print(f"\n⚠ Tidak ada message baru setelah {max_empty_polls} kali poll")
                     print(f"   Total messages processed: {message_count}")
+                    print_stats()
                     break
-                continue
-            
-            empty_poll_count = 0  # Reset counter jika ada message
-            
-            # Process semua messages dalam batch
-            for topic_partition, messages in msg_pack.items():
-                for message in messages:
-                    message_count += 1
-                    topic = message.topic
-                    value = message.value
-                    
-                    if not value:
-                        print(f"⚠ Message {message_count} di {message.topic}: value is None")
-                        continue
-                    
-                    if 'payload' not in value:
-                        print(f"⚠ Message {message_count} di {message.topic}: tidak ada payload")
-                        print(f"   Keys: {list(value.keys()) if isinstance(value, dict) else type(value)}")
-                        continue
-                    
-                    payload = value['payload']
-                    
-                    # Process berdasarkan topic
-                    if 'customers' in topic:
-                        try:
-                            record = convert_customer_record(payload)
-                            if record and record.get('customer_id'):
-                                if insert_customer(conn, record):
-                                    customer_count += 1
-                                    if (customer_count + app_count + vehicle_count) % 10 == 0:
-                                        print(f"✓ Processed: {customer_count} customers, {app_count} applications, {vehicle_count} vehicles...")
-                        except Exception as e:
-                            print(f"✗ Error processing customer message {message_count}: {e}")
-                            if message_count <= 5:
-                                import traceback
-                                traceback.print_exc()
-                    
-                    elif 'credit_applications' in topic:
-                        try:
-                            record = convert_credit_application_record(payload)
-                            if record and record.get('application_id'):
-                                if insert_credit_application(conn, record):
-                                    app_count += 1
-                                    if (customer_count + app_count + vehicle_count) % 10 == 0:
-                                        print(f"✓ Processed: {customer_count} customers, {app_count} applications, {vehicle_count} vehicles...")
-                            else:
-                                if message_count % 50 == 0:
-                                    print(f"⚠ Credit application record tanpa application_id: {payload.get('application_id', 'N/A')}")
-                        except Exception as e:
-                            print(f"✗ Error processing credit_application message {message_count}: {e}")
-                            if message_count <= 5:  # Print detail untuk 5 error pertama
-                                import traceback
-                                traceback.print_exc()
-                    
-                    elif 'vehicle_ownership' in topic:
-                        try:
-                            record = convert_vehicle_ownership_record(payload)
-                            if record and record.get('ownership_id'):
-                                if insert_vehicle_ownership(conn, record):
-                                    vehicle_count += 1
-                                    if (customer_count + app_count + vehicle_count) % 10 == 0:
-                                        print(f"✓ Processed: {customer_count} customers, {app_count} applications, {vehicle_count} vehicles...")
-                            else:
-                                if message_count % 50 == 0:
-                                    print(f"⚠ Vehicle ownership record tanpa ownership_id: {payload.get('ownership_id', 'N/A')}")
-                        except Exception as e:
-                            print(f"✗ Error processing vehicle_ownership message {message_count}: {e}")
-                            if message_count <= 5:  # Print detail untuk 5 error pertama
-                                import traceback
-                                traceback.print_exc()
-            
-            # Commit offset setelah batch
-            consumer.commit()
             
     except KeyboardInterrupt:
-        total = customer_count + app_count + vehicle_count
+        counts = total_counts()
+        total = sum(counts.values())
         print(f"\n\n✓ Stopped. Total messages received: {message_count}")
         print(f"  Total processed: {total} records")
-        print(f"  - Customers: {customer_count}")
-        print(f"  - Credit Applications: {app_count}")
-        print(f"  - Vehicle Ownership: {vehicle_count}")
+        print(f"  - Customers: {counts['customers']}")
+        print(f"  - Credit Applications: {counts['credit_applications']}")
+        print(f"  - Vehicle Ownership: {counts['vehicle_ownership']}")
+        print_stats()
+        if policy.samples:
+            print(f"  Flush: batch {policy.batch_rows} rows, p99 latency sink {policy.p99_ms():.0f} ms")
+        if paused:
+            paused_seconds += time.monotonic() - paused_since
+        print(f"  Write queue: max depth {writer.max_depth}/{writer.max_batches}, "
+              f"pause {pause_count} kali ({paused_seconds:.1f} detik)")
     except Exception as e:
+        exit_code = 1
         print(f"\n✗ Error: {e}")
         print(f"  Messages received: {message_count}")
-        print(f"  Records processed: {customer_count + app_count + vehicle_count}")
+        print(f"  Records processed: {sum(total_counts().values())}")
         import traceback
         traceback.print_exc()
     finally:
+        # Batch yang sudah antre tetap ditulis; offset-nya di-commit jika bisa
+        if writer.inflight:
+            print(f"  Menunggu {writer.inflight} batch di write queue...")
+        writer.close()
+        try:
+            commit_completed()
+        except Exception as e:
+            print(f"⚠ Warning: Gagal commit offset batch terakhir: {e}")
+        engine.close()
+        if decoder is not None:
+            decoder.close()
         consumer.close()
-        conn.close()
+        dead_letter.close()
+        pool.closeall()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    if finished:
+        print_stats()
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
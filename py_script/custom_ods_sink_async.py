@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Custom ODS Sink (asyncio): fetch Kafka dan write PostgreSQL berjalan overlap
+
+Alternatif dari custom_ods_sink.main(). Loop sync menjalankan poll -> convert
+-> insert -> commit berurutan, jadi latency fetch Kafka dan latency write
+PostgreSQL saling menjumlah. Di sini fetch + convert batch berikutnya jalan
+selama batch sebelumnya masih ditulis ke ODS.
+
+Konversi (deserializer, converter, compaction) memakai kode yang sama dengan
+custom_ods_sink.py; hanya client Kafka/PostgreSQL yang async.
+
+Dependency (opsional, hanya untuk engine ini):
+    pip install aiokafka asyncpg
+
+Contoh:
+    python py_script/custom_ods_sink_async.py
+    python py_script/custom_ods_sink_async.py --from-beginning
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+try:
+    from aiokafka import AIOKafkaConsumer, TopicPartition
+except ImportError:
+    AIOKafkaConsumer = None
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from custom_ods_sink import (
+    CHECKPOINT_DDL,
+    CHECKPOINT_TABLE,
+    CONSUMER_GROUP_ID,
+    DELETE_MODE,
+    DLQ_LOCATION,
+    FLUSH_LINGER_MS,
+    FLUSH_MAX_BYTES,
+    FLUSH_MAX_ROWS,
+    FLUSH_TARGET_P99_MS,
+    KAFKA_BOOTSTRAP_SERVERS,
+    PG_CONFIG,
+    SINK_TABLES,
+    PG_RECONNECT_MAX_BACKOFF,
+    PG_TRANSIENT_RETRIES,
+    SNAPSHOT_COPY_ENABLED,
+    SNAPSHOT_MIN_ROWS,
+    SNAPSHOT_POLL_RECORDS,
+    STAGING_TABLE_PREFIX,
+    TOPICS,
+    BatchApplier,
+    FlushPolicy,
+    batch_of_items,
+    create_deserializer,
+    dead_letter_entry,
+    decimal_schema,
+    error_sqlstate,
+    is_data_error,
+    is_transient_error,
+    observe_freshness,
+    offset_override_for,
+    open_dead_letter,
+    parse_offset_overrides,
+    print_compaction_stats,
+    table_for_topic,
+)
+
+# Jumlah batch hasil convert yang boleh antre menunggu write. 1 = fetch paling
+# banyak satu batch di depan write (cukup untuk overlap, memory tetap kecil).
+PIPELINE_DEPTH = 1
+
+CHECKPOINT_UPSERT_SQL_ASYNC = f"""
+    INSERT INTO {CHECKPOINT_TABLE} (consumer_group, topic, partition, next_offset, updated_at)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (consumer_group, topic, partition) DO UPDATE SET
+        next_offset = EXCLUDED.next_offset,
+        updated_at = EXCLUDED.updated_at
+"""
+
+def check_dependencies():
+    """Exit dengan pesan install jika aiokafka / asyncpg tidak ada"""
+    if AIOKafkaConsumer is None:
+        print("✗ Error: aiokafka tidak terinstall")
+        print("  Install dengan: pip install aiokafka")
+        sys.exit(1)
+    if asyncpg is None:
+        print("✗ Error: asyncpg tidak terinstall")
+        print("  Install dengan: pip install asyncpg")
+        sys.exit(1)
+
+def async_connection_errors():
+    """Exception asyncpg yang berarti koneksi putus (bukan error data)"""
+    return (asyncpg.PostgresConnectionError, asyncpg.ConnectionDoesNotExistError,
+            asyncpg.InterfaceError, OSError)
+
+def async_delete_sql(sink_table):
+    """Statement delete set-based (pk = ANY) dengan placeholder asyncpg"""
+    return f"DELETE FROM {sink_table.name} WHERE {sink_table.pk} = ANY($1::{sink_table.pk_array_type})"
+
+def async_upsert_sql(sink_table):
+    """Statement upsert satu row dengan placeholder asyncpg ($1..$n)"""
+    col_list = ", ".join(sink_table.column_names)
+    placeholders = ", ".join(f"${i}" for i in range(1, len(sink_table.column_names) + 1))
+    return f"INSERT INTO {sink_table.name} ({col_list}) VALUES ({placeholders})\n    {sink_table.conflict_sql}"
+
+class AsyncOdsWriter:
+    """Writer asyncpg: satu transaksi per batch, checkpoint offset ikut di dalamnya
+
+    Upsert memakai executemany (di-pipeline asyncpg dalam satu round trip
+    per batch). Record snapshot (cdc_operation 'r') di-load via COPY ke
+    staging table lalu merge, sama seperti SnapshotLoader di engine sync;
+    state snapshot dipulihkan jika transaksi batch di-rollback.
+    Batch yang gagal di-bisection; record rusak masuk dead-letter queue.
+    """
+
+    def __init__(self, conn, group_id, dead_letter, snapshot=SNAPSHOT_COPY_ENABLED):
+        self.conn = conn
+        self.group_id = group_id
+        self.dead_letter = dead_letter
+        self.dead_letters = 0
+        self.snapshot = snapshot
+        self.snapshot_tables = set()
+        self.snapshot_seen = {}
+        self.upsert_sql = {name: async_upsert_sql(table) for name, table in SINK_TABLES.items()}
+        self.delete_sql = {name: async_delete_sql(table) for name, table in SINK_TABLES.items()}
+
+    @staticmethod
+    def rows_for(table, records):
+        columns = SINK_TABLES[table].column_names
+        return [tuple([record.get(column) for column in columns]) for record in records]
+
+    def _wants_snapshot(self, table, count):
+        """Sama dengan SnapshotLoader.wants: snapshot mode setelah SNAPSHOT_MIN_ROWS row 'r'"""
+        if table in self.snapshot_tables:
+            return True
+        seen = self.snapshot_seen[table] = self.snapshot_seen.get(table, 0) + count
+        return seen >= SNAPSHOT_MIN_ROWS
+
+    async def _load_snapshot(self, table, records):
+        sink_table = SINK_TABLES[table]
+        stage = f"{STAGING_TABLE_PREFIX}{table}"
+        col_list = ", ".join(sink_table.column_names)
+        if table not in self.snapshot_tables:
+            print(f"✓ Snapshot mode untuk {table}: COPY via {stage}")
+        await self.conn.execute(f"CREATE UNLOGGED TABLE IF NOT EXISTS {stage} (LIKE {table} INCLUDING DEFAULTS)")
+        await self.conn.execute(f"TRUNCATE {stage}")
+        await self.conn.copy_records_to_table(
+            stage, records=self.rows_for(table, records), columns=sink_table.column_names
+        )
+        await self.conn.execute(
+            f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {stage}\n    {sink_table.conflict_sql}"
+        )
+        self.snapshot_tables.add(table)
+
+    async def _finish_snapshot(self, table):
+        await self.conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE_PREFIX}{table}")
+        self.snapshot_tables.discard(table)
+        print(f"✓ Snapshot {table} selesai, kembali ke upsert path")
+
+    async def _save_checkpoints(self, offsets):
+        if not offsets:
+            return
+        now = datetime.now()
+        await self.conn.executemany(CHECKPOINT_UPSERT_SQL_ASYNC, [
+            (self.group_id, topic, partition, next_offset, now)
+            for (topic, partition), next_offset in offsets.items()
+        ])
+
+    async def write(self, batch, offsets, snapshot=True):
+        """Tulis batch (dict tabel -> {pk: record}) + checkpoint dalam satu transaksi
+
+        snapshot=False: record 'r' lewat upsert biasa dan state snapshot mode
+        tidak disentuh (dipakai bisection, seperti write_batch_bisect).
+        """
+        written = {}
+        saved = (set(self.snapshot_tables), dict(self.snapshot_seen))
+        try:
+            async with self.conn.transaction():
+                for table, records in batch.items():
+                    if not records:
+                        continue
+                    rows = list(records.values())
+                    if DELETE_MODE == 'hard':
+                        deletes = [r for r in rows if r.get('cdc_operation') == 'd']
+                        if deletes:
+                            rows = [r for r in rows if r.get('cdc_operation') != 'd']
+                            pk = SINK_TABLES[table].pk
+                            await self.conn.execute(self.delete_sql[table], [r[pk] for r in deletes])
+                    if self.snapshot and snapshot:
+                        snapshot_rows = [r for r in rows if r.get('cdc_operation') == 'r']
+                        if not snapshot_rows:
+                            # Fase snapshot tabel ini selesai
+                            self.snapshot_seen.pop(table, None)
+                            if table in self.snapshot_tables:
+                                await self._finish_snapshot(table)
+                        elif self._wants_snapshot(table, len(snapshot_rows)):
+                            rows = [r for r in rows if r.get('cdc_operation') != 'r']
+                            await self._load_snapshot(table, snapshot_rows)
+                    if rows:
+                        await self.conn.executemany(self.upsert_sql[table], self.rows_for(table, rows))
+                    written[table] = len(records)
+                await self._save_checkpoints(offsets)
+        except Exception:
+            # Transaksi di-rollback: DROP/COPY batal, state snapshot ikut dipulihkan
+            self.snapshot_tables, self.snapshot_seen = saved
+            raise
+        return written
+
+    async def write_retry(self, batch, offsets, snapshot=True):
+        """write() dengan retry untuk error transient, sama seperti write_batch_retry"""
+        for attempt in range(1, PG_TRANSIENT_RETRIES + 2):
+            try:
+                return await self.write(batch, offsets, snapshot)
+            except Exception as e:
+                if attempt > PG_TRANSIENT_RETRIES or not is_transient_error(e):
+                    raise
+                wait = min(0.5 * 2 ** (attempt - 1), PG_RECONNECT_MAX_BACKOFF)
+                print(f"⚠ Error transient PostgreSQL ({error_sqlstate(e)}), "
+                      f"ulang batch {attempt} dalam {wait:.1f} detik: {e}")
+                await asyncio.sleep(wait)
+
+    async def write_bisect(self, batch, error, sources, offsets):
+        """Fallback: bisection batch yang gagal, record yang gagal sendirian ke DLQ
+
+        Sama dengan write_batch_bisect di engine sync: bagian yang sehat
+        di-commit per transaksi, checkpoint ditulis setelah DLQ di-flush.
+        Snapshot path dimatikan selama bisection, jadi staging table tabel
+        yang masih snapshot tidak di-merge/drop di tengah jalan. Bagian yang
+        kena error transient ditulis ulang; koneksi putus dan error selain
+        error data di-raise ulang (record sehat tidak boleh masuk DLQ).
+        Return (dict tabel -> jumlah record yang ditulis, set (tabel, pk)
+        yang masuk DLQ).
+        """
+        items = [(table, key, record) for table, records in batch.items() for key, record in records.items()]
+        written = {}
+        dead = []
+        failed = [(items, error)]
+        while failed:
+            part, part_error = failed.pop()
+            if len(part) == 1:
+                table, key, record = part[0]
+                dead.append(dead_letter_entry(table, key, record, sources.get(table, {}).get(key),
+                                              part_error, self.group_id))
+                continue
+            mid = len(part) // 2
+            for half in (part[:mid], part[mid:]):
+                try:
+                    for table, n in (await self.write_retry(batch_of_items(half), None, snapshot=False)).items():
+                        written[table] = written.get(table, 0) + n
+                except async_connection_errors():
+                    raise
+                except Exception as e:
+                    if not is_data_error(e):
+                        raise
+                    failed.append((half, e))
+        if dead:
+            self.dead_letter.write(dead)
+            self.dead_letters += len(dead)
+            for entry in dead[:5]:
+                print(f"✗ DLQ {entry['table']} {entry['key']} ({entry['topic']}[{entry['partition']}] "
+                      f"offset {entry['offset']}): {entry['error']}")
+        try:
+            await self._save_checkpoints(offsets)
+        except async_connection_errors():
+            raise
+        except Exception as e:
+            print(f"✗ Error menyimpan checkpoint offset: {e}")
+        return written, {(entry['table'], entry['key']) for entry in dead}
+
+    async def close(self):
+        """Drop staging table snapshot yang masih ada"""
+        for table in list(self.snapshot_tables):
+            try:
+                await self._finish_snapshot(table)
+            except Exception as e:
+                print(f"⚠ Warning: Gagal drop staging table: {e}")
+
+async def fetch_loop(consumer, converter, writer, batches, policy, max_empty_polls=10):
+    """Fetch + convert message Kafka, antrekan batch ke writer (None = selesai)
+
+    Kapan batch di-flush (rows / bytes / linger, mode adaptive) diatur
+    FlushPolicy yang sama dengan engine sync; selama snapshot batch minimal
+    SNAPSHOT_POLL_RECORDS. Convert dijalankan di sini (CPU, di event loop)
+    sementara writer menunggu I/O PostgreSQL, jadi fetch batch berikutnya
+    overlap dengan write.
+    """
+    empty_poll_count = 0
+    offsets = {}
+    while True:
+        # Batch lebih besar selama snapshot (COPY efisien untuk batch besar)
+        floor = SNAPSHOT_POLL_RECORDS if writer.snapshot_tables else 0
+        msg_pack = await consumer.getmany(timeout_ms=policy.poll_timeout_ms(),
+                                          max_records=policy.poll_max_records(floor))
+        if msg_pack:
+            empty_poll_count = 0
+            policy.add(msg_pack)
+            for tp, messages in msg_pack.items():
+                if messages:
+                    offsets[(tp.topic, tp.partition)] = messages[-1].offset + 1
+                for message in messages:
+                    converter.add_message(message)
+
+        reason = policy.reason(row_floor=floor)
+        if reason is not None:
+            batch, sources = converter.compactor.drain(with_sources=True)
+            await batches.put((batch, sources, offsets, converter.take_failed(), policy.take(reason)))
+            offsets = {}
+            continue
+
+        if not msg_pack and not policy.rows:
+            empty_poll_count += 1
+            if empty_poll_count % 5 == 0:
+                print(f"  Waiting for messages... (empty polls: {empty_poll_count})")
+            if empty_poll_count >= max_empty_polls:
+                print(f"\n⚠ Tidak ada message baru setelah {max_empty_polls} kali poll")
+                break
+    await batches.put(None)
+
+async def write_loop(consumer, converter, writer, batches, policy):
+    """Tulis batch dari antrean ke ODS, lalu commit offset Kafka batch tersebut"""
+    counts = {table: 0 for table in SINK_TABLES}
+    while True:
+        item = await batches.get()
+        if item is None:
+            return counts
+        batch, sources, offsets, failed, flush = item
+        # Message gagal decode ke DLQ sebelum offset batch ini di-checkpoint
+        converter.write_failed(failed)
+        dead_keys = set()
+        try:
+            written = await writer.write_retry(batch, offsets)
+        except async_connection_errors():
+            raise
+        except Exception as e:
+            if not is_data_error(e):
+                raise
+            print(f"✗ Error writing batch, bisection untuk isolasi record rusak: {e}")
+            written, dead_keys = await writer.write_bisect(batch, e, sources, offsets)
+        observe_freshness(batch, sources, exclude=dead_keys)
+        for table, n in written.items():
+            counts[table] += n
+        if written:
+            print(f"✓ Processed: {counts['customers']} customers, {counts['credit_applications']} applications, "
+                  f"{counts['vehicle_ownership']} vehicles (compaction saved {converter.compactor.saved_total()} writes, "
+                  f"flush: {flush[0]}, batch {policy.batch_rows} rows)...")
+        # Commit offset batch ini saja (fetch mungkin sudah di depan)
+        await consumer.commit({
+            TopicPartition(topic, partition): next_offset
+            for (topic, partition), next_offset in offsets.items()
+        })
+        policy.flushed(flush)
+
+async def run(args, offset_overrides):
+    conn = await asyncpg.connect(**PG_CONFIG)
+    print("\n✓ Connected ke PostgreSQL")
+
+    group_id = args.group_id
+    print(f"\n✓ Consumer group: {group_id}")
+    consumer = AIOKafkaConsumer(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        group_id=group_id,
+        auto_offset_reset='earliest',  # Hanya untuk partition tanpa committed offset
+        enable_auto_commit=False,
+    )
+    await consumer.start()
+    writer = None
+    try:
+        deserialize = create_deserializer()
+        if hasattr(deserialize, 'bootstrap'):
+            for topic in TOPICS:
+                if topic not in deserialize.topic_schemas:
+                    table = table_for_topic(topic)
+                    numeric_columns = await conn.fetch(
+                        "SELECT column_name, numeric_scale FROM information_schema.columns "
+                        "WHERE table_schema = current_schema() AND table_name = $1 AND data_type = 'numeric'",
+                        table,
+                    )
+                    deserialize.topic_schemas[topic] = decimal_schema(table, [tuple(row) for row in numeric_columns])
+                    print(f"✓ Schema cache: {topic} dari tabel ODS {table}")
+        print(f"\n✓ Connected ke Kafka")
+        print(f"✓ Deserializer: {deserialize.name} (JSON backend: {deserialize.backend})")
+        print(f"✓ Listening topics: {', '.join(TOPICS)}")
+
+        # Metadata semua topic di-fetch dulu supaya partitions_for_topic terisi
+        await consumer.topics()
+        topic_partitions = []
+        for topic in TOPICS:
+            partitions = consumer.partitions_for_topic(topic)
+            if partitions:
+                topic_partitions.extend(TopicPartition(topic, p) for p in sorted(partitions))
+                print(f"  ✓ Topic {topic}: {len(partitions)} partition(s)")
+            else:
+                print(f"  ⚠ Topic {topic}: tidak ditemukan")
+        if not topic_partitions:
+            print("\n⚠ Tidak ada partition ditemukan. Cek apakah topics ada di Kafka.")
+            return
+        consumer.assign(topic_partitions)
+
+        await conn.execute(CHECKPOINT_DDL)
+        checkpoints = {
+            (row['topic'], row['partition']): row['next_offset']
+            for row in await conn.fetch(
+                f"SELECT topic, partition, next_offset FROM {CHECKPOINT_TABLE} WHERE consumer_group = $1",
+                group_id,
+            )
+        }
+        if args.from_beginning:
+            print("\nSeeking to beginning of all partitions (--from-beginning)...")
+            await consumer.seek_to_beginning(*topic_partitions)
+        elif offset_overrides:
+            print("\nSeeking ke offset override (--from-offset)...")
+            for tp in topic_partitions:
+                offset = offset_override_for(tp, offset_overrides)
+                if offset is not None:
+                    consumer.seek(tp, offset)
+        elif checkpoints:
+            print(f"\nSeeking ke checkpoint offset di {CHECKPOINT_TABLE}...")
+            for tp in topic_partitions:
+                offset = checkpoints.get((tp.topic, tp.partition))
+                if offset is not None:
+                    consumer.seek(tp, offset)
+
+        print("\nProcessing messages (asyncio, fetch/write overlap)...\n")
+        dead_letter = open_dead_letter(args.dlq)
+        print(f"✓ Dead-letter queue: {dead_letter.location}")
+        converter = BatchApplier(None, deserialize, group_id, dead_letter=dead_letter)
+        writer = AsyncOdsWriter(conn, group_id, dead_letter)
+        batches = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        policy = FlushPolicy(args.flush_max_rows, args.flush_max_bytes,
+                             args.flush_linger_ms, args.flush_target_p99_ms)
+        if policy.adaptive:
+            print(f"✓ Flush policy adaptive: target p99 {policy.target_p99_ms} ms, "
+                  f"batch {policy.min_rows}..{policy.max_rows} rows, max {policy.max_bytes} bytes")
+        else:
+            print(f"✓ Flush policy: max {policy.max_rows} rows / {policy.max_bytes} bytes / "
+                  f"linger {policy.linger_ms} ms")
+        fetch = asyncio.create_task(fetch_loop(consumer, converter, writer, batches, policy))
+        try:
+            counts = await write_loop(consumer, converter, writer, batches, policy)
+            await fetch
+        finally:
+            fetch.cancel()
+
+        print(f"   Total messages processed: {converter.message_count}")
+        print(f"   Total records written: {sum(counts.values())}")
+        print_compaction_stats(converter.compactor)
+        dead = writer.dead_letters + converter.dead_letters
+        if dead:
+            print(f"  Dead-letter queue: {dead} record di {dead_letter.location}")
+    finally:
+        if writer is not None:
+            await writer.close()
+            writer.dead_letter.close()
+        await consumer.stop()
+        await conn.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Custom ODS Sink (asyncio): Kafka (Debezium) -> PostgreSQL ODS")
+    parser.add_argument("--group-id", default=CONSUMER_GROUP_ID,
+                        help=f"Consumer group (default: {CONSUMER_GROUP_ID}); resume dari checkpoint offset")
+    parser.add_argument("--flush-max-rows", type=int, default=FLUSH_MAX_ROWS,
+                        help=f"Flush jika batch mencapai N row (default: {FLUSH_MAX_ROWS})")
+    parser.add_argument("--flush-max-bytes", type=int, default=FLUSH_MAX_BYTES,
+                        help=f"Flush jika total value mencapai N bytes (default: {FLUSH_MAX_BYTES})")
+    parser.add_argument("--flush-linger-ms", type=int, default=FLUSH_LINGER_MS,
+                        help=f"Flush jika message tertua sudah menunggu N ms (default: {FLUSH_LINGER_MS})")
+    parser.add_argument("--flush-target-p99-ms", type=int, default=FLUSH_TARGET_P99_MS,
+                        help="Mode adaptive: target p99 latency sink dalam ms (0 = nonaktif)")
+    parser.add_argument("--dlq", default=DLQ_LOCATION,
+                        help=f"Dead-letter queue record gagal: file JSONL atau kafka:<topic> (default: {DLQ_LOCATION})")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--from-beginning", action="store_true",
+                       help="Abaikan committed offset, mulai dari awal semua partition (backfill)")
+    start.add_argument("--from-offset", action="append", metavar="OFFSET|TOPIC:PARTITION:OFFSET",
+                       help="Mulai dari offset tertentu; bisa diulang per partition")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        offset_overrides = parse_offset_overrides(args.from_offset)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(2)
+    check_dependencies()
+    print("=" * 60)
+    print("Custom ODS Sink Consumer (asyncio)")
+    print("=" * 60)
+    print("\n⚠ PERINGATAN: Script ini akan consume dari Kafka")
+    print("Pastikan sink connectors sudah di-stop untuk menghindari duplicate processing")
+    print("\nTekan Ctrl+C untuk stop")
+    try:
+        asyncio.run(run(args, offset_overrides))
+    except KeyboardInterrupt:
+        print("\n\n✓ Stopped.")
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Load generator message Debezium sintetis untuk customers, credit_applications
+dan vehicle_ownership
+
+Message dibentuk persis seperti output connector (JsonConverter dengan
+schema + ExtractNewRecordState, delete.handling.mode=rewrite, tombstone
+tidak di-drop): value {"schema":...,"payload":...} dengan __op,
+__source_ts_ms, __source_table dan __deleted, key {"schema":...,"payload":
+{pk}}. Schema di-generate dari TABLE_REGISTRY sink, jadi tabel baru di
+registry otomatis ikut.
+
+Parameter beban:
+- volume: jumlah message
+- key skew: index key = floor(n * u ** skew), u uniform; 1 = merata,
+  makin besar makin banyak event jatuh ke sedikit key "panas"
+- op mix: bobot r (snapshot) / c / u / d; r dan c membuat key baru, u dan d
+  memilih key yang masih hidup (key yang sudah di-delete keluar dari pool);
+  setiap d diikuti tombstone
+
+Jalan offline (tidak butuh Kafka / PostgreSQL) kecuali --produce:
+    python py_script/debezium_loadgen.py --records 5 --sample
+    python py_script/debezium_loadgen.py --records 100000 --op-mix r=0,c=1,u=8,d=1 --produce
+"""
+
+import argparse
+import base64
+import json
+import random
+import sys
+import time
+import zlib
+from collections import namedtuple
+from datetime import date, datetime
+
+from custom_ods_sink import (
+    DATE,
+    DECIMAL,
+    INT,
+    KAFKA_BOOTSTRAP_SERVERS,
+    OPERATION,
+    SINK_TABLES,
+    TIMESTAMP,
+    topic_for_table,
+)
+
+# Atribut sama dengan ConsumerRecord kafka-python, jadi bisa langsung masuk sink
+SyntheticMessage = namedtuple('SyntheticMessage', 'topic partition offset timestamp key value')
+
+DEFAULT_OP_MIX = {'r': 0.0, 'c': 0.2, 'u': 0.7, 'd': 0.1}
+OPS = ('r', 'c', 'u', 'd')
+
+# Prefix primary key sintetis per tabel (bench_sink.py membersihkan row ini)
+KEY_PREFIX = "BENCH-"
+
+# Vocabulary kolom enum/kategori supaya value mirip data MySQL asli
+VOCABULARY = {
+    'gender': ('Male', 'Female'),
+    'marital_status': ('Single', 'Married', 'Divorced', 'Widowed'),
+    'city': ('Jakarta', 'Surabaya', 'Bandung', 'Medan', 'Semarang', 'Makassar'),
+    'province': ('DKI Jakarta', 'Jawa Timur', 'Jawa Barat', 'Sumatera Utara', 'Jawa Tengah'),
+    'employment_status': ('Permanent', 'Contract', 'Self-Employed'),
+    'education_level': ('SMA', 'D3', 'S1', 'S2'),
+    'customer_segment': ('Prime', 'Near Prime', 'Subprime'),
+    'status': ('Active', 'Inactive'),
+    'vehicle_type': ('Motor', 'Mobil', 'Truk', 'Bus'),
+    'vehicle_brand': ('Honda', 'Yamaha', 'Toyota', 'Suzuki', 'Mitsubishi'),
+    'brand': ('Honda', 'Yamaha', 'Toyota', 'Suzuki', 'Mitsubishi'),
+    'application_status': ('Pending', 'Under Review', 'Approved', 'Rejected', 'Cancelled'),
+    'payment_status': ('Current', 'Late', 'Default', 'Completed'),
+    'collateral_status': ('Held', 'Released'),
+    'ownership_status': ('Active', 'Sold', 'Transferred'),
+}
+
+# Rentang (min, max) kolom angka; harus muat di NUMERIC(p,s) ods_schema.sql
+RANGES = {
+    'monthly_income': (3_000_000, 75_000_000),
+    'years_of_employment': (0, 35),
+    'credit_score': (300, 850),
+    'vehicle_year': (2005, 2025),
+    'year': (2005, 2025),
+    'vehicle_price': (15_000_000, 900_000_000),
+    'down_payment': (1_500_000, 200_000_000),
+    'loan_amount': (10_000_000, 700_000_000),
+    'tenor_months': (12, 60),
+    'interest_rate': (5, 25),
+    'monthly_installment': (500_000, 25_000_000),
+    'outstanding_amount': (0, 700_000_000),
+}
+DEFAULT_RANGE = (0, 1_000_000)
+
+def parse_op_mix(value):
+    """Parse 'r=0,c=2,u=7,d=1' -> dict bobot op (dinormalisasi)"""
+    mix = dict.fromkeys(OPS, 0.0)
+    for part in value.split(','):
+        op, _, weight = part.partition('=')
+        op = op.strip()
+        if op not in mix:
+            raise ValueError(f"Op tidak dikenal di op mix: {op!r} (pilihan: {', '.join(OPS)})")
+        mix[op] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError(f"Op mix tanpa bobot: {value}")
+    return {op: weight / total for op, weight in mix.items()}
+
+def format_op_mix(mix):
+    return ",".join(f"{op}={mix.get(op, 0):g}" for op in OPS)
+
+def _connect_field(column):
+    """Field schema Connect (JsonConverter) untuk satu kolom registry"""
+    field = {'field': column.source or column.name, 'optional': True}
+    if column.type == INT:
+        field['type'] = 'int32'
+    elif column.type == DATE:
+        field.update(type='int32', name='io.debezium.time.Date', version=1)
+    elif column.type == TIMESTAMP:
+        field.update(type='int64', name='io.debezium.time.Timestamp', version=1)
+    elif column.type == DECIMAL:
+        field.update(type='bytes', name='org.apache.kafka.connect.data.Decimal', version=1,
+                     parameters={'scale': str(column.scale or 0)})
+    else:
+        field['type'] = 'string'
+    return field
+
+def connect_schema(table):
+    """Schema value Connect satu tabel (setelah ExtractNewRecordState + add.fields)"""
+    sink_table = SINK_TABLES[table]
+    fields = [_connect_field(column) for column in sink_table.columns]
+    fields.append({'field': '__source_table', 'type': 'string', 'optional': True})
+    fields.append({'field': '__deleted', 'type': 'string', 'optional': True})
+    for field in fields:
+        if field['field'] == sink_table.pk:
+            field['optional'] = False
+    return {'type': 'struct', 'optional': False, 'name': f"{topic_for_table(table)}.Value", 'fields': fields}
+
+def key_schema(table):
+    """Schema key Connect satu tabel (primary key string)"""
+    pk = SINK_TABLES[table].pk
+    return {'type': 'struct', 'optional': False, 'name': f"{topic_for_table(table)}.Key",
+            'fields': [{'field': pk, 'type': 'string', 'optional': False}]}
+
+def encode_decimal(value, scale):
+    """Encode angka ke format Debezium precise (base64 unscaled two's-complement)"""
+    unscaled = int(round(value * 10 ** scale))
+    length = max(1, (unscaled.bit_length() + 8) // 8)
+    return base64.b64encode(unscaled.to_bytes(length, 'big', signed=True)).decode()
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class TableGenerator:
+    """Generator payload satu tabel; schema di-serialize sekali"""
+
+    def __init__(self, table, rng):
+        self.table = table
+        self.rng = rng
+        self.sink_table = SINK_TABLES[table]
+        self.topic = topic_for_table(table)
+        self.value_prefix = b'{"schema":' + _dumps(connect_schema(table)) + b',"payload":'
+        self.key_prefix = b'{"schema":' + _dumps(key_schema(table)) + b',"payload":'
+        self.columns = [column for column in self.sink_table.columns if column.type != OPERATION
+                        and column.name != 'cdc_timestamp']
+        self.epoch_2020 = (date(2020, 1, 1) - date(1970, 1, 1)).days
+
+    def key_id(self, index):
+        return f"{KEY_PREFIX}{self.table[:3].upper()}{index:08d}"
+
+    def _value(self, column, key, now_ms):
+        rng = self.rng
+        if column.name == self.sink_table.pk:
+            return key
+        if column.name in VOCABULARY:
+            return rng.choice(VOCABULARY[column.name])
+        if column.type == INT:
+            return rng.randint(*RANGES.get(column.name, DEFAULT_RANGE))
+        if column.type == DATE:
+            return self.epoch_2020 + rng.randint(-9000, 2000)
+        if column.type == TIMESTAMP:
+            return now_ms - rng.randint(0, 3 * 365 * 86400) * 1000
+        if column.type == DECIMAL:
+            return encode_decimal(rng.uniform(*RANGES.get(column.name, DEFAULT_RANGE)), column.scale or 0)
+        if column.name.endswith('_id'):
+            return f"{KEY_PREFIX}CUS{rng.randint(0, 99999):08d}"
+        return f"{column.name}-{rng.randint(0, 1_000_000)}"
+
+    def value(self, key, op, now_ms):
+        """Bytes message value (envelope JSON) untuk satu event"""
+        payload = {column.source or column.name: self._value(column, key, now_ms) for column in self.columns}
+        payload['__op'] = op
+        payload['__source_ts_ms'] = now_ms
+        payload['__source_table'] = self.table
+        payload['__deleted'] = 'true' if op == 'd' else 'false'
+        return self.value_prefix + _dumps(payload) + b'}'
+
+    def key(self, key):
+        return self.key_prefix + _dumps({self.sink_table.pk: key}) + b'}'
+
+class LoadGenerator:
+    """Stream message Debezium sintetis dengan volume, skew key dan op mix tertentu"""
+
+    def __init__(self, tables=None, skew=1.0, op_mix=None, partitions=1, seed=42, lag_ms=0):
+        self.rng = random.Random(seed)
+        self.tables = [TableGenerator(table, self.rng) for table in (tables or list(SINK_TABLES))]
+        self.skew = skew
+        self.op_mix = op_mix or DEFAULT_OP_MIX
+        self.partitions = max(1, partitions)
+        self.lag_ms = lag_ms
+        self.ops, self.weights = zip(*self.op_mix.items())
+        self.key_counts = {generator.table: 0 for generator in self.tables}
+        # Key hidup per tabel (kandidat u/d) dan posisinya di list untuk hapus O(1)
+        self.live = {generator.table: [] for generator in self.tables}
+        self.live_index = {generator.table: {} for generator in self.tables}
+        self.offsets = {}
+
+    def _partition(self, key):
+        return zlib.crc32(key.encode()) % self.partitions
+
+    def _message(self, generator, key, value, now_ms):
+        partition = self._partition(key)
+        tp = (generator.topic, partition)
+        offset = self.offsets.get(tp, 0)
+        self.offsets[tp] = offset + 1
+        return SyntheticMessage(generator.topic, partition, offset, now_ms + self.lag_ms,
+                                generator.key(key), value)
+
+    def _existing_key(self, generator):
+        live = self.live[generator.table]
+        count = len(live)
+        return live[min(count - 1, int(count * self.rng.random() ** self.skew))]
+
+    def _add_live(self, table, key):
+        self.live_index[table][key] = len(self.live[table])
+        self.live[table].append(key)
+
+    def _remove_live(self, table, key):
+        """Keluarkan key yang di-delete dari pool (tukar dengan elemen terakhir)"""
+        live = self.live[table]
+        index = self.live_index[table].pop(key)
+        last = live.pop()
+        if index < len(live):
+            live[index] = last
+            self.live_index[table][last] = index
+
+    def messages(self, count):
+        """Generate count message (tombstone setelah delete ikut dihitung)"""
+        produced = 0
+        rng = self.rng
+        while produced < count:
+            generator = rng.choice(self.tables)
+            op = rng.choices(self.ops, self.weights)[0]
+            table = generator.table
+            now_ms = int(time.time() * 1000)
+            if op in ('u', 'd') and not self.live[table]:
+                op = 'c'
+            if op in ('r', 'c'):
+                key = generator.key_id(self.key_counts[table])
+                self.key_counts[table] += 1
+                self._add_live(table, key)
+            else:
+                key = self._existing_key(generator)
+                if op == 'd':
+                    self._remove_live(table, key)
+            yield self._message(generator, key, generator.value(key, op, now_ms), now_ms)
+            produced += 1
+            if op == 'd' and produced < count:
+                yield self._message(generator, key, None, now_ms)
+                produced += 1
+
+def check_partitions(producer, topics, partitions):
+    """Pastikan setiap topic punya minimal `partitions` partition
+
+    Message dikirim ke partition hasil hash key generator; partition yang
+    tidak ada di broker membuat send() gagal atau menunggu metadata.
+    """
+    for topic in sorted(topics):
+        available = producer.partitions_for(topic)
+        if not available:
+            raise ValueError(f"Topic {topic} tidak ditemukan di Kafka ({KAFKA_BOOTSTRAP_SERVERS})")
+        if partitions > len(available):
+            raise ValueError(f"Topic {topic} hanya punya {len(available)} partition, "
+                             f"--partitions {partitions} melebihi itu")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator message Debezium sintetis")
+    parser.add_argument("--records", type=int, default=1000, help="Jumlah message (default: 1000)")
+    parser.add_argument("--table", action="append", choices=sorted(SINK_TABLES),
+                        help="Tabel yang di-generate (bisa diulang; default: semua)")
+    parser.add_argument("--skew", type=float, default=1.0, help="Skew key untuk update/delete (1 = merata)")
+    parser.add_argument("--op-mix", default=format_op_mix(DEFAULT_OP_MIX),
+                        help=f"Bobot op r/c/u/d (default: {format_op_mix(DEFAULT_OP_MIX)})")
+    parser.add_argument("--partitions", type=int, default=1, help="Jumlah partition per topic (hash key)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sample", action="store_true", help="Print message yang di-generate")
+    parser.add_argument("--produce", action="store_true", help="Kirim message ke Kafka (KAFKA_BOOTSTRAP_SERVERS)")
+    args = parser.parse_args()
+
+    try:
+        op_mix = parse_op_mix(args.op_mix)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        sys.exit(2)
+    generator = LoadGenerator(args.table, args.skew, op_mix, args.partitions, args.seed)
+
+    producer = None
+    if args.produce:
+        from kafka import KafkaProducer
+        from kafka.errors import KafkaTimeoutError
+        producer = KafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, linger_ms=20)
+        try:
+            check_partitions(producer, {table.topic for table in generator.tables}, generator.partitions)
+        except (ValueError, KafkaTimeoutError) as e:
+            producer.close()
+            print(f"✗ Error: {e}")
+            sys.exit(2)
+
+    started = time.perf_counter()
+    nbytes = 0
+    for message in generator.messages(args.records):
+        nbytes += len(message.value or b'')
+        if args.sample:
+            print(f"{message.topic}[{message.partition}]@{message.offset} key={message.key.decode()}")
+            print(f"  {message.value.decode() if message.value else None}")
+        if producer is not None:
+            producer.send(message.topic, key=message.key, value=message.value, partition=message.partition)
+    if producer is not None:
+        producer.flush()
+        producer.close()
+    elapsed = time.perf_counter() - started
+    print(f"✓ {args.records} message ({nbytes / 1e6:.1f} MB value) dalam {elapsed:.2f} detik "
+          f"(op mix {format_op_mix(op_mix)}, skew {args.skew:g})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Schema registry lokal (file-backed) sebagai pengganti Confluent Schema Registry
+untuk development dan test sink Avro tanpa registry sungguhan.
+
+Layout direktori: satu file <schema_id>.avsc per schema.
+
+Contoh:
+    python py_script/local_schema_registry.py register ./schema_registry customers.avsc
+    python py_script/local_schema_registry.py list ./schema_registry
+    python py_script/local_schema_registry.py get ./schema_registry 1
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+
+try:
+    import fastavro
+except ImportError:
+    fastavro = None
+
+# Confluent wire format: magic byte 0 + schema id (4 byte big-endian) + Avro binary
+MAGIC_BYTE = 0
+HEADER_SIZE = 5
+
+class FileSchemaRegistry:
+    """Registry schema Avro berbasis direktori: <id>.avsc"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _schema_path(self, schema_id):
+        return os.path.join(self.path, f"{int(schema_id)}.avsc")
+
+    def ids(self):
+        """Daftar schema id yang terdaftar (urut)"""
+        return sorted(
+            int(name[:-len(".avsc")]) for name in os.listdir(self.path)
+            if name.endswith(".avsc") and name[:-len(".avsc")].isdigit()
+        )
+
+    def get_schema(self, schema_id):
+        """Ambil schema (dict) berdasarkan id; KeyError jika tidak ada"""
+        try:
+            with open(self._schema_path(schema_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Schema id {schema_id} tidak ada di {self.path}")
+
+    def register(self, schema):
+        """Daftarkan schema, return id; schema identik memakai id yang sama"""
+        canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'))
+        ids = self.ids()
+        for schema_id in ids:
+            existing = json.dumps(self.get_schema(schema_id), sort_keys=True, separators=(',', ':'))
+            if existing == canonical:
+                return schema_id
+        schema_id = (ids[-1] + 1) if ids else 1
+        with open(self._schema_path(schema_id), 'w') as f:
+            json.dump(schema, f, indent=2)
+        return schema_id
+
+class HttpSchemaRegistry:
+    """Client minimal Confluent Schema Registry (GET /schemas/ids/{id})"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def get_schema(self, schema_id):
+        import requests
+        response = requests.get(f"{self.url}/schemas/ids/{int(schema_id)}", timeout=10)
+        if response.status_code == 404:
+            raise KeyError(f"Schema id {schema_id} tidak ada di {self.url}")
+        response.raise_for_status()
+        return json.loads(response.json()['schema'])
+
+def open_registry(location):
+    """Registry dari URL (http/https) atau path direktori lokal"""
+    if location.startswith(("http://", "https://")):
+        return HttpSchemaRegistry(location)
+    return FileSchemaRegistry(location)
+
+def encode_confluent_avro(schema_id, parsed_schema, record):
+    """Encode record ke Confluent wire format (untuk test / load generator)"""
+    buf = io.BytesIO()
+    buf.write(bytes([MAGIC_BYTE]))
+    buf.write(int(schema_id).to_bytes(4, 'big'))
+    fastavro.schemaless_writer(buf, parsed_schema, record)
+    return buf.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema registry lokal (file-backed)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_register = sub.add_parser("register", help="Daftarkan file .avsc")
+    p_register.add_argument("registry_dir")
+    p_register.add_argument("schema_file")
+    p_list = sub.add_parser("list", help="Daftar schema id")
+    p_list.add_argument("registry_dir")
+    p_get = sub.add_parser("get", help="Tampilkan schema berdasarkan id")
+    p_get.add_argument("registry_dir")
+    p_get.add_argument("schema_id", type=int)
+    args = parser.parse_args()
+
+    registry = FileSchemaRegistry(args.registry_dir)
+    if args.command == "register":
+        with open(args.schema_file, 'r') as f:
+            schema = json.load(f)
+        schema_id = registry.register(schema)
+        print(f"✓ Schema {args.schema_file} terdaftar dengan id {schema_id}")
+    elif args.command == "list":
+        for schema_id in registry.ids():
+            schema = registry.get_schema(schema_id)
+            print(f"  {schema_id}: {schema.get('namespace', '')}.{schema.get('name', '')}")
+    elif args.command == "get":
+        try:
+            print(json.dumps(registry.get_schema(args.schema_id), indent=2))
+        except KeyError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
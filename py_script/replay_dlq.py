@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Replay dead-letter queue custom_ods_sink ke ODS PostgreSQL
+
+Entry DLQ (file JSONL atau kafka:<topic>) berisi record hasil convert yang
+gagal ditulis, atau message Kafka mentah yang gagal deserialize / convert
+(record kosong, key/value asli). Setelah penyebabnya diperbaiki (DDL,
+constraint, data, converter), message mentah di-decode ulang lalu semua record
+ditulis ulang dengan write path yang sama (batch + bisection). Record yang
+masih gagal ditulis ke DLQ baru (--failed-out).
+
+Per key hanya entry terakhir yang di-replay. Record yang row ODS-nya sudah
+punya cdc_timestamp lebih baru dilewati (event lebih baru sudah masuk), kecuali
+dengan --force.
+
+Contoh:
+    python py_script/replay_dlq.py --dry-run
+    python py_script/replay_dlq.py ./ods_sink_dlq.jsonl
+    python py_script/replay_dlq.py kafka:ods_sink_dlq --table customers
+"""
+
+import argparse
+import sys
+
+from custom_ods_sink import (
+    DLQ_LOCATION,
+    SINK_TABLES,
+    BatchCompactor,
+    OdsConnectionPool,
+    batch_of_items,
+    check_dependencies,
+    create_deserializer,
+    failed_message_raw,
+    is_data_error,
+    open_dead_letter,
+    restore_dead_letter_record,
+    tombstone_record,
+    write_batch_bisect,
+    write_batch_retry,
+)
+
+def decode_failed_message(deserialize, entry):
+    """Decode ulang entry message mentah (record kosong); return (pk, record)"""
+    raw_key, raw_value = failed_message_raw(entry)
+    sink_table = SINK_TABLES[entry['table']]
+    if not raw_value:
+        record = tombstone_record(deserialize, sink_table, entry['topic'], raw_key)
+    else:
+        value = deserialize(entry['topic'], raw_value)
+        if not value or 'payload' not in value:
+            raise ValueError("tidak ada payload")
+        record = sink_table.converter_for(value.get('schema'))(value['payload'])
+    if not record or not record.get(sink_table.pk):
+        raise ValueError(f"record tanpa {sink_table.pk}")
+    return record[sink_table.pk], record
+
+def load_entries(dead_letter, tables=None, deserialize=None):
+    """Baca entry DLQ, compact per (tabel, pk): entry terakhir yang menang
+
+    Entry message mentah di-decode ulang dengan deserialize; yang masih gagal
+    dikumpulkan di undecodable (entry dengan error baru).
+    Return (compactor, sources tabel -> {pk: (partition, offset)} asli,
+    errors (tabel, pk) -> error terakhir, jumlah entry yang dilewati,
+    undecodable).
+    """
+    compactor = BatchCompactor(SINK_TABLES)
+    sources = {table: {} for table in SINK_TABLES}
+    errors = {}
+    skipped = 0
+    undecodable = []
+    for index, entry in enumerate(dead_letter.read()):
+        table = entry.get('table')
+        if table not in SINK_TABLES or (tables and table not in tables):
+            skipped += 1
+            continue
+        if entry.get('record') is None:
+            try:
+                key, record = decode_failed_message(deserialize or create_deserializer(), entry)
+            except Exception as e:
+                undecodable.append(dict(entry, error=str(e).strip()))
+                continue
+        else:
+            key, record = entry['key'], restore_dead_letter_record(entry)
+        compactor.add(table, key, record, None, index)
+        sources[table][key] = (entry.get('partition'), entry.get('offset'))
+        errors[(table, key)] = entry.get('error')
+    return compactor, sources, errors, skipped, undecodable
+
+def drop_outdated(conn, batch):
+    """Buang record yang row ODS-nya sudah punya cdc_timestamp lebih baru"""
+    dropped = 0
+    cur = conn.cursor()
+    try:
+        for table, records in batch.items():
+            if not records:
+                continue
+            sink_table = SINK_TABLES[table]
+            cur.execute(
+                f"SELECT {sink_table.pk}, cdc_timestamp FROM {table} "
+                f"WHERE {sink_table.pk} = ANY(%s::{sink_table.pk_array_type})",
+                (list(records),)
+            )
+            for key, current in cur.fetchall():
+                replayed = records[key].get('cdc_timestamp')
+                if current is not None and replayed is not None and current > replayed:
+                    del records[key]
+                    dropped += 1
+        conn.commit()
+    finally:
+        cur.close()
+    return dropped
+
+def chunks(batch, size):
+    """Pecah batch dict tabel -> {pk: record} per maksimum size record"""
+    items = [(table, key, record) for table, records in batch.items() for key, record in records.items()]
+    for start in range(0, len(items), size):
+        yield batch_of_items(items[start:start + size])
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay dead-letter queue custom_ods_sink ke ODS")
+    parser.add_argument("source", nargs="?", default=DLQ_LOCATION,
+                        help=f"DLQ: file JSONL atau kafka:<topic> (default: {DLQ_LOCATION})")
+    parser.add_argument("--table", action="append", choices=sorted(SINK_TABLES),
+                        help="Hanya replay tabel ini (bisa diulang)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Record per transaksi (default: 1000)")
+    parser.add_argument("--failed-out", default="./ods_sink_dlq.replay-failed.jsonl",
+                        help="DLQ untuk record yang masih gagal (file JSONL atau kafka:<topic>)")
+    parser.add_argument("--force", action="store_true",
+                        help="Tulis ulang walaupun row ODS punya cdc_timestamp lebih baru")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya tampilkan ringkasan, tidak menulis ke ODS")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Replay Dead-Letter Queue")
+    print("=" * 60)
+
+    source = open_dead_letter(args.source)
+    try:
+        compactor, sources, errors, skipped, undecodable = load_entries(source, args.table, create_deserializer())
+    finally:
+        source.close()
+    batch = compactor.drain()
+    total = sum(len(records) for records in batch.values())
+    print(f"\n✓ DLQ {source.location}: {total} record unik"
+          + (f" ({skipped} entry dilewati)" if skipped else ""))
+    for table, records in batch.items():
+        if records:
+            print(f"  - {table}: {len(records)} record")
+    if undecodable:
+        print(f"⚠ {len(undecodable)} message masih gagal decode"
+              + ("" if args.dry_run else f", ditulis ke {args.failed_out}"))
+
+    if args.dry_run:
+        for (table, key), error in list(errors.items())[:20]:
+            print(f"  {table} {key}: {error}")
+        for entry in undecodable[:20]:
+            print(f"  {entry['topic']}[{entry['partition']}] offset {entry['offset']}: {entry['error']}")
+        return
+    if undecodable:
+        failed_out = open_dead_letter(args.failed_out)
+        try:
+            failed_out.write(undecodable)
+        finally:
+            failed_out.close()
+    if not total:
+        return
+
+    check_dependencies()
+    pool = OdsConnectionPool(1)
+    conn = pool.getconn()
+    failed_out = open_dead_letter(args.failed_out)
+    written_total = 0
+    dead_total = 0
+    try:
+        if not args.force:
+            dropped = drop_outdated(conn, batch)
+            if dropped:
+                print(f"\n⚠ {dropped} record dilewati: row ODS sudah lebih baru (pakai --force untuk menimpa)")
+        for part in chunks(batch, max(1, args.batch_size)):
+            try:
+                written = write_batch_retry(conn, part, name="replay")
+            except Exception as e:
+                if not is_data_error(e):
+                    raise
+                written, dead = write_batch_bisect(conn, part, e, failed_out, sources)
+                dead_total += len(dead)
+            written_total += sum(written.values())
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        sys.exit(1)
+    finally:
+        failed_out.close()
+        pool.putconn(conn)
+        pool.closeall()
+
+    print(f"\n✓ Replay selesai: {written_total} record ditulis ke ODS")
+    if dead_total:
+        print(f"⚠ {dead_total} record masih gagal, ditulis ke {failed_out.location}")
+    print(f"  Entry di {source.location} tidak dihapus; hapus/arsipkan setelah dicek")
+
+if __name__ == "__main__":
+    main()
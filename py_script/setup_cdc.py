@@ -24,6 +24,37 @@ def resolve_config_path(cli_path: Optional[str] = None) -> str:
     return os.path.join(project_root, "debezium-connector-config", "mysql-connector.json")
 CONNECTOR_CONFIG_FILE = resolve_config_path()
 
+# JsonConverter tanpa schema per message (schemas.enable=false). Sink harus
+# jalan dengan ODS_SINK_DESERIALIZER=schemaless supaya scale decimal diambil
+# dari schema cache (tabel ODS / ODS_SINK_SCHEMA_FILE).
+SCHEMALESS_CONVERTER_CONFIG = {
+    "key.converter": "org.apache.kafka.connect.json.JsonConverter",
+    "key.converter.schemas.enable": "false",
+    "value.converter": "org.apache.kafka.connect.json.JsonConverter",
+    "value.converter.schemas.enable": "false",
+}
+
+# AvroConverter + schema registry. time.precision.mode=connect supaya date/timestamp
+# keluar sebagai Avro logical type (date, timestamp-millis); decimal precise jadi
+# logicalType decimal. Sink: ODS_SINK_DESERIALIZER=avro. Image Kafka Connect harus
+# punya jar io.confluent.connect.avro.AvroConverter.
+def avro_converter_config(registry_url: str) -> dict:
+    return {
+        "key.converter": "io.confluent.connect.avro.AvroConverter",
+        "key.converter.schema.registry.url": registry_url,
+        "value.converter": "io.confluent.connect.avro.AvroConverter",
+        "value.converter.schema.registry.url": registry_url,
+        "time.precision.mode": "connect",
+    }
+
+def apply_converter_overrides(config_only: dict, schemaless: bool = False,
+                              avro_registry_url: Optional[str] = None) -> dict:
+    if schemaless:
+        config_only.update(SCHEMALESS_CONVERTER_CONFIG)
+    if avro_registry_url:
+        config_only.update(avro_converter_config(avro_registry_url))
+    return config_only
+
 def wait_for_kafka_connect():
     print("Menunggu Kafka Connect siap...")
     max_retries = 30
@@ -57,12 +88,13 @@ def delete_connector():
         print(f"Error saat menghapus connector: {e}")
     return False
 
-def create_connector():
+def create_connector(schemaless: bool = False, avro_registry_url: Optional[str] = None):
     with open(CONNECTOR_CONFIG_FILE, 'r') as f:
         config = json.load(f)
     # Override name jika berbeda
     if config.get("name") != CONNECTOR_NAME:
         config["name"] = CONNECTOR_NAME
+    apply_converter_overrides(config.setdefault("config", {}), schemaless, avro_registry_url)
     url = f"{KAFKA_CONNECT_URL}/connectors"
     headers = {"Content-Type": "application/json"}
     try:
@@ -144,6 +176,8 @@ def main():
     parser.add_argument("--connector-name", help="Nama connector baru untuk start dari awal (default: mks-finance-mysql-connector)")
     parser.add_argument("--put-enable-incremental", action="store_true", help="Aktifkan incremental snapshot via PUT /config")
     parser.add_argument("--snapshot", help="Comma-separated daftar tabel untuk di-snapshot, contoh: customers,credit_applications")
+    parser.add_argument("--schemaless", action="store_true", help="JsonConverter dengan schemas.enable=false (sink: ODS_SINK_DESERIALIZER=schemaless)")
+    parser.add_argument("--avro", metavar="SCHEMA_REGISTRY_URL", help="AvroConverter dengan schema registry ini (sink: ODS_SINK_DESERIALIZER=avro)")
     args = parser.parse_args()
     global CONNECTOR_CONFIG_FILE
     global KAFKA_CONNECT_URL
@@ -177,7 +211,13 @@ def main():
                     print(f"\nStatus: {status.get('connector', {}).get('state', 'UNKNOWN')}")
                 sys.exit(0)
     print(f"\nMembuat connector {CONNECTOR_NAME}...")
-    if create_connector():
+    if args.schemaless:
+        print("Converter: JsonConverter schemaless (schemas.enable=false)")
+        print("  Jalankan sink dengan ODS_SINK_DESERIALIZER=schemaless")
+    if args.avro:
+        print(f"Converter: AvroConverter (schema registry: {args.avro})")
+        print("  Jalankan sink dengan ODS_SINK_DESERIALIZER=avro ODS_SINK_SCHEMA_REGISTRY=<url>")
+    if create_connector(schemaless=args.schemaless, avro_registry_url=args.avro):
         time.sleep(3)
         status = get_connector_status()
         if status:
@@ -191,7 +231,7 @@ def main():
                     try:
                         with open(CONNECTOR_CONFIG_FILE, "r") as f:
                             raw = json.load(f)
-                        config_only = raw.get("config", {})
+                        config_only = apply_converter_overrides(raw.get("config", {}), args.schemaless, args.avro)
                         ok = put_connector_config(config_only)
                         if ok:
                             print("✓ PUT config berhasil")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Metrics in-process untuk custom_ods_sink dengan endpoint HTTP format teks
+Prometheus (exposition format 0.0.4), tanpa dependency prometheus_client.
+
+Metric disimpan per tuple label; setiap update hanya satu dict lookup di
+bawah lock, jadi aman dipanggil dari apply worker / write stage.
+
+Contoh:
+    registry = MetricsRegistry()
+    records = registry.counter('ods_sink_records_total', 'Message diproses', ('table', 'partition'))
+    records.inc(('customers', 0), 100)
+    start_metrics_server(registry, 9108)
+    curl -s localhost:9108/metrics
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket default (detik) untuk durasi stage sink
+DEFAULT_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Bucket default untuk ukuran batch (jumlah record)
+DEFAULT_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _label_text(labelnames, labels, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels) if value != '']
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Basis metric: nama, help, tipe Prometheus, dan nama label"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self):
+        """Copy value per tuple label (konsisten, diambil di bawah lock)"""
+        with self.lock:
+            return dict(self.values)
+
+class Counter(Metric):
+    """Counter monoton per tuple label"""
+
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self.values.get(labels, 0)
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self.snapshot().items(), key=lambda item: str(item[0])):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge(Counter):
+    """Gauge per tuple label (set / inc)"""
+
+    kind = "gauge"
+
+    def set(self, labels=(), value=0):
+        with self.lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    """Histogram bucket kumulatif per tuple label (_bucket, _sum, _count)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, labels=(), value=0.0):
+        self.observe_many(labels, (value,))
+
+    def observe_many(self, labels, values):
+        """Masukkan banyak value sekaligus (satu lock per panggilan)"""
+        if not values:
+            return
+        buckets = self.buckets
+        counts = [0] * len(buckets)
+        for value in values:
+            counts[bisect_left(buckets, value)] += 1
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * len(buckets), 0.0, 0]
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += sum(values)
+            state[2] += len(values)
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: (list(state[0]), state[1], state[2]) for labels, state in self.values.items()}
+
+    def merged(self, **match):
+        """Gabungan (counts per bucket, sum, count) semua series yang labelnya cocok"""
+        counts = [0] * len(self.buckets)
+        total = 0.0
+        count = 0
+        for labels, (series_counts, series_total, series_count) in self.snapshot().items():
+            values = dict(zip(self.labelnames, labels))
+            if all(values.get(name) == value for name, value in match.items()):
+                counts = [a + b for a, b in zip(counts, series_counts)]
+                total += series_total
+                count += series_count
+        return counts, total, count
+
+    def quantile(self, q, **match):
+        """Estimasi quantile (interpolasi linear di dalam bucket, seperti
+        histogram_quantile Prometheus); None jika belum ada observasi"""
+        counts, _, count = self.merged(**match)
+        if not count:
+            return None
+        threshold = count * q
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, counts):
+            if n and seen + n >= threshold:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (threshold - seen) / n
+            seen += n
+            if bound != math.inf:
+                lower = bound
+        return lower
+
+    def fraction_le(self, bound, **match):
+        """Fraksi observasi <= bound (bound harus salah satu batas bucket)"""
+        counts, _, count = self.merged(**match)
+        if not count:
+            return None
+        within = sum(n for upper, n in zip(self.buckets, counts) if upper <= bound)
+        return within / count
+
+    def render(self):
+        lines = self.header()
+        for labels, (counts, total, count) in sorted(self.snapshot().items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Kumpulan metric yang di-render bersama di endpoint /metrics"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_TIME_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def start_metrics_server(registry, port, host="0.0.0.0"):
+    """Jalankan endpoint HTTP /metrics di daemon thread; return server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Script di py_script/ saling import sebagai module top-level
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py_script"))
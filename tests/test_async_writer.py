@@ -0,0 +1,166 @@
+"""AsyncOdsWriter.write_bisect dengan koneksi asyncpg palsu (tanpa PostgreSQL)"""
+
+import asyncio
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+import custom_ods_sink_async as sink_async
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """executemany gagal untuk row dengan key di `bad`, atau raise `errors` berurutan"""
+
+    def __init__(self, bad=(), error=None, errors=()):
+        self.bad = set(bad)
+        self.error = error
+        self.errors = list(errors)
+        self.rows = []
+        self.statements = []
+
+    def transaction(self):
+        return FakeTransaction()
+
+    async def execute(self, sql, *args):
+        self.statements.append(sql)
+
+    async def executemany(self, sql, rows):
+        if self.error is not None:
+            raise self.error
+        if self.errors:
+            raise self.errors.pop(0)
+        if sql == sink_async.CHECKPOINT_UPSERT_SQL_ASYNC:
+            return
+        if any(row[0] in self.bad for row in rows):
+            raise asyncpg.CheckViolationError("bad row")
+        self.rows.extend(rows)
+
+
+class FakeDeadLetter:
+    def __init__(self):
+        self.entries = []
+
+    def write(self, entries):
+        self.entries.extend(entries)
+
+
+def customers(*keys, op='u'):
+    return {'customers': {key: {'customer_id': key, 'cdc_operation': op} for key in keys}}
+
+
+def test_write_bisect_dead_letters_bad_row():
+    conn = FakeConnection(bad={'C2'})
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=False)
+    written, dead_keys = asyncio.run(writer.write_bisect(customers('C1', 'C2', 'C3', 'C4'),
+                                                         asyncpg.CheckViolationError("bad row"), {}, {}))
+    assert written == {'customers': 3}
+    assert dead_keys == {('customers', 'C2')}
+    assert [entry['key'] for entry in writer.dead_letter.entries] == ['C2']
+
+
+@pytest.mark.parametrize("error", [
+    asyncpg.ConnectionDoesNotExistError("connection was closed"),
+    asyncpg.InterfaceError("connection is closed"),
+    ConnectionResetError("reset by peer"),
+])
+def test_write_bisect_reraises_connection_errors(error):
+    conn = FakeConnection(error=error)
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=False)
+    with pytest.raises(type(error)):
+        asyncio.run(writer.write_bisect(customers('C1', 'C2'), error, {}, {}))
+    assert writer.dead_letter.entries == []
+
+
+def test_write_retry_retries_transient_errors(monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(sink_async.asyncio, "sleep", lambda wait: sleep(0))
+    conn = FakeConnection(errors=[asyncpg.DeadlockDetectedError("deadlock"),
+                                  asyncpg.SerializationError("serialization")])
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=False)
+    assert asyncio.run(writer.write_retry(customers('C1', 'C2'), None)) == {'customers': 2}
+    assert len(conn.rows) == 2
+
+
+def test_write_bisect_reraises_non_data_errors():
+    error = asyncpg.UndefinedColumnError("column does not exist")
+    conn = FakeConnection(error=error)
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=False)
+    with pytest.raises(asyncpg.UndefinedColumnError):
+        asyncio.run(writer.write_bisect(customers('C1', 'C2'), error, {}, {}))
+    assert writer.dead_letter.entries == []
+
+
+def test_write_bisect_leaves_snapshot_mode_alone():
+    conn = FakeConnection(bad={'C2'})
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=True)
+    writer.snapshot_tables.add('customers')
+    written, dead_keys = asyncio.run(writer.write_bisect(customers('C1', 'C2', 'C3', 'C4', op='r'),
+                                                         asyncpg.CheckViolationError("bad row"), {}, {}))
+    assert written == {'customers': 3}
+    assert dead_keys == {('customers', 'C2')}
+    assert writer.snapshot_tables == {'customers'}
+    assert not any(sql.startswith("DROP TABLE") for sql in conn.statements)
+
+
+class Partition:
+    def __init__(self, topic, partition):
+        self.topic = topic
+        self.partition = partition
+
+
+class FakeConsumer:
+    """getmany mengembalikan maksimum max_records dari message yang tersisa"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.max_records = []
+
+    async def getmany(self, timeout_ms=0, max_records=None):
+        self.max_records.append(max_records)
+        taken, self.messages = self.messages[:max_records], self.messages[max_records:]
+        return {Partition(taken[0].topic, 0): taken} if taken else {}
+
+
+def test_fetch_loop_batches_follow_flush_policy():
+    from debezium_loadgen import LoadGenerator
+
+    messages = [m._replace(partition=0, offset=i)
+                for i, m in enumerate(LoadGenerator(tables=['customers'], seed=1).messages(250))]
+    consumer = FakeConsumer(messages)
+    converter = sink_async.BatchApplier(None, sink_async.create_deserializer('json', 'json'), 'test')
+    writer = sink_async.AsyncOdsWriter(None, 'test', FakeDeadLetter(), snapshot=False)
+    policy = sink_async.FlushPolicy(max_rows=100, max_bytes=1 << 30, linger_ms=0)
+
+    async def run():
+        batches = asyncio.Queue()
+        await sink_async.fetch_loop(consumer, converter, writer, batches, policy, max_empty_polls=1)
+        items = []
+        while not batches.empty():
+            items.append(await batches.get())
+        return items
+
+    items = asyncio.run(run())
+    assert items[-1] is None
+    flushes = [item[4] for item in items[:-1]]
+    assert [rows for _, rows, _ in flushes] == [100, 100, 50]
+    assert [item[2] for item in items[:-1]] == [
+        {(messages[0].topic, 0): 100}, {(messages[0].topic, 0): 200}, {(messages[0].topic, 0): 250}]
+    assert max(consumer.max_records) == 100
+
+
+def test_failed_write_restores_snapshot_state():
+    conn = FakeConnection(errors=[asyncpg.CheckViolationError("bad row")])
+    writer = sink_async.AsyncOdsWriter(conn, 'test', FakeDeadLetter(), snapshot=True)
+    writer.snapshot_tables.add('customers')
+    with pytest.raises(asyncpg.CheckViolationError):
+        asyncio.run(writer.write(customers('C1'), None))
+    assert writer.snapshot_tables == {'customers'}
@@ -0,0 +1,96 @@
+"""AvroDeserializer dengan registry stub (Confluent wire format, tanpa registry sungguhan)"""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+fastavro = pytest.importorskip("fastavro")
+
+import custom_ods_sink as sink
+from local_schema_registry import encode_confluent_avro
+
+VALUE_SCHEMA = {
+    'type': 'record', 'name': 'Value', 'namespace': 'mks_finance.mks_finance_dw.customers',
+    'fields': [
+        {'name': 'customer_id', 'type': 'string'},
+        {'name': 'date_of_birth', 'type': ['null', {'type': 'int', 'logicalType': 'date'}], 'default': None},
+        {'name': 'monthly_income', 'type': ['null', {'type': 'bytes', 'logicalType': 'decimal',
+                                                     'precision': 15, 'scale': 2}], 'default': None},
+        {'name': 'registration_date', 'type': ['null', {'type': 'long', 'logicalType': 'timestamp-millis'}],
+         'default': None},
+        {'name': '__op', 'type': ['null', 'string'], 'default': None},
+        {'name': '__source_ts_ms', 'type': ['null', 'long'], 'default': None},
+        {'name': '__deleted', 'type': ['null', 'string'], 'default': None},
+    ],
+}
+KEY_SCHEMA = {
+    'type': 'record', 'name': 'Key', 'namespace': 'mks_finance.mks_finance_dw.customers',
+    'fields': [{'name': 'customer_id', 'type': 'string'}],
+}
+TOPIC = sink.topic_for_table('customers')
+
+
+class StubRegistry:
+    def __init__(self, schemas):
+        self.schemas = schemas
+        self.requests = []
+
+    def get_schema(self, schema_id):
+        self.requests.append(schema_id)
+        return self.schemas[schema_id]
+
+
+@pytest.fixture
+def registry():
+    return StubRegistry({1: VALUE_SCHEMA, 2: KEY_SCHEMA})
+
+
+def value_bytes(customer_id, op='c', deleted='false'):
+    registered = datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc)
+    return encode_confluent_avro(1, fastavro.parse_schema(VALUE_SCHEMA), {
+        'customer_id': customer_id, 'date_of_birth': date(1990, 5, 17),
+        'monthly_income': Decimal("8500000.25"), 'registration_date': registered,
+        '__op': op, '__source_ts_ms': 1_700_000_000_000, '__deleted': deleted,
+    })
+
+
+def test_avro_record_converts_logical_types(registry):
+    deserialize = sink.AvroDeserializer(registry=registry)
+    value = deserialize(TOPIC, value_bytes('C1'))
+    record = sink.SINK_TABLES['customers'].converter_for(value['schema'])(value['payload'])
+    assert record['customer_id'] == 'C1'
+    assert record['date_of_birth'] == date(1990, 5, 17)
+    assert record['monthly_income'] == Decimal("8500000.25")
+    # Sama dengan path JSON: epoch ms -> naive local time
+    assert record['registration_date'] == sink.convert_debezium_timestamp(
+        datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc).timestamp() * 1000)
+    assert record['cdc_timestamp'] == sink.convert_debezium_timestamp(1_700_000_000_000)
+    assert record['cdc_operation'] == 'c'
+
+
+def test_avro_schema_fetched_once_per_id(registry):
+    deserialize = sink.AvroDeserializer(registry=registry)
+    for customer_id in ('C1', 'C2', 'C3'):
+        deserialize(TOPIC, value_bytes(customer_id))
+    assert registry.requests == [1]
+
+
+def test_avro_delete_and_tombstone(registry):
+    deserialize = sink.AvroDeserializer(registry=registry)
+    value = deserialize(TOPIC, value_bytes('C1', op='d', deleted='true'))
+    record = sink.SINK_TABLES['customers'].converter_for(value['schema'])(value['payload'])
+    assert record['cdc_operation'] == 'd'
+
+    raw_key = encode_confluent_avro(2, fastavro.parse_schema(KEY_SCHEMA), {'customer_id': 'C1'})
+    assert deserialize.decode_key(TOPIC, raw_key) == {'customer_id': 'C1'}
+    tombstone = sink.tombstone_record(deserialize, sink.SINK_TABLES['customers'], TOPIC, raw_key,
+                                      delete_mode='hard')
+    assert tombstone['customer_id'] == 'C1' and tombstone['cdc_operation'] == 'd'
+
+
+def test_avro_rejects_non_confluent_bytes(registry):
+    deserialize = sink.AvroDeserializer(registry=registry)
+    with pytest.raises(ValueError, match="magic byte"):
+        deserialize(TOPIC, b'{"schema":{}}')
+    assert registry.requests == []
@@ -0,0 +1,112 @@
+"""OdsConnectionPool dengan pool psycopg2 palsu (tanpa PostgreSQL)"""
+
+import threading
+
+import pytest
+
+import custom_ods_sink as sink
+
+
+class FakeConnection:
+    created = 0
+
+    def __init__(self):
+        FakeConnection.created += 1
+        self.closed = False
+        self.prepared = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeThreadedConnectionPool:
+    """Perilaku putconn psycopg2: koneksi idle di atas minconn ditutup"""
+
+    def __init__(self, minconn, maxconn, **config):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.lock = threading.Lock()
+        self.idle = [FakeConnection() for _ in range(minconn)]
+        self.used = set()
+
+    def getconn(self):
+        with self.lock:
+            if self.idle:
+                conn = self.idle.pop()
+            elif len(self.used) < self.maxconn:
+                conn = FakeConnection()
+            else:
+                raise RuntimeError("connection pool exhausted")
+            self.used.add(conn)
+            return conn
+
+    def putconn(self, conn, close=False):
+        with self.lock:
+            self.used.discard(conn)
+            if close or len(self.idle) >= self.minconn:
+                conn.close()
+            else:
+                self.idle.append(conn)
+
+    def closeall(self):
+        for conn in self.idle:
+            conn.close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    prepares = []
+
+    def prepare_statements(conn):
+        assert not conn.closed
+        conn.prepared = True
+        prepares.append(conn)
+
+    FakeConnection.created = 0
+    monkeypatch.setattr(sink, "ThreadedConnectionPool", FakeThreadedConnectionPool, raising=False)
+    monkeypatch.setattr(sink, "prepare_statements", prepare_statements)
+    pool = sink.OdsConnectionPool(3, config={})
+    pool.prepares = prepares
+    yield pool
+    pool.closeall()
+
+
+def test_getconn_putconn_multi_thread_prepare_sekali_per_koneksi(pool):
+    errors = []
+    # Semua thread memegang koneksi bersamaan, lalu semua mengembalikan
+    # sebelum ada yang getconn lagi (seperti worker yang selesai batch bersamaan)
+    barrier = threading.Barrier(3)
+
+    def worker():
+        try:
+            for _ in range(100):
+                conn = pool.getconn()
+                try:
+                    assert conn.prepared and not conn.closed
+                    barrier.wait(timeout=5)
+                finally:
+                    pool.putconn(conn)
+                barrier.wait(timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert FakeConnection.created == 3
+    assert len(pool.prepares) == 3
+
+
+def test_discard_koneksi_baru_di_prepare_ulang(pool):
+    conn = pool.getconn()
+    pool.discard(conn)
+    assert conn.closed
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert replacement.prepared
+    pool.putconn(replacement)
+    assert len(pool.prepares) == 2
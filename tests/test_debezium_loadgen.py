@@ -0,0 +1,45 @@
+"""LoadGenerator: pool key hidup untuk u/d dan cek partition sebelum --produce"""
+
+import json
+
+import pytest
+
+import debezium_loadgen as loadgen
+
+
+def test_delete_never_targets_deleted_key():
+    mix = loadgen.parse_op_mix("c=1,u=1,d=3")
+    generator = loadgen.LoadGenerator(tables=['customers'], skew=3.0, op_mix=mix, seed=7)
+    live = set()
+    deletes = 0
+    for message in generator.messages(2000):
+        if message.value is None:
+            continue
+        payload = json.loads(message.value)['payload']
+        key = payload['customer_id']
+        if payload['__op'] == 'c':
+            live.add(key)
+        else:
+            assert key in live, f"{payload['__op']} untuk key yang sudah di-delete: {key}"
+            if payload['__op'] == 'd':
+                live.remove(key)
+                deletes += 1
+    assert deletes > 100
+    assert sorted(generator.live['customers']) == sorted(live)
+
+
+class FakeProducer:
+    def __init__(self, partitions):
+        self.partitions = partitions
+
+    def partitions_for(self, topic):
+        return self.partitions.get(topic)
+
+
+def test_check_partitions_rejects_more_partitions_than_topic():
+    producer = FakeProducer({'a': {0, 1, 2}, 'b': {0}})
+    loadgen.check_partitions(producer, {'a'}, 3)
+    with pytest.raises(ValueError, match="b hanya punya 1 partition"):
+        loadgen.check_partitions(producer, {'a', 'b'}, 3)
+    with pytest.raises(ValueError, match="tidak ditemukan"):
+        loadgen.check_partitions(producer, {'c'}, 1)
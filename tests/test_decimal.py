@@ -0,0 +1,64 @@
+"""Decode decimal Debezium (precise / string / double / VariableScaleDecimal) secara exact"""
+
+import base64
+from decimal import Decimal
+
+import pytest
+
+import custom_ods_sink as sink
+from debezium_loadgen import encode_decimal
+
+
+def precise(unscaled):
+    length = max(1, (unscaled.bit_length() + 8) // 8)
+    return base64.b64encode(unscaled.to_bytes(length, 'big', signed=True)).decode()
+
+
+@pytest.mark.parametrize("unscaled, scale, expected", [
+    (12345, 2, "123.45"),
+    (-12345, 2, "-123.45"),
+    (0, 2, "0.00"),
+    (5, 0, "5"),
+    (-1, 4, "-0.0001"),
+    # Melebihi presisi float dan context decimal default (28 digit)
+    (123456789012345678901234567890123, 3, "123456789012345678901234567890.123"),
+])
+def test_precise_decimal_is_exact(unscaled, scale, expected):
+    value = sink.convert_debezium_decimal(precise(unscaled), scale, mode='precise')
+    assert value == Decimal(expected)
+    assert str(value) == expected
+
+
+def test_loadgen_encoding_round_trips():
+    assert sink.convert_debezium_decimal(encode_decimal(8500000.25, 2), 2, mode='precise') == Decimal("8500000.25")
+
+
+@pytest.mark.parametrize("value, mode, expected", [
+    ("123.45", 'string', "123.45"),
+    (0.1, 'double', "0.1"),
+    (42, 'double', "42"),
+    ({'scale': 3, 'value': precise(-98765)}, 'precise', "-98.765"),
+])
+def test_other_decimal_handling_modes(value, mode, expected):
+    assert sink.decimal_decoder('amount', 2, mode)(value) == Decimal(expected)
+
+
+def test_schema_decimal_params_reads_scale():
+    schema = {'fields': [
+        {'field': 'loan_amount', 'type': 'bytes', 'name': 'org.apache.kafka.connect.data.Decimal',
+         'parameters': {'scale': '2'}},
+        {'field': 'rate', 'type': 'struct', 'name': 'io.debezium.data.VariableScaleDecimal'},
+        {'field': 'price', 'type': 'string'},
+        {'field': 'name', 'type': 'int32'},
+    ]}
+    assert sink.schema_decimal_params(schema) == {
+        'loan_amount': (2, 'precise'), 'rate': (0, 'precise'), 'price': (None, 'string')}
+
+
+def test_invalid_decimal_is_counted_and_none(monkeypatch):
+    monkeypatch.setattr(sink, "DECIMAL_DECODE_ERRORS", {})
+    decode = sink.decimal_decoder('bad_field_test', 2, 'precise')
+    assert decode("!!not base64!!") is None
+    assert decode("!!not base64!!") is None
+    assert sink.DECIMAL_DECODE_ERRORS == {'bad_field_test': 2}
+    assert sink.convert_debezium_decimal(None) is None
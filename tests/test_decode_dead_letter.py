@@ -0,0 +1,97 @@
+"""Message yang gagal deserialize / convert masuk DLQ, offset tetap maju"""
+
+import pytest
+
+import custom_ods_sink as sink
+from debezium_loadgen import LoadGenerator, SyntheticMessage
+
+
+class FakePool:
+    def getconn_retry(self, name="sink"):
+        return object()
+
+    def putconn(self, conn):
+        pass
+
+
+class FakeDeadLetter:
+    location = "memory"
+
+    def __init__(self):
+        self.entries = []
+
+    def write(self, entries):
+        self.entries.extend(entries)
+
+
+class FakePartition:
+    def __init__(self, topic, partition):
+        self.topic = topic
+        self.partition = partition
+
+    def __hash__(self):
+        return hash((self.topic, self.partition))
+
+    def __eq__(self, other):
+        return (self.topic, self.partition) == (other.topic, other.partition)
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    calls = []
+
+    def write_batch_retry(conn, batch, snapshot=None, group_id=None, offsets=None, name="sink"):
+        calls.append((batch, offsets))
+        return {table: len(records) for table, records in batch.items() if records}
+    monkeypatch.setattr(sink, "write_batch_retry", write_batch_retry)
+    return calls
+
+
+def customer_messages():
+    messages = [m for m in LoadGenerator(tables=['customers'], seed=1).messages(20) if m.value][:3]
+    topic = messages[0].topic
+    # Offset berurutan 0..3, message ke-2 (offset 1) value rusak
+    return [
+        messages[0]._replace(offset=0),
+        SyntheticMessage(topic, 0, 1, 1_700_000_000_000, b'{"id": 1}', b'{"payload": {"customer_id": '),
+        messages[1]._replace(offset=2),
+        SyntheticMessage(topic, 0, 3, 1_700_000_000_000, b'{"id": 2}', b'\xff\x00 bukan json'),
+    ]
+
+
+def test_malformed_value_goes_to_dead_letter_and_offset_advances(writes):
+    messages = customer_messages()
+    dead_letter = FakeDeadLetter()
+    applier = sink.BatchApplier(FakePool(), sink.create_deserializer('json', 'json'), 'test',
+                                dead_letter=dead_letter)
+
+    written = applier.apply({FakePartition(messages[0].topic, 0): messages})
+
+    assert [(entry['offset'], entry['record']) for entry in dead_letter.entries] == [(1, None), (3, None)]
+    assert dead_letter.entries[0]['raw_value'] == '{"payload": {"customer_id": '
+    assert dead_letter.entries[0]['raw_key'] == '{"id": 1}'
+    assert sink.failed_message_raw(dead_letter.entries[1]) == (b'{"id": 2}', b'\xff\x00 bukan json')
+    assert applier.dead_letters == 2
+    batch, offsets = writes[0]
+    assert offsets == {(messages[0].topic, 0): 4}
+    assert sum(written.values()) == len(batch['customers'])
+
+
+def test_decode_chunk_returns_dead_letter_entries(monkeypatch):
+    monkeypatch.setattr(sink, "_decode_deserialize", sink.create_deserializer('json', 'json'))
+    messages = customer_messages()
+    rows, errors = sink.decode_chunk([(m.topic, m.partition, m.offset, m.timestamp, m.key, m.value)
+                                      for m in messages])
+    assert [row[2] for row in rows] == [0, 2]
+    assert [entry['offset'] for _, _, _, entry in errors] == [1, 3]
+    assert all(entry['record'] is None for _, _, _, entry in errors)
+
+
+def test_replay_decodes_raw_entry_again():
+    import replay_dlq
+
+    message = customer_messages()[0]
+    entry = sink.failed_message_entry(message.topic, 0, 0, message.key, message.value, "converter bug")
+    key, record = replay_dlq.decode_failed_message(sink.create_deserializer('json', 'json'), entry)
+    assert key == record['customer_id']
+    assert record['cdc_operation'] in ('r', 'c', 'u')
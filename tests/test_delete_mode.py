@@ -0,0 +1,106 @@
+"""Delete hard vs soft: event __deleted=true, tombstone, dan write_batch"""
+
+import random
+
+import pytest
+
+import custom_ods_sink as sink
+from debezium_loadgen import SyntheticMessage, TableGenerator
+
+NOW_MS = 1_700_000_000_000
+
+
+@pytest.fixture
+def generator():
+    return TableGenerator('customers', random.Random(1))
+
+
+def event(generator, offset, key, op):
+    value = None if op is None else generator.value(key, op, NOW_MS)
+    return SyntheticMessage(generator.topic, 0, offset, NOW_MS, generator.key(key), value)
+
+
+def apply_events(generator, delete_mode, monkeypatch):
+    """c, u, d + tombstone untuk C1 (d tanpa tombstone untuk C2) -> batch hasil compaction"""
+    monkeypatch.setattr(sink, "DELETE_MODE", delete_mode)
+    applier = sink.BatchApplier(None, sink.create_deserializer('envelope', 'json'), 'test')
+    for message in (event(generator, 0, 'C1', 'c'), event(generator, 1, 'C1', 'u'),
+                    event(generator, 2, 'C2', 'c'), event(generator, 3, 'C1', 'd'),
+                    event(generator, 4, 'C1', None), event(generator, 5, 'C2', 'd')):
+        applier.add_message(message)
+    return applier.compactor.drain()['customers']
+
+
+def test_hard_mode_tombstone_becomes_key_only_delete(generator, monkeypatch):
+    batch = apply_events(generator, 'hard', monkeypatch)
+    assert batch['C1'] == sink.SINK_TABLES['customers'].tombstone_record('C1')
+    assert batch['C2']['cdc_operation'] == 'd'
+
+
+def test_soft_mode_keeps_row_image_of_delete_event(generator, monkeypatch):
+    batch = apply_events(generator, 'soft', monkeypatch)
+    # Tombstone diabaikan: record delete (row terakhir + cdc_operation 'd') yang menang
+    assert batch['C1']['cdc_operation'] == 'd'
+    assert batch['C1']['full_name'] is not None
+    assert batch['C2']['cdc_operation'] == 'd'
+
+
+def test_tombstone_record_by_mode(generator):
+    deserialize = sink.create_deserializer('envelope', 'json')
+    table = sink.SINK_TABLES['customers']
+    raw_key = generator.key('C9')
+    assert sink.tombstone_record(deserialize, table, generator.topic, raw_key, delete_mode='soft') is None
+    record = sink.tombstone_record(deserialize, table, generator.topic, raw_key, delete_mode='hard')
+    assert record['customer_id'] == 'C9' and record['cdc_operation'] == 'd'
+    assert all(record[column] is None for column in table.column_names
+               if column not in ('customer_id', 'cdc_operation'))
+    assert sink.tombstone_record(deserialize, table, generator.topic, None, delete_mode='hard') is None
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    calls = {'upsert': [], 'delete': []}
+    monkeypatch.setattr(sink.SinkTable, "upsert", lambda self, cur, rows: calls['upsert'].extend(rows))
+    monkeypatch.setattr(sink.SinkTable, "delete", lambda self, cur, keys: calls['delete'].extend(keys))
+    return calls
+
+
+def batch():
+    return {'customers': {
+        'C1': {'customer_id': 'C1', 'cdc_operation': 'u'},
+        'C2': {'customer_id': 'C2', 'cdc_operation': 'd'},
+    }}
+
+
+def test_write_batch_hard_mode_deletes_rows(writes, monkeypatch):
+    monkeypatch.setattr(sink, "DELETE_MODE", 'hard')
+    assert sink.write_batch(FakeConnection(), batch()) == {'customers': 2}
+    assert writes['delete'] == ['C2']
+    assert [row['customer_id'] for row in writes['upsert']] == ['C1']
+
+
+def test_write_batch_soft_mode_upserts_deletes(writes, monkeypatch):
+    monkeypatch.setattr(sink, "DELETE_MODE", 'soft')
+    assert sink.write_batch(FakeConnection(), batch()) == {'customers': 2}
+    assert writes['delete'] == []
+    assert [(row['customer_id'], row['cdc_operation']) for row in writes['upsert']] == [
+        ('C1', 'u'), ('C2', 'd')]
@@ -0,0 +1,114 @@
+"""Deserializer envelope / schemaless vs json: hasil convert harus sama dengan parse penuh"""
+
+import json
+
+import pytest
+
+import custom_ods_sink as sink
+from debezium_loadgen import LoadGenerator, connect_schema
+
+
+@pytest.fixture(scope="module")
+def messages():
+    # Semua tabel registry, op c/u/d + tombstone
+    return [m for m in LoadGenerator(seed=3).messages(300) if m.value is not None]
+
+
+def convert(deserialize, message):
+    value = deserialize(message.topic, message.value)
+    table = sink.table_for_topic(message.topic)
+    return sink.SINK_TABLES[table].converter_for(value.get('schema'))(value['payload'])
+
+
+def test_envelope_matches_full_json_parse(messages):
+    full = sink.create_deserializer('json', 'json')
+    envelope = sink.create_deserializer('envelope', 'json')
+    for message in messages:
+        assert convert(envelope, message) == convert(full, message)
+    assert envelope.fallbacks == 0
+    # Schema per topic hanya di-parse sekali
+    assert envelope.schema_parses == len({m.topic for m in messages})
+
+
+def test_envelope_falls_back_for_other_layout():
+    envelope = sink.create_deserializer('envelope', 'json')
+    raw = b'{"payload":{"customer_id":"C1"},"schema":{"type":"struct","fields":[]}}'
+    assert envelope('topic', raw) == sink.create_deserializer('json', 'json')('topic', raw)
+    assert envelope.fallbacks == 1
+
+
+def test_envelope_reparses_changed_schema():
+    envelope = sink.create_deserializer('envelope', 'json')
+    first = envelope('t', b'{"schema":{"fields":[]},"payload":{"a":1}}')
+    second = envelope('t', b'{"schema":{"fields":[{"field":"a"}]},"payload":{"a":2}}')
+    assert first['schema'] == {'fields': []}
+    assert second == {'schema': {'fields': [{'field': 'a'}]}, 'payload': {'a': 2}}
+    assert envelope.schema_parses == 2
+
+
+def without_schema(message):
+    """Message seperti connector dengan schemas.enable=false (payload saja)"""
+    payload = json.loads(message.value)['payload']
+    return message._replace(value=json.dumps(payload).encode())
+
+
+def test_schemaless_with_schema_file_matches_envelope(tmp_path, messages):
+    schema_file = tmp_path / "schemas.json"
+    schema_file.write_text(json.dumps({table: connect_schema(table) for table in sink.SINK_TABLES}))
+    schemaless = sink.SchemalessDeserializer('json', schema_file=str(schema_file))
+    full = sink.create_deserializer('json', 'json')
+    for message in messages:
+        assert convert(schemaless, without_schema(message)) == convert(full, message)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.table = None
+
+    def execute(self, sql, params):
+        self.table = params[0]
+
+    def fetchall(self):
+        return [(column.name, column.scale) for column in sink.SINK_TABLES[self.table].columns
+                if column.type == sink.DECIMAL]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+
+def test_schemaless_bootstrapped_from_ods_matches_envelope(messages):
+    schemaless = sink.SchemalessDeserializer('json', schema_file='')
+    schemaless.bootstrap(FakeConnection(), sorted({m.topic for m in messages}))
+    full = sink.create_deserializer('json', 'json')
+    for message in messages:
+        assert convert(schemaless, without_schema(message)) == convert(full, message)
+
+
+def test_schemaless_learns_schema_from_envelope_message(messages):
+    schemaless = sink.SchemalessDeserializer('json', schema_file='')
+    message = messages[0]
+    schemaless(message.topic, message.value)
+    assert schemaless.topic_schemas[message.topic] == json.loads(message.value)['schema']
+    full = sink.create_deserializer('json', 'json')
+    assert convert(schemaless, without_schema(message)) == convert(full, message)
+
+
+def test_schemaless_uses_scale_from_cached_schema(tmp_path):
+    # Kolom sumber dengan scale 4 (bukan scale default registry 2)
+    schema = connect_schema('customers')
+    for field in schema['fields']:
+        if field['field'] == 'monthly_income':
+            field['parameters'] = {'scale': '4'}
+    schema_file = tmp_path / "schemas.json"
+    schema_file.write_text(json.dumps({'customers': schema}))
+    schemaless = sink.SchemalessDeserializer('json', schema_file=str(schema_file))
+    topic = sink.topic_for_table('customers')
+    # 1234567 unscaled = 0x12d687
+    value = schemaless(topic, b'{"customer_id":"C1","monthly_income":"EtaH","__op":"c"}')
+    record = sink.SINK_TABLES['customers'].converter_for(value['schema'])(value['payload'])
+    assert str(record['monthly_income']) == "123.4567"
@@ -0,0 +1,76 @@
+"""Mode drain: trim_to_end_offsets membuang message di/after end offset saat start"""
+
+from collections import namedtuple
+
+import custom_ods_sink as sink
+from sink_source import SourcePartition
+
+Message = namedtuple('Message', 'offset')
+
+TP0 = SourcePartition('topic', 0)
+TP1 = SourcePartition('topic', 1)
+
+
+class FakeConsumer:
+    def __init__(self, positions=None):
+        self.positions = positions or {}
+        self.paused = []
+
+    def pause(self, *tps):
+        self.paused.extend(tps)
+
+    def position(self, tp):
+        return self.positions[tp]
+
+
+def messages(start, stop):
+    return [Message(offset) for offset in range(start, stop)]
+
+
+def test_messages_before_end_pass_through():
+    consumer = FakeConsumer()
+    drained = set()
+    trimmed = sink.trim_to_end_offsets(consumer, {TP0: messages(0, 5)}, {TP0: 10, TP1: 10}, drained)
+    assert [m.offset for m in trimmed[TP0]] == [0, 1, 2, 3, 4]
+    assert drained == set() and consumer.paused == []
+
+
+def test_messages_at_or_after_end_are_dropped_and_partition_paused():
+    consumer = FakeConsumer()
+    drained = set()
+    trimmed = sink.trim_to_end_offsets(consumer, {TP0: messages(8, 14), TP1: messages(0, 3)},
+                                       {TP0: 10, TP1: 10}, drained)
+    assert [m.offset for m in trimmed[TP0]] == [8, 9]
+    assert len(trimmed[TP1]) == 3
+    assert drained == {TP0} and consumer.paused == [TP0]
+
+
+def test_last_message_exactly_at_end_minus_one_drains():
+    consumer = FakeConsumer()
+    drained = set()
+    trimmed = sink.trim_to_end_offsets(consumer, {TP0: messages(5, 10)}, {TP0: 10}, drained)
+    assert len(trimmed[TP0]) == 5
+    assert drained == {TP0}
+
+
+def test_partition_with_only_new_messages_is_removed():
+    consumer = FakeConsumer()
+    drained = set()
+    trimmed = sink.trim_to_end_offsets(consumer, {TP0: messages(10, 12)}, {TP0: 10}, drained)
+    assert trimmed == {}
+    assert drained == {TP0}
+
+
+def test_empty_poll_checks_position_for_skipped_offsets():
+    # Offset terakhir sebelum end adalah control record: poll kosong, posisi sudah di end
+    consumer = FakeConsumer({TP0: 10, TP1: 4})
+    drained = set()
+    assert sink.trim_to_end_offsets(consumer, {}, {TP0: 10, TP1: 10}, drained) == {}
+    assert drained == {TP0} and consumer.paused == [TP0]
+
+
+def test_empty_partition_drains_immediately():
+    consumer = FakeConsumer({TP0: 0})
+    drained = set()
+    sink.trim_to_end_offsets(consumer, {}, {TP0: 0}, drained)
+    assert drained == {TP0}
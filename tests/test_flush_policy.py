@@ -0,0 +1,102 @@
+"""FlushPolicy: trigger rows / bytes / linger dan adaptive batch size"""
+
+import time
+from collections import namedtuple
+
+import custom_ods_sink as sink
+
+Message = namedtuple('Message', 'value')
+
+
+def poll(rows, size=10):
+    return {('topic', 0): [Message(b'x' * size) for _ in range(rows)]}
+
+
+def flush_after(latency_ms, reason, rows):
+    """Info flush seperti take(): satu poll yang di-fetch latency_ms yang lalu"""
+    return reason, rows, [(time.monotonic() - latency_ms / 1000, rows)]
+
+
+def test_rows_trigger_and_floor():
+    policy = sink.FlushPolicy(max_rows=100, max_bytes=1 << 30, linger_ms=10_000)
+    policy.add(poll(60))
+    assert policy.reason() is None
+    assert policy.poll_max_records() == 40
+    policy.add(poll(40))
+    assert policy.reason() == 'rows'
+    # Floor (snapshot / decode pool) menaikkan ambang rows
+    assert policy.reason(row_floor=500) is None
+    assert policy.poll_max_records(row_floor=500) == 400
+
+
+def test_bytes_trigger_counts_values_only():
+    policy = sink.FlushPolicy(max_rows=1000, max_bytes=1000, linger_ms=10_000)
+    policy.add({('topic', 0): [Message(None)] * 50})
+    assert policy.rows == 50 and policy.bytes == 0
+    policy.add(poll(10, size=100))
+    assert policy.reason() == 'bytes'
+
+
+def test_linger_trigger_and_poll_timeout():
+    policy = sink.FlushPolicy(max_rows=1000, max_bytes=1 << 30, linger_ms=200)
+    assert policy.reason() is None
+    assert policy.poll_timeout_ms() == 1000
+    policy.add(poll(5))
+    first = policy.polls[0][0]
+    assert 0 <= policy.poll_timeout_ms() <= 200
+    assert policy.reason(now=first + 0.1) is None
+    assert policy.reason(now=first + 0.25) == 'linger'
+
+
+def test_take_resets_pending_batch():
+    policy = sink.FlushPolicy(max_rows=10, max_bytes=1 << 30, linger_ms=200)
+    policy.add(poll(4))
+    policy.add(poll(6))
+    reason, rows, polls = policy.take('rows')
+    assert (reason, rows, [n for _, n in polls]) == ('rows', 10, [4, 6])
+    assert policy.rows == 0 and policy.bytes == 0 and policy.reason() is None
+
+
+def test_static_policy_does_not_adapt():
+    policy = sink.FlushPolicy(max_rows=1000, max_bytes=1 << 30, linger_ms=200)
+    policy.flushed(flush_after(5000, 'rows', 1000))
+    assert not policy.adaptive
+    assert policy.batch_rows == 1000 and policy.linger_ms == 200
+
+
+def test_adaptive_grows_when_fast_and_shrinks_when_slow():
+    policy = sink.FlushPolicy(max_rows=1000, max_bytes=1 << 30, linger_ms=200, target_p99_ms=100)
+    assert policy.adaptive
+    assert policy.batch_rows == sink.FLUSH_MIN_ROWS == policy.min_rows
+    assert policy.linger_ms == 50
+
+    # Batch penuh dan p99 jauh di bawah target: batch_rows x2 sampai max_rows
+    for expected in (200, 400, 800, 1000):
+        policy.flushed(flush_after(1, 'rows', policy.batch_rows))
+        assert policy.batch_rows == expected
+
+    # p99 melewati target: batch_rows dan linger dipotong setengah
+    policy.flushed(flush_after(500, 'rows', policy.batch_rows))
+    assert policy.batch_rows == 500
+    assert policy.linger_ms == 25
+    assert policy.p99_ms() == 0.0
+
+
+def test_adaptive_shrinks_on_small_linger_flush():
+    policy = sink.FlushPolicy(max_rows=1000, max_bytes=1 << 30, linger_ms=200, target_p99_ms=100)
+    policy.batch_rows = 800
+    policy.linger_ms = 10
+    policy.flushed(flush_after(1, 'linger', 50))
+    assert policy.batch_rows == 400
+    # Linger naik lagi, dibatasi setengah target p99
+    assert policy.linger_ms == 20
+    for _ in range(5):
+        policy.flushed(flush_after(1, 'linger', 10))
+    assert policy.batch_rows == policy.min_rows
+    assert policy.linger_ms == 50
+
+
+def test_weighted_percentile():
+    assert sink.weighted_percentile([], 0.99) == 0.0
+    assert sink.weighted_percentile([(10, 98), (500, 2)], 0.99) == 500
+    assert sink.weighted_percentile([(10, 99), (500, 1)], 0.99) == 10
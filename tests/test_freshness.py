@@ -0,0 +1,34 @@
+"""observe_freshness: record yang masuk DLQ tidak ikut diukur"""
+
+from datetime import datetime
+
+import custom_ods_sink as sink
+
+
+class Recorder:
+    def __init__(self):
+        self.values = {}
+
+    def observe_many(self, labels, values):
+        self.values.setdefault(labels, []).extend(values)
+
+    def set(self, labels, value):
+        self.values[labels] = value
+
+
+def test_observe_freshness_excludes_dead_letter_keys(monkeypatch):
+    freshness = Recorder()
+    last_source = Recorder()
+    monkeypatch.setattr(sink, "FRESHNESS_SECONDS", freshness)
+    monkeypatch.setattr(sink, "LAST_SOURCE_TIMESTAMP", last_source)
+    batch = {'customers': {
+        'C1': {'cdc_timestamp': datetime.fromtimestamp(100.0)},
+        'C2': {'cdc_timestamp': datetime.fromtimestamp(150.0)},
+    }}
+    sources = {'customers': {'C1': (0, 10, 101_000), 'C2': (0, 11, 151_000)}}
+
+    sink.observe_freshness(batch, sources, committed_at=200.0, exclude={('customers', 'C2')})
+
+    assert freshness.values[('customers', 0, 'source_to_ods')] == [100.0]
+    assert freshness.values[('customers', 0, 'kafka_to_ods')] == [99.0]
+    assert last_source.values[('customers', 0)] == 100.0
@@ -0,0 +1,75 @@
+"""MetricsRegistry: render format teks Prometheus dan endpoint /metrics"""
+
+import urllib.request
+
+import pytest
+
+from sink_metrics import CONTENT_TYPE, MetricsRegistry, start_metrics_server
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    records = registry.counter('ods_sink_records_total', 'Message diproses', ('table', 'partition'))
+    records.inc(('customers', 1), 5)
+    records.inc(('customers', 0), 100)
+    records.inc(('customers', 0), 20)
+    lag = registry.gauge('ods_sink_lag', 'Consumer lag', ('table',))
+    lag.set(('vehicle_ownership',), 7)
+    lag.set(('vehicle_ownership',), 3.5)
+    write = registry.histogram('ods_sink_write_seconds', 'Durasi write', ('table',), buckets=(0.1, 1))
+    write.observe_many(('customers',), [0.05, 0.5, 0.5, 3])
+    return registry
+
+
+def test_render_output(registry):
+    assert registry.render() == "\n".join([
+        '# HELP ods_sink_records_total Message diproses',
+        '# TYPE ods_sink_records_total counter',
+        'ods_sink_records_total{table="customers",partition="0"} 120',
+        'ods_sink_records_total{table="customers",partition="1"} 5',
+        '# HELP ods_sink_lag Consumer lag',
+        '# TYPE ods_sink_lag gauge',
+        'ods_sink_lag{table="vehicle_ownership"} 3.5',
+        '# HELP ods_sink_write_seconds Durasi write',
+        '# TYPE ods_sink_write_seconds histogram',
+        'ods_sink_write_seconds_bucket{table="customers",le="0.1"} 1',
+        'ods_sink_write_seconds_bucket{table="customers",le="1"} 3',
+        'ods_sink_write_seconds_bucket{table="customers",le="+Inf"} 4',
+        'ods_sink_write_seconds_sum{table="customers"} 4.05',
+        'ods_sink_write_seconds_count{table="customers"} 4',
+    ]) + "\n"
+
+
+def test_labels_escaped_and_empty_labels_dropped():
+    registry = MetricsRegistry()
+    errors = registry.counter('errors_total', 'Error', ('table', 'kind'))
+    errors.inc(('cust"omers\\', ''))
+    registry.counter('polls_total', 'Poll').inc()
+    assert registry.render().splitlines()[2] == 'errors_total{table="cust\\"omers\\\\"} 1'
+    assert registry.render().splitlines()[-1] == 'polls_total 1'
+
+
+def test_histogram_quantile_and_fraction():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('table',), buckets=(1, 2, 4))
+    assert latency.quantile(0.5) is None
+    latency.observe_many(('a',), [0.5] * 50)
+    latency.observe_many(('b',), [3] * 50)
+    assert latency.quantile(0.5) == 1
+    assert latency.quantile(0.75) == 3
+    assert latency.quantile(0.5, table='b') == 3
+    assert latency.fraction_le(2) == 0.5
+    assert latency.fraction_le(1, table='a') == 1
+
+
+def test_metrics_endpoint(registry):
+    server = start_metrics_server(registry, 0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert response.read().decode() == registry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,112 @@
+"""FileSource dan dump writer (file dump sementara, tanpa Kafka)"""
+
+import os
+
+import pytest
+
+import sink_source
+
+
+@pytest.mark.parametrize("location, group_id", [
+    ("file:./dumps", "replay-dumps"),
+    ("file:./dumps/", "replay-dumps"),
+    ("file:/data/cdc-20261017.odsdump", "replay-cdc-20261017"),
+    ("file:a.jsonl,b.odsdump", "replay-a+b"),
+])
+def test_replay_group_id(location, group_id):
+    assert sink_source.replay_group_id(location) == group_id
+
+
+class Message:
+    def __init__(self, partition, offset):
+        self.topic = "mks_finance.mks_finance_dw.customers"
+        self.partition = partition
+        self.offset = offset
+        self.timestamp = 1_700_000_000_000 + offset
+        self.key = f"C{offset}".encode()
+        self.value = b"{}"
+
+
+@pytest.fixture
+def file_source(tmp_path):
+    """Dump 3 partition: 40, 4 dan 40 record"""
+    path = tmp_path / "cdc.odsdump"
+    writer = sink_source.open_dump_writer(str(path))
+    for partition, count in ((0, 40), (1, 4), (2, 40)):
+        for offset in range(count):
+            writer.write(Message(partition, offset))
+    writer.close()
+    source = sink_source.FileSource(str(path))
+    source.assign(sorted(source.index))
+    yield source
+    source.close()
+
+
+def test_poll_splits_max_records_across_partitions(file_source):
+    batch = file_source.poll(max_records=30)
+    assert {tp.partition: len(records) for tp, records in batch.items()} == {0: 13, 1: 4, 2: 13}
+    assert [r.offset for r in batch[sink_source.SourcePartition(
+        "mks_finance.mks_finance_dw.customers", 0)]] == list(range(13))
+
+
+def test_poll_rotates_partitions_when_max_records_is_small(file_source):
+    seen = set()
+    for _ in range(3):
+        batch = file_source.poll(max_records=1)
+        assert sum(len(records) for records in batch.values()) == 1
+        seen.update(tp.partition for tp in batch)
+    assert seen == {0, 1, 2}
+
+
+def test_poll_reads_every_record_once(file_source):
+    offsets = {}
+    while True:
+        batch = file_source.poll(max_records=7)
+        if not batch:
+            break
+        for tp, records in batch.items():
+            offsets.setdefault(tp.partition, []).extend(r.offset for r in records)
+    assert offsets == {0: list(range(40)), 1: list(range(4)), 2: list(range(40))}
+
+
+@pytest.mark.parametrize("name", ["cdc.odsdump", "cdc.jsonl"])
+def test_dump_writer_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = sink_source.open_dump_writer(path)
+    writer.write(Message(0, 5))
+    writer.write(Message(0, 6))
+    writer.close()
+    assert writer.count == 2
+    with pytest.raises(FileExistsError):
+        sink_source.open_dump_writer(path)
+
+    source = sink_source.FileSource(path)
+    source.assign(sorted(source.index))
+    records = [r for records in source.poll().values() for r in records]
+    source.close()
+    assert [(r.offset, r.key, r.value) for r in records] == [(5, b"C5", b"{}"), (6, b"C6", b"{}")]
+
+
+@pytest.mark.parametrize("name", ["cdc.odsdump", "cdc.jsonl"])
+def test_truncated_dump_skips_partial_last_record(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = sink_source.open_dump_writer(path)
+    for offset in range(3):
+        writer.write(Message(0, offset))
+    writer.close()
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    source = sink_source.FileSource(path)
+    source.assign(sorted(source.index))
+    records = [r for records in source.poll().values() for r in records]
+    truncated = [dump.truncated for dump in source.dumps]
+    source.close()
+    assert [r.offset for r in records] == [0, 1]
+    assert truncated == [True]
+
+
+def test_dump_writer_base_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        sink_source.DumpWriter(str(tmp_path / "cdc.odsdump"))
+    assert not (tmp_path / "cdc.odsdump").exists()
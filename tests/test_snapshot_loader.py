@@ -0,0 +1,116 @@
+"""Kapan write_batch memakai SnapshotLoader (cursor palsu, tanpa PostgreSQL)"""
+
+import pytest
+
+import custom_ods_sink as sink
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buf):
+        self.statements.append(sql)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cur = FakeCursor()
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    rows = []
+    monkeypatch.setattr(sink.SinkTable, "upsert", lambda self, cur, records: rows.extend(records))
+    return rows
+
+
+def customers(ops):
+    return {'customers': {f"C{i}": {'customer_id': f"C{i}", 'cdc_operation': op} for i, op in enumerate(ops)}}
+
+
+def test_few_snapshot_rows_use_upsert(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=10)
+    sink.write_batch(FakeConnection(), customers('rrr'), snapshot)
+    assert len(upserts) == 3
+    assert not snapshot.active
+
+
+def test_snapshot_mode_after_min_rows_across_batches(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=5)
+    conn = FakeConnection()
+    sink.write_batch(conn, customers('rrr'), snapshot)
+    sink.write_batch(conn, customers('rrr'), snapshot)
+    assert snapshot.active_tables == {'customers'}
+    assert len(upserts) == 3
+    assert any(sql.startswith("COPY ods_stage_customers") for sql in conn.cur.statements)
+
+
+def test_live_row_does_not_end_snapshot_mode(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=2)
+    conn = FakeConnection()
+    sink.write_batch(conn, customers('rrru'), snapshot)
+    assert snapshot.active_tables == {'customers'}
+    assert [row['cdc_operation'] for row in upserts] == ['u']
+
+    sink.write_batch(conn, customers('cu'), snapshot)
+    assert not snapshot.active
+    assert "DROP TABLE IF EXISTS ods_stage_customers" in conn.cur.statements
+
+
+def test_live_batch_resets_snapshot_row_count(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=4)
+    conn = FakeConnection()
+    sink.write_batch(conn, customers('rr'), snapshot)
+    sink.write_batch(conn, customers('u'), snapshot)
+    sink.write_batch(conn, customers('rr'), snapshot)
+    assert not snapshot.active
+
+
+class FailingConnection(FakeConnection):
+    """commit gagal sebanyak `failures` kali (transaksi di-rollback)"""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def commit(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("commit gagal")
+
+
+def test_rollback_keeps_snapshot_mode_active(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=2)
+    sink.write_batch(FakeConnection(), customers('rr'), snapshot)
+    assert snapshot.active_tables == {'customers'}
+
+    # DROP staging table ikut di-rollback, jadi snapshot mode tetap aktif
+    with pytest.raises(RuntimeError):
+        sink.write_batch(FailingConnection(), customers('u'), snapshot)
+    assert snapshot.active_tables == {'customers'}
+
+
+def test_retry_does_not_double_count_snapshot_rows(upserts):
+    snapshot = sink.SnapshotLoader(min_rows=4)
+    conn = FailingConnection()
+    with pytest.raises(RuntimeError):
+        sink.write_batch(conn, customers('rr'), snapshot)
+    sink.write_batch(conn, customers('rr'), snapshot)
+    assert snapshot.seen_rows == {'customers': 2}
+    assert not snapshot.active
@@ -0,0 +1,121 @@
+"""Posisi awal consumer: parse --from-offset, override, lalu checkpoint ODS"""
+
+import pytest
+
+import custom_ods_sink as sink
+import sink_source
+from sink_source import SourcePartition
+
+CUSTOMERS = sink.topic_for_table('customers')
+ORDERS = sink.topic_for_table('credit_applications')
+
+
+def test_parse_offset_overrides():
+    assert sink.parse_offset_overrides(["100", "customers:2:50", f"{ORDERS}:0:7"]) == [
+        (None, None, 100), (CUSTOMERS, 2, 50), (ORDERS, 0, 7)]
+    assert sink.parse_offset_overrides(None) == []
+
+
+@pytest.mark.parametrize("value", ["customers:50", "abc", "customers:x:1"])
+def test_parse_offset_overrides_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        sink.parse_offset_overrides([value])
+
+
+def test_offset_override_most_specific_wins():
+    overrides = sink.parse_offset_overrides(["customers:1:50", "100"])
+    assert sink.offset_override_for(SourcePartition(CUSTOMERS, 1), overrides) == 50
+    assert sink.offset_override_for(SourcePartition(CUSTOMERS, 0), overrides) == 100
+    assert sink.offset_override_for(SourcePartition(CUSTOMERS, 0), overrides[:1]) is None
+
+
+def test_start_options_are_exclusive():
+    args = sink.parse_args([])
+    assert args.group_id is None and not args.from_beginning and args.from_offset is None
+    assert sink.parse_args(["--from-offset", "5", "--from-offset", "customers:0:9"]).from_offset == [
+        "5", "customers:0:9"]
+    with pytest.raises(SystemExit):
+        sink.parse_args(["--from-beginning", "--from-offset", "5"])
+
+
+class Message:
+    def __init__(self, partition, offset):
+        self.topic = CUSTOMERS
+        self.partition = partition
+        self.offset = offset
+        self.timestamp = 1_700_000_000_000 + offset
+        self.key = f"C{offset}".encode()
+        self.value = b"{}"
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Dump customers 2 partition x 20 record, semua partition di-assign"""
+    path = str(tmp_path / "cdc.odsdump")
+    writer = sink_source.open_dump_writer(path)
+    for partition in (0, 1):
+        for offset in range(20):
+            writer.write(Message(partition, offset))
+    writer.close()
+    source = sink_source.FileSource(path)
+    source.assign(sorted(source.index))
+    yield source
+    source.close()
+
+
+def positions(source):
+    return [source.position(tp) for tp in source.assigned]
+
+
+def test_resume_from_checkpoint(source):
+    # Partition 1 belum punya checkpoint: tetap di posisi default source
+    sink.seek_start_positions(source, source.assigned, {(CUSTOMERS, 0): 12})
+    assert positions(source) == [12, 0]
+
+
+def test_override_wins_over_checkpoint(source):
+    overrides = sink.parse_offset_overrides(["customers:1:5"])
+    sink.seek_start_positions(source, source.assigned, {(CUSTOMERS, 0): 12, (CUSTOMERS, 1): 15},
+                              offset_overrides=overrides)
+    assert positions(source) == [0, 5]
+
+
+def test_from_beginning_ignores_checkpoint(source):
+    source.seek(source.assigned[0], 10)
+    sink.seek_start_positions(source, source.assigned, {(CUSTOMERS, 0): 12}, from_beginning=True)
+    assert positions(source) == [0, 0]
+
+
+class CheckpointCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def execute(self, sql, params):
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class CheckpointConnection:
+    def __init__(self, rows):
+        self.cur = CheckpointCursor(rows)
+        self.commits = 0
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_load_checkpoints_per_group():
+    conn = CheckpointConnection([(CUSTOMERS, 0, 12), (ORDERS, 3, 7)])
+    assert sink.load_checkpoints(conn, 'replay-dumps') == {(CUSTOMERS, 0): 12, (ORDERS, 3): 7}
+    assert conn.cur.params == ('replay-dumps',)
+    # Transaksi read-only ditutup supaya koneksi tidak idle in transaction
+    assert conn.commits == 1
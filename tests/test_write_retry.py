@@ -0,0 +1,72 @@
+"""Klasifikasi error PostgreSQL dan write_batch_retry (write_batch palsu)"""
+
+import pytest
+
+import custom_ods_sink as sink
+
+
+class PgError(Exception):
+    """Exception dengan pgcode seperti psycopg2.Error dari server"""
+
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+@pytest.mark.parametrize("pgcode, transient, data", [
+    ('40P01', True, False),   # deadlock_detected
+    ('40001', True, False),   # serialization_failure
+    ('55P03', True, False),   # lock_not_available
+    ('57014', True, False),   # query_canceled (statement_timeout)
+    ('22001', False, True),   # string_data_right_truncation
+    ('23502', False, True),   # not_null_violation
+    ('42P01', False, False),  # undefined_table
+])
+def test_error_classification(pgcode, transient, data):
+    assert sink.is_transient_error(PgError(pgcode)) is transient
+    assert sink.is_data_error(PgError(pgcode)) is data
+
+
+def test_value_error_from_driver_is_data_error():
+    assert sink.is_data_error(ValueError("A string literal cannot contain NUL (0x00) characters."))
+    assert not sink.is_data_error(RuntimeError("bug"))
+
+
+@pytest.fixture
+def fake_write_batch(monkeypatch):
+    calls = []
+
+    def install(errors):
+        errors = list(errors)
+
+        def write_batch(conn, batch, snapshot=None, group_id=None, offsets=None):
+            calls.append(batch)
+            if errors:
+                raise errors.pop(0)
+            return {table: len(records) for table, records in batch.items()}
+        monkeypatch.setattr(sink, "write_batch", write_batch)
+        return calls
+    monkeypatch.setattr(sink.time, "sleep", lambda wait: None)
+    return install
+
+
+def test_write_batch_retry_retries_whole_batch(fake_write_batch):
+    calls = fake_write_batch([PgError('40P01'), PgError('55P03')])
+    batch = {'customers': {'C1': {}, 'C2': {}}}
+    assert sink.write_batch_retry(None, batch) == {'customers': 2}
+    assert calls == [batch] * 3
+
+
+def test_write_batch_retry_gives_up(fake_write_batch, monkeypatch):
+    monkeypatch.setattr(sink, "PG_TRANSIENT_RETRIES", 2)
+    calls = fake_write_batch([PgError('40001')] * 5)
+    with pytest.raises(PgError):
+        sink.write_batch_retry(None, {'customers': {'C1': {}}})
+    assert len(calls) == 3
+
+
+def test_write_batch_retry_does_not_retry_data_errors(fake_write_batch):
+    calls = fake_write_batch([PgError('23505')])
+    with pytest.raises(PgError):
+        sink.write_batch_retry(None, {'customers': {'C1': {}}})
+    assert len(calls) == 1